@@ -0,0 +1,158 @@
+"""
+Async versions of the raw SQL API views, served instead of them under ASGI
+(``settings.ASYNC_API_VIEWS``). They build the same statements and responses,
+but await their queries on the pool in ``api.db``, so a slow query holds one
+pooled connection rather than one of the worker's threads.
+"""
+
+import inspect
+
+from asgiref.sync import sync_to_async
+from rest_framework.views import APIView
+
+from . import db, views
+from .serializers import DrugDiseaseProbabilitySerializer
+
+
+class AsyncAPIView(APIView):
+    """``APIView`` whose ``dispatch`` awaits async handlers."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authentication, permission and throttle checks use the ORM.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+class AsyncCachedAPIView(views.CachedAPIView, AsyncAPIView):
+    async def aexecute_query(self, sql_query, params):
+        return await db.fetch(sql_query, params)
+
+    async def apaginate_results(self, results, request, serializer_class):
+        paginator = self.get_paginator(request)
+        page = await paginator.apaginate_queryset(results, request)
+        return self.paginated_response(paginator, page, results, serializer_class)
+
+    async def abuild_search_sql(self, search_query, lookups):
+        if not search_query:
+            return "", []
+        search_terms = search_query.split()
+        rows = await self.aexecute_query(
+            *self.search_terms_sql(search_terms, lookups.values())
+        )
+        matches = self.group_search_matches(rows)
+        return self.search_where_sql(search_terms, lookups, matches)
+
+
+class DrugDiseaseProbabilityListView(
+    AsyncCachedAPIView, views.DrugDiseaseProbabilityListView
+):
+    async def get(self, request, format=None):
+        try:
+            search_query = request.query_params.get("search", "")
+            query = self.get_query(
+                *await self.abuild_search_sql(search_query, self.search_lookups)
+            )
+            return await self.apaginate_results(
+                query, request, DrugDiseaseProbabilitySerializer
+            )
+        except Exception as e:
+            return self.handle_exception(e)
+
+
+class DrugDiseaseProbabilityBatchView(
+    AsyncCachedAPIView, views.DrugDiseaseProbabilityBatchView
+):
+    async def post(self, request, format=None):
+        pairs = self.get_pairs(request)
+        rows = await self.aexecute_query(*self.batch_sql(pairs))
+        return self.batch_response(pairs, rows)
+
+
+class TopPredictionsMixin:
+    async def get(self, request, format=None, **kwargs):
+        key = await sync_to_async(self.get_key)(**kwargs)
+        query, k = self.get_query(request, key)
+        await query.afetch(*query.slice_sql(0, k))
+        return self.top_response(query, k)
+
+
+class TopDrugsForDiseaseView(
+    TopPredictionsMixin, AsyncCachedAPIView, views.TopDrugsForDiseaseView
+):
+    pass
+
+
+class TopDiseasesForDrugView(
+    TopPredictionsMixin, AsyncCachedAPIView, views.TopDiseasesForDrugView
+):
+    pass
+
+
+class ExplanationListMixin:
+    async def get(self, request, format=None):
+        try:
+            return await self.apaginate_results(
+                self.get_query(request), request, self.serializer_class
+            )
+        except Exception as e:
+            return self.handle_exception(e)
+
+
+class PathPredictionListView(
+    ExplanationListMixin, AsyncCachedAPIView, views.PathPredictionListView
+):
+    async def get(self, request, format=None):
+        if "top" not in request.query_params:
+            return await super().get(request, format)
+        try:
+            rows = await self.aexecute_query(*self.top_sql(request))
+        except Exception as e:
+            return self.handle_exception(e)
+        return self.top_response(rows)
+
+
+class MetaPathPredictionListView(
+    ExplanationListMixin, AsyncCachedAPIView, views.MetaPathPredictionListView
+):
+    pass
+
+
+class SourceEdgePredictionListView(
+    ExplanationListMixin, AsyncCachedAPIView, views.SourceEdgePredictionListView
+):
+    pass
+
+
+class TargetEdgePredictionListView(
+    ExplanationListMixin, AsyncCachedAPIView, views.TargetEdgePredictionListView
+):
+    pass
+
+
+class DrugDiseaseExplanationView(AsyncCachedAPIView, views.DrugDiseaseExplanationView):
+    async def get(self, request, pk, format=None):
+        try:
+            rows = await self.aexecute_query(*self.get_sql(request, pk))
+        except Exception as e:
+            return self.handle_exception(e)
+        return self.bundle_response(rows)
@@ -0,0 +1,110 @@
+import bisect
+import heapq
+import re
+import threading
+
+from drugs.models import Disease, Drug, normalize_name
+
+from .versioning import get_versions
+
+
+class PrefixIndex:
+    """
+    Sorted array of normalized keys answering prefix queries with two binary
+    searches. Every name is indexed whole and from the start of each later word,
+    along with the record's identifiers, so "acid" and "chembl25" both find
+    "Acetylsalicylic acid".
+    """
+
+    scopes = ["drugs", "diseases"]
+
+    def __init__(self):
+        self.keys = []
+        self.records = []
+        self.version = None
+        self.lock = threading.Lock()
+
+    def build(self):
+        versions = tuple(get_versions(self.scopes))
+        entries = []
+        drugs = Drug.objects.values_list(
+            "dbid", "name", "chembl_id", "treatment_count", "auroc"
+        )
+        for dbid, name, chembl_id, treatment_count, auroc in drugs:
+            record = ("drug", dbid, name, treatment_count, auroc, normalize_name(name))
+            entries.extend(self.entries(record, name, [dbid, chembl_id]))
+        diseases = Disease.objects.values_list(
+            "doid", "name", "treatment_count", "auroc"
+        )
+        for doid, name, treatment_count, auroc in diseases:
+            record = (
+                "disease",
+                doid,
+                name,
+                treatment_count,
+                auroc,
+                normalize_name(name),
+            )
+            entries.extend(self.entries(record, name, [doid]))
+        entries.sort(key=lambda entry: entry[0])
+        # Swap the arrays in one assignment so concurrent readers never see a
+        # half-built index.
+        self.keys, self.records, self.version = (
+            [key for key, _ in entries],
+            [record for _, record in entries],
+            versions,
+        )
+
+    def entries(self, record, name, identifiers):
+        keys = {record[5]}
+        words = re.split(r"[\s\-/,()]+", name)
+        keys.update(
+            normalize_name(" ".join(words[idx:])) for idx in range(1, len(words))
+        )
+        keys.update(normalize_name(identifier) for identifier in identifiers)
+        return [(key, record) for key in keys if key]
+
+    def ensure_current(self):
+        versions = tuple(get_versions(self.scopes))
+        if versions != self.version:
+            with self.lock:
+                if versions != self.version:
+                    self.build()
+
+    def search(self, query, limit=10, kind=None):
+        self.ensure_current()
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        keys, records = self.keys, self.records
+        start = bisect.bisect_left(keys, prefix)
+        stop = bisect.bisect_left(keys, prefix + "\U0010ffff", start)
+        matches = {
+            record[:2]: record
+            for record in records[start:stop]
+            if kind is None or record[0] == kind
+        }
+        ranked = heapq.nsmallest(
+            limit,
+            matches.values(),
+            # Whole-name matches first, then the best studied records.
+            key=lambda record: (
+                not record[5].startswith(prefix),
+                -(record[3] or 0),
+                -(record[4] or 0),
+                record[2],
+            ),
+        )
+        return [
+            {
+                "type": record_type,
+                "id": pk,
+                "name": name,
+                "treatment_count": treatment_count,
+                "auroc": auroc,
+            }
+            for record_type, pk, name, treatment_count, auroc, _ in ranked
+        ]
+
+
+autocomplete_index = PrefixIndex()
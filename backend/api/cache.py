@@ -0,0 +1,211 @@
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class SQLiteLRUCache(BaseCache):
+    """
+    Cache backend storing entries in one SQLite file, so every gunicorn worker on
+    the host shares the same entries without running a cache server.
+
+    Entries are evicted least recently used first once the cache holds more than
+    ``MAX_ENTRIES`` entries or ``MAX_SIZE`` bytes of pickled values. Eviction
+    sorts the table, so each worker thread only checks the limits every
+    ``CULL_EVERY`` sets or tenth of ``MAX_SIZE`` bytes set, and the cache may
+    briefly run over them in between. Hits keep their access times in memory
+    and write them ``TOUCH_BATCH`` at a time, or at least every
+    ``TOUCH_INTERVAL`` seconds.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._max_size = int(options.get("MAX_SIZE", 64 * 1024 * 1024))
+        self._busy_timeout = float(options.get("BUSY_TIMEOUT", 5))
+        self._cull_every = int(options.get("CULL_EVERY", 100))
+        self._touch_batch = int(options.get("TOUCH_BATCH", 100))
+        self._touch_interval = float(options.get("TOUCH_INTERVAL", 1))
+        self._local = threading.local()
+
+    @property
+    def _connection(self):
+        # SQLite connections can't cross threads or forks, so keep one per
+        # thread and reopen after gunicorn forks a worker.
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            directory = os.path.dirname(self._path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self._path, timeout=self._busy_timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires REAL,
+                    accessed REAL NOT NULL
+                )
+                """)
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)"
+            )
+            self._local.connection = connection
+            self._local.pid = pid
+            # Access times not written yet, and what was set since the last cull.
+            self._local.touched = {}
+            self._local.touched_at = time.time()
+            self._local.set_count = 0
+            self._local.set_size = 0
+        return self._local.connection
+
+    @contextlib.contextmanager
+    def _transaction(self, connection):
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        row = self._connection.execute(
+            "SELECT value, expires FROM cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        value, expires = row
+        if expires is not None and expires <= now:
+            self._connection.execute(
+                "DELETE FROM cache WHERE key = ? AND expires <= ?", (key, now)
+            )
+            self._local.touched.pop(key, None)
+            return default
+        self._touch(key, now)
+        return pickle.loads(value)
+
+    def _touch(self, key, now):
+        local = self._local
+        local.touched[key] = now
+        if (
+            len(local.touched) >= self._touch_batch
+            or now - local.touched_at >= self._touch_interval
+        ):
+            connection = self._connection
+            with self._transaction(connection):
+                self._write_touches(connection, now)
+
+    def _write_touches(self, connection, now):
+        local = self._local
+        if local.touched:
+            connection.executemany(
+                "UPDATE cache SET accessed = ? WHERE key = ? AND accessed < ?",
+                [(accessed, key, accessed) for key, accessed in local.touched.items()],
+            )
+            local.touched.clear()
+        local.touched_at = now
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._set(key, value, timeout, replace=True)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._set(key, value, timeout, replace=False)
+
+    def _set(self, key, value, timeout, replace):
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        now = time.time()
+        connection = self._connection
+        local = self._local
+        with self._transaction(connection):
+            if not replace:
+                row = connection.execute(
+                    "SELECT expires FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and (row[0] is None or row[0] > now):
+                    return False
+            connection.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, pickled, len(pickled), self.get_backend_timeout(timeout), now),
+            )
+            local.touched.pop(key, None)
+            local.set_count += 1
+            local.set_size += len(pickled)
+            if (
+                local.set_count >= self._cull_every
+                or local.set_size * 10 >= self._max_size
+            ):
+                self._write_touches(connection, now)
+                self._cull(connection, now)
+                local.set_count = local.set_size = 0
+        return True
+
+    def _cull(self, connection, now):
+        connection.execute(
+            "DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,)
+        )
+        count, size = connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        if count <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute(
+            """
+            DELETE FROM cache WHERE key IN (
+                SELECT key FROM (
+                    SELECT
+                        key,
+                        SUM(size) OVER recent AS retained_size,
+                        ROW_NUMBER() OVER recent AS retained_count
+                    FROM cache
+                    WINDOW recent AS (ORDER BY accessed DESC, key)
+                )
+                WHERE retained_size > ? OR retained_count > ?
+            )
+            """,
+            (self._max_size, self._max_entries),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute(
+            "UPDATE cache SET expires = ?, accessed = ? WHERE key = ?",
+            (self.get_backend_timeout(timeout), time.time(), key),
+        )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        row = self._connection.execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def clear(self):
+        self._connection.execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Connections are reused across requests; Django calls this after each.
+        pass
@@ -0,0 +1,155 @@
+"""
+Content-negotiated response compression. Responses are encoded with the
+client's most preferred codec among ``settings.COMPRESSION["ENCODINGS"]``
+(zstd, brotli and gzip), buffered ones only from ``MIN_SIZE`` bytes up and
+streamed ones chunk by chunk as they are produced. Only the media types in
+``CONTENT_TYPES`` are compressed.
+"""
+
+import zlib
+
+import brotli
+import zstandard
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import decorator_from_middleware
+from django.utils.deprecation import MiddlewareMixin
+
+
+def gzip_compressor(level):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress, compressor.flush
+
+
+def brotli_compressor(level):
+    compressor = brotli.Compressor(quality=level)
+    return compressor.process, compressor.finish
+
+
+def zstd_compressor(level):
+    compressor = zstandard.ZstdCompressor(level=level).compressobj()
+    return compressor.compress, compressor.flush
+
+
+# Each factory returns a ``(compress, finish)`` pair of callables.
+COMPRESSORS = {
+    "zstd": zstd_compressor,
+    "br": brotli_compressor,
+    "gzip": gzip_compressor,
+}
+
+
+def get_compressor(encoding, level=None):
+    if level is None:
+        level = settings.COMPRESSION["LEVELS"][encoding]
+    return COMPRESSORS[encoding](level)
+
+
+def compress(data, encoding, level=None):
+    process, finish = get_compressor(encoding, level)
+    return process(data) + finish()
+
+
+def compress_sequence(chunks, encoding):
+    # Chunks aren't flushed one by one: the codec emits output as its window
+    # fills, so tiny chunks such as NDJSON rows compress as well as one body.
+    process, finish = get_compressor(encoding)
+    for chunk in chunks:
+        if data := process(chunk):
+            yield data
+    yield finish()
+
+
+async def acompress_sequence(chunks, encoding):
+    process, finish = get_compressor(encoding)
+    async for chunk in chunks:
+        if data := process(chunk):
+            yield data
+    yield finish()
+
+
+def parse_accept_encoding(header):
+    """Returns ``{coding: qvalue}`` for an Accept-Encoding header."""
+    accepted = {}
+    for item in header.split(","):
+        coding, *params = item.split(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        accepted[coding] = qvalue
+    return accepted
+
+
+def negotiate(request):
+    """
+    Returns the encoding to compress the response to ``request`` with, or None.
+    The client's qvalues decide, and ties go to the order of ENCODINGS.
+    """
+    accepted = parse_accept_encoding(request.headers.get("Accept-Encoding", ""))
+    best, best_qvalue = None, 0.0
+    for encoding in settings.COMPRESSION["ENCODINGS"]:
+        qvalue = accepted.get(encoding, accepted.get("*", 0.0))
+        if qvalue > best_qvalue:
+            best, best_qvalue = encoding, qvalue
+    return best
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Like Django's ``GZipMiddleware``, but negotiating the codec, with a
+    configurable size threshold, and compressing streams incrementally.
+    Responses that already have a Content-Encoding, such as those cached
+    compressed by ``CachePageMixin``, pass through untouched.
+    """
+
+    def process_response(self, request, response):
+        if response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").partition(";")[0].strip()
+        if content_type not in settings.COMPRESSION["CONTENT_TYPES"]:
+            return response
+        if (
+            not response.streaming
+            and len(response.content) < settings.COMPRESSION["MIN_SIZE"]
+        ):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        encoding = negotiate(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_sequence(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, encoding
+                )
+            del response.headers["Content-Length"]
+        else:
+            content = compress(response.content, encoding)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response.headers["Content-Length"] = str(len(content))
+
+        # A strong ETag would claim byte equality with the other encodings.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+compress_page = decorator_from_middleware(CompressionMiddleware)
@@ -0,0 +1,140 @@
+import asyncio
+import contextlib
+import os
+import threading
+import weakref
+
+from django.conf import settings
+from django.db import connection
+from psycopg import AsyncClientCursor
+from psycopg_pool import AsyncConnectionPool, ConnectionPool
+
+# One async pool per event loop. An ASGI server runs a single loop per worker,
+# so in production this is one pool per process.
+_pools = weakref.WeakKeyDictionary()
+
+# The optional sync pool, one per process (see DB_POOL).
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def connection_kwargs():
+    # The same parameters and adapters Django connects with. Raw SQL always
+    # runs in autocommit, like Django's own connections outside atomic().
+    return {**connection.get_connection_params(), "autocommit": True}
+
+
+def async_connection_kwargs():
+    # Client-side binding keeps the raw SQL written for the sync views (``%s``
+    # placeholders, untyped string parameters) working as is.
+    return {**connection_kwargs(), "cursor_factory": AsyncClientCursor}
+
+
+def configure(conn):
+    if connection.timezone_name:
+        conn.execute(connection.ops.set_time_zone_sql(), [connection.timezone_name])
+
+
+async def aconfigure(conn):
+    if connection.timezone_name:
+        await conn.execute(
+            connection.ops.set_time_zone_sql(), [connection.timezone_name]
+        )
+
+
+def get_sync_pool():
+    """
+    Returns this process's pool of sync connections, opening it on first use.
+    A pool inherited across a fork is replaced rather than shared.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool_pid != pid:
+        with _pool_lock:
+            if _pool_pid != pid:
+                options = settings.DB_POOL
+                _pool = ConnectionPool(
+                    kwargs=connection_kwargs(),
+                    configure=configure,
+                    check=ConnectionPool.check_connection,
+                    min_size=options["MIN_SIZE"],
+                    max_size=options["MAX_SIZE"],
+                    max_idle=options["MAX_IDLE"],
+                    timeout=options["TIMEOUT"],
+                    name="api",
+                    open=True,
+                )
+                _pool_pid = pid
+    return _pool
+
+
+def close_sync_pool():
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = _pool_pid = None
+
+
+@contextlib.contextmanager
+def cursor():
+    """
+    Cursor for the API's raw SQL. With ``DB_POOL`` enabled it runs on a pooled
+    connection, otherwise on Django's (persistent, see ``CONN_MAX_AGE``) one.
+    Pooled connections don't take part in Django transactions.
+    """
+    if not settings.DB_POOL["ENABLED"]:
+        with connection.cursor() as cursor:
+            yield cursor
+        return
+    with get_sync_pool().connection() as conn, conn.cursor() as cursor:
+        yield cursor
+
+
+async def get_pool():
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        options = settings.ASYNC_DB_POOL
+        pool = _pools[loop] = AsyncConnectionPool(
+            kwargs=async_connection_kwargs(),
+            configure=aconfigure,
+            check=AsyncConnectionPool.check_connection,
+            min_size=options["MIN_SIZE"],
+            max_size=options["MAX_SIZE"],
+            max_idle=options["MAX_IDLE"],
+            timeout=options["TIMEOUT"],
+            name="api-async",
+            open=False,
+        )
+        await pool.open()
+    return pool
+
+
+async def close_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
+
+
+async def fetch(sql, params=()):
+    """Runs one statement on a pooled connection and returns all its rows."""
+    pool = await get_pool()
+    async with pool.connection() as conn:
+        cursor = await conn.execute(sql, params)
+        return await cursor.fetchall()
+
+
+def pool_stats():
+    """
+    Returns the counters of this process's pools: sizes, waiting requests,
+    connection errors and time spent waiting for and opening connections.
+    """
+    stats = {"sync": None, "async": None}
+    if _pool is not None and _pool_pid == os.getpid():
+        stats["sync"] = _pool.get_stats()
+    async_pools = list(_pools.values())
+    if async_pools:
+        stats["async"] = async_pools[0].get_stats()
+    return stats
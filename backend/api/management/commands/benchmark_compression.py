@@ -0,0 +1,69 @@
+import time
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.compression import COMPRESSORS, compress
+
+# Levels tried per encoding, from fastest to smallest.
+LEVELS = {
+    "zstd": [1, 3, 6, 9, 19],
+    "br": [1, 4, 5, 6, 9, 11],
+    "gzip": [1, 6, 9],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fetches uncompressed responses from a running server and reports, for "
+        "every encoding and level, the compressed size and the CPU time spent "
+        "compressing, to weigh bytes saved against CPU when picking "
+        "COMPRESSION levels."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("base_url", help="e.g. http://127.0.0.1:8000")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            required=True,
+            help="Path of a typical response. Repeat for several.",
+        )
+        parser.add_argument("--token", help="API token sent as Authorization.")
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Compressions per measurement."
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1.")
+        headers = {"Accept-Encoding": "identity"}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        base_url = options["base_url"].rstrip("/")
+
+        for path in options["paths"]:
+            response = requests.get(base_url + path, headers=headers)
+            if response.status_code >= 400:
+                raise CommandError(f"{path}: HTTP {response.status_code}")
+            body = response.content
+            self.stdout.write(f"{path}: {len(body):,} bytes")
+            for encoding in COMPRESSORS:
+                for level in LEVELS[encoding]:
+                    self.report(body, encoding, level, options["repeat"])
+
+    def report(self, body, encoding, level, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            compressed = compress(body, encoding, level)
+        cpu = (time.process_time() - started) / repeat
+        configured = settings.COMPRESSION["LEVELS"][encoding] == level
+        self.stdout.write(
+            f"  {encoding:>4} {level:>2}{'*' if configured else ' '} "
+            f"{len(compressed):>10,} bytes "
+            f"saved {1 - len(compressed) / max(len(body), 1):6.1%} "
+            f"cpu {cpu * 1000:8.2f}ms "
+            f"{len(body) / max(cpu, 1e-9) / 2**20:8.1f} MB/s"
+        )
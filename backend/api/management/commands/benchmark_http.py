@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import time
+
+import aiohttp
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[
+        min(int(len(sorted_values) * fraction), len(sorted_values) - 1)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Load tests a running server with concurrent GET requests and reports "
+        "throughput and latency percentiles, overall and per path. Run it "
+        "against the WSGI and the ASGI deployment with the same worker count "
+        "to compare them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("base_url", help="e.g. http://127.0.0.1:8000")
+        parser.add_argument(
+            "--path",
+            action="append",
+            dest="paths",
+            required=True,
+            help=(
+                "Path to request. Repeat to mix endpoints; requests cycle "
+                "through the list, so repeating a path weights it."
+            ),
+        )
+        parser.add_argument("--token", help="API token sent as Authorization.")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--duration", type=float, default=20, help="Seconds.")
+        parser.add_argument(
+            "--bust-cache",
+            action="store_true",
+            help=(
+                "Add a unique query parameter to every request so each one "
+                "misses the response cache and reaches the database."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrency"] < 1:
+            raise CommandError("--concurrency must be at least 1.")
+        timings, errors, elapsed = asyncio.run(self.run(options))
+
+        total = sum(len(values) for values in timings.values())
+        self.stdout.write(
+            f"{total} requests in {elapsed:.1f}s with {options['concurrency']} "
+            f"clients: {total / elapsed:,.1f} requests/s, {errors} errors"
+        )
+        rows = [("all", sorted(itertools.chain(*timings.values())))]
+        rows.extend((path, sorted(values)) for path, values in timings.items())
+        for path, values in rows:
+            self.stdout.write(
+                f"  {path}: n={len(values)} "
+                f"p50={percentile(values, 0.5):.1f}ms "
+                f"p90={percentile(values, 0.9):.1f}ms "
+                f"p99={percentile(values, 0.99):.1f}ms "
+                f"max={values[-1] if values else 0:.1f}ms"
+            )
+
+    async def run(self, options):
+        headers = {}
+        if options["token"]:
+            headers["Authorization"] = f"Token {options['token']}"
+        base_url = options["base_url"].rstrip("/")
+        paths = itertools.cycle(options["paths"])
+        counter = itertools.count()
+        timings = {path: [] for path in options["paths"]}
+        errors = 0
+        deadline = time.monotonic() + options["duration"]
+
+        async def client(session):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                path = next(paths)
+                url = base_url + path
+                if options["bust_cache"]:
+                    url += ("&" if "?" in url else "?") + f"_bench={next(counter)}"
+                started = time.perf_counter()
+                try:
+                    async with session.get(url) as response:
+                        await response.read()
+                        ok = response.status < 400
+                except aiohttp.ClientError:
+                    ok = False
+                if ok:
+                    timings[path].append((time.perf_counter() - started) * 1000)
+                else:
+                    errors += 1
+
+        connector = aiohttp.TCPConnector(limit=options["concurrency"])
+        started = time.monotonic()
+        async with aiohttp.ClientSession(
+            headers=headers, connector=connector
+        ) as session:
+            await asyncio.gather(
+                *(client(session) for _ in range(options["concurrency"]))
+            )
+        return timings, errors, time.monotonic() - started
@@ -0,0 +1,95 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api import views
+from api.pagination import RawQuery
+from api.renderers import FastJSONRenderer
+
+EXPLANATION_VIEWS = [
+    views.PathPredictionListView,
+    views.MetaPathPredictionListView,
+    views.SourceEdgePredictionListView,
+    views.TargetEdgePredictionListView,
+]
+
+
+def get_queries():
+    view_class = views.DrugDiseaseProbabilityListView
+    queries = [
+        (
+            view_class.__name__,
+            view_class().get_query("", []),
+            views.DrugDiseaseProbabilitySerializer,
+        )
+    ]
+    for view_class in EXPLANATION_VIEWS:
+        query = RawQuery(
+            select=view_class.select,
+            from_sql=f"{view_class.table} {view_class.alias}",
+            ordering=view_class.get_ordering(),
+        )
+        queries.append((view_class.__name__, query, view_class.serializer_class))
+    return queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Reads a page of rows for each raw SQL list view, then times turning "
+        "them into JSON the old way (serializer and stdlib JSONRenderer) and "
+        "the new way (trusted rows and FastJSONRenderer), per row."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1000, help="Rows per view.")
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Runs per measurement."
+        )
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1 or options["repeat"] < 1:
+            raise CommandError("--rows and --repeat must be at least 1.")
+        for name, query, serializer_class in get_queries():
+            rows = query.fetch(*query.slice_sql(0, options["rows"]))
+            if not rows:
+                self.stdout.write(f"{name}: no rows")
+                continue
+
+            def serialize():
+                return serializer_class(query.format_rows(rows), many=True).data
+
+            def trust():
+                return serializer_class.trusted_data(query.format_rows(rows))
+
+            before, data = self.measure(serialize, options["repeat"])
+            after, trusted = self.measure(trust, options["repeat"])
+            render_before, content = self.measure(
+                lambda: JSONRenderer().render(data), options["repeat"]
+            )
+            render_after, fast_content = self.measure(
+                lambda: FastJSONRenderer().render(trusted), options["repeat"]
+            )
+            if json.loads(content, object_pairs_hook=list) != json.loads(
+                fast_content, object_pairs_hook=list
+            ):
+                raise CommandError(f"{name}: the two paths render different JSON.")
+
+            per_row = 10**6 / len(rows)
+            total_before = (before + render_before) * per_row
+            total_after = (after + render_after) * per_row
+            self.stdout.write(
+                f"{name} ({len(rows)} rows, us/row): "
+                f"serializer {before * per_row:.2f} -> trusted {after * per_row:.2f}, "
+                f"render {render_before * per_row:.2f} -> {render_after * per_row:.2f}, "
+                f"total {total_before:.2f} -> {total_after:.2f} "
+                f"({total_before / total_after:.1f}x)"
+            )
+
+    def measure(self, func, repeat):
+        result = func()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return (time.perf_counter() - started) / repeat, result
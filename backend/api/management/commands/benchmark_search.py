@@ -0,0 +1,141 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.views import DrugDiseaseProbabilityListView
+
+SYNTHETIC_TABLES_SQL = """
+    CREATE TEMPORARY TABLE drug (
+        dbid varchar(20) PRIMARY KEY, name varchar(200) NOT NULL
+    ) ON COMMIT DROP;
+    CREATE TEMPORARY TABLE disease (
+        doid varchar(50) PRIMARY KEY, name varchar(200) NOT NULL
+    ) ON COMMIT DROP;
+    CREATE TEMPORARY TABLE drug_disease_probability (
+        id bigserial PRIMARY KEY,
+        drug_id varchar(20) NOT NULL,
+        disease_id varchar(50) NOT NULL,
+        prediction double precision NOT NULL,
+        compound_prediction double precision NOT NULL,
+        disease_prediction double precision NOT NULL,
+        category varchar(100) NOT NULL,
+        trial_count integer NOT NULL
+    ) ON COMMIT DROP;
+
+    INSERT INTO drug
+    SELECT 'DB' || lpad(i::text, 5, '0'),
+           initcap(substr(md5(i::text), 1, 7)) || (ARRAY['mab', 'nib', 'pril', 'statin', 'olol'])[1 + i %% 5]
+    FROM generate_series(1, %(drugs)s) AS i;
+    INSERT INTO disease
+    SELECT 'DOID:' || i,
+           initcap(substr(md5('d' || i), 1, 6)) || (ARRAY[' disease', ' syndrome', 'itis', ' cancer'])[1 + i %% 4]
+    FROM generate_series(1, %(diseases)s) AS i;
+    INSERT INTO drug_disease_probability
+        (drug_id, disease_id, prediction, compound_prediction, disease_prediction, category, trial_count)
+    SELECT d.dbid, dis.doid, random(), random(), random(),
+           (ARRAY['DM', 'SYM', 'NOT', ''])[1 + (random() * 3)::int], (random() * 5)::int
+    FROM drug d CROSS JOIN disease dis;
+
+    CREATE INDEX ON drug (name);
+    CREATE INDEX ON disease (name);
+    CREATE INDEX ON drug_disease_probability (drug_id);
+    CREATE INDEX ON drug_disease_probability (disease_id);
+    CREATE INDEX ON drug USING gin (name gin_trgm_ops);
+    CREATE INDEX ON disease USING gin (name gin_trgm_ops);
+    ANALYZE drug;
+    ANALYZE disease;
+    ANALYZE drug_disease_probability;
+"""
+
+FROM_SQL = """
+    FROM drug_disease_probability ddp
+    JOIN drug d ON ddp.drug_id = d.dbid
+    JOIN disease dis ON ddp.disease_id = dis.doid
+    {search_sql}
+"""
+COUNT_SQL = "SELECT COUNT(*) " + FROM_SQL
+PAGE_SQL = """
+    SELECT ddp.id, d.name, dis.name, ddp.prediction, ddp.compound_prediction,
+           ddp.disease_prediction, ddp.category, ddp.trial_count
+    """ + FROM_SQL + "ORDER BY ddp.id LIMIT 20"
+
+
+def legacy_search_sql(search_query, fields):
+    # The LIKE '%term%' filter the list endpoint used before the trigram search.
+    search_terms = search_query.split()
+    search_clauses = [
+        f"({' OR '.join(f'{field} LIKE %s' for field in fields)})" for _ in search_terms
+    ]
+    params = [f"%{term}%" for term in search_terms for _ in fields]
+    return "WHERE " + " AND ".join(search_clauses), params
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the plans and timings of the legacy LIKE search and the "
+        "trigram-resolved search on a synthetic drug_disease_probability table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drugs", type=int, default=1000)
+        parser.add_argument("--diseases", type=int, default=1000)
+        parser.add_argument("--search", default="statin cancer")
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        search_query = options["search"]
+        with transaction.atomic(), connection.cursor() as cursor:
+            self.stdout.write(
+                f"Building {options['drugs'] * options['diseases']:,} synthetic pairs..."
+            )
+            cursor.execute(SYNTHETIC_TABLES_SQL, options)
+
+            legacy_sql, legacy_params = legacy_search_sql(
+                search_query, ["d.name", "dis.name"]
+            )
+            started = time.perf_counter()
+            trigram_sql, trigram_params = self.trigram_search_sql(cursor, search_query)
+            resolve_ms = (time.perf_counter() - started) * 1000
+
+            self.report(cursor, "legacy LIKE", legacy_sql, legacy_params, options)
+            self.report(cursor, "trigram", trigram_sql, trigram_params, options)
+            self.stdout.write(f"trigram term resolution: {resolve_ms:.2f} ms")
+            transaction.set_rollback(True)
+
+    def trigram_search_sql(self, cursor, search_query):
+        # Like build_search_sql, but resolving the terms on this cursor: the
+        # temporary tables are invisible to the pooled connections (DB_POOL)
+        # the view's queries may run on.
+        view = DrugDiseaseProbabilityListView()
+        lookups = {
+            "ddp.drug_id": ("drug", "dbid"),
+            "ddp.disease_id": ("disease", "doid"),
+        }
+        search_terms = search_query.split()
+        cursor.execute(*view.search_terms_sql(search_terms, lookups.values()))
+        matches = view.group_search_matches(cursor.fetchall())
+        return view.search_where_sql(search_terms, lookups, matches)
+
+    def report(self, cursor, label, search_sql, params, options):
+        # Mirrors one page request: the row count plus the first page.
+        count_sql = COUNT_SQL.format(search_sql=search_sql)
+        page_sql = PAGE_SQL.format(search_sql=search_sql)
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {count_sql}", params)
+        plan = "\n".join(row[0] for row in cursor.fetchall())
+
+        timings = []
+        for _ in range(options["repeat"]):
+            started = time.perf_counter()
+            cursor.execute(count_sql, params)
+            (count,) = cursor.fetchone()
+            cursor.execute(page_sql, params)
+            cursor.fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label}: {count} rows"))
+        self.stdout.write(plan)
+        self.stdout.write(
+            f"count + first page: best {min(timings):.2f} ms, median "
+            f"{sorted(timings)[len(timings) // 2]:.2f} ms over {len(timings)} runs"
+        )
@@ -0,0 +1,340 @@
+import hashlib
+import json
+
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import InvalidPage
+from django.db import connection
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from . import db
+
+
+class RawQuery:
+    """
+    Lazy, sliceable wrapper around a raw SELECT.
+
+    Django's ``Paginator`` only needs ``count()`` and slicing, so handing it a
+    ``RawQuery`` instead of a list makes ``PageNumberPagination`` fetch just the
+    requested page with LIMIT/OFFSET and count the rows with a separate query.
+
+    Given a ``count_version`` that changes whenever the rows may have, such as
+    a view's cache key prefix, the exact count is cached under it, so every
+    page of a listing shares one COUNT(*).
+    """
+
+    count_timeout = 60 * 60 * 24
+
+    def __init__(
+        self, select, from_sql, where_sql="", params=(), ordering=(), count_version=None
+    ):
+        self.select = list(select)
+        self.from_sql = from_sql
+        self.where_sql = where_sql
+        self.params = list(params)
+        self.ordering = list(ordering)
+        self.count_version = count_version
+        self._count = None
+        self._prefetched = {}
+
+    @property
+    def columns(self):
+        return [alias for alias, _ in self.select]
+
+    def select_sql(self, extra=()):
+        return ", ".join(
+            f"{expression} AS {alias}" for alias, expression in [*self.select, *extra]
+        )
+
+    def order_by_sql(self, reverse=False):
+        if not self.ordering:
+            return ""
+        terms = []
+        for field in self.ordering:
+            descending = field.startswith("-")
+            if reverse:
+                descending = not descending
+            terms.append(f"{field.lstrip('-')} {'DESC' if descending else 'ASC'}")
+        return "ORDER BY " + ", ".join(terms)
+
+    def fetch(self, sql, params):
+        key = (sql, repr(params))
+        if key in self._prefetched:
+            return self._prefetched.pop(key)
+        with db.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    async def afetch(self, sql, params):
+        """
+        Runs a statement through the async connection pool and keeps the rows
+        for the next ``fetch`` of the same statement. Async views await the
+        statements a paginator is about to run, then let it run synchronously.
+        """
+        rows = await db.fetch(sql, params)
+        self._prefetched[(sql, repr(params))] = rows
+        return rows
+
+    def count(self):
+        if self._count is None:
+            key = self.count_cache_key()
+            if key:
+                self._count = cache.get(key)
+            if self._count is None:
+                self._count = self.fetch(*self.count_sql())[0][0]
+                if key:
+                    cache.set(key, self._count, self.count_timeout)
+        return self._count
+
+    async def acount(self):
+        if self._count is None:
+            key = self.count_cache_key()
+            if key:
+                self._count = await cache.aget(key)
+            if self._count is None:
+                self._count = (await self.afetch(*self.count_sql()))[0][0]
+                if key:
+                    await cache.aset(key, self._count, self.count_timeout)
+        return self._count
+
+    def count_sql(self):
+        return f"SELECT COUNT(*) FROM {self.from_sql} {self.where_sql}", self.params
+
+    def count_cache_key(self):
+        if self.count_version is None:
+            return None
+        sql, params = self.count_sql()
+        digest = hashlib.md5(f"{sql}|{params!r}".encode()).hexdigest()
+        return f"count:{self.count_version}:{digest}"
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key : key + 1][0]
+        return self.format_rows(self.fetch(*self.slice_sql(key.start, key.stop)))
+
+    def slice_sql(self, start, stop):
+        start = start or 0
+        sql = (
+            f"SELECT {self.select_sql()} FROM {self.from_sql} {self.where_sql} "
+            f"{self.order_by_sql()} OFFSET %s"
+        )
+        params = [*self.params, start]
+        if stop is not None:
+            sql += " LIMIT %s"
+            params.append(max(stop - start, 0))
+        return sql, params
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def iterator(self, chunk_size=2000):
+        """
+        Yields row tuples through a server-side cursor, holding at most
+        ``chunk_size`` rows in memory at a time.
+        """
+        sql = (
+            f"SELECT {self.select_sql()} FROM {self.from_sql} {self.where_sql} "
+            f"{self.order_by_sql()}"
+        )
+        with connection.chunked_cursor() as cursor:
+            cursor.execute(sql, self.params)
+            while rows := cursor.fetchmany(chunk_size):
+                yield from rows
+
+    def format_rows(self, rows):
+        columns = self.columns
+        return [dict(zip(columns, row)) for row in rows]
+
+    def json_sql(self):
+        """
+        Returns a scalar subquery aggregating the first ``%s`` rows (the last
+        parameter) into a JSON array of objects keyed by column alias.
+        """
+        keys = [
+            (f"_key{idx}", field.lstrip("-")) for idx, field in enumerate(self.ordering)
+        ]
+        pairs = ", ".join(f"'{alias}', t.{alias}" for alias in self.columns)
+        order = ", ".join(
+            f"t._key{idx} {'DESC' if field.startswith('-') else 'ASC'}"
+            for idx, field in enumerate(self.ordering)
+        )
+        return (
+            f"(SELECT COALESCE(json_agg(json_build_object({pairs})"
+            f"{' ORDER BY ' + order if order else ''}), '[]') "
+            f"FROM (SELECT {self.select_sql(keys)} FROM {self.from_sql} "
+            f"{self.where_sql} {self.order_by_sql()} LIMIT %s) t)"
+        )
+
+    def keyset_sql(self, reverse=False):
+        # Rows strictly after ``position`` in the (possibly reversed) ordering.
+        # Uniform directions become a row comparison, which an index on the
+        # ordering columns can serve directly.
+        fields = [field.lstrip("-") for field in self.ordering]
+        descending = [field.startswith("-") != reverse for field in self.ordering]
+        if all(descending) or not any(descending):
+            operator = "<" if descending[0] else ">"
+            placeholders = ", ".join(["%s"] * len(fields))
+            return f"({', '.join(fields)}) {operator} ({placeholders})", list(
+                range(len(fields))
+            )
+        clauses, positions = [], []
+        for idx, field in enumerate(fields):
+            equal = [f"{prior} = %s" for prior in fields[:idx]]
+            operator = "<" if descending[idx] else ">"
+            clauses.append(" AND ".join([*equal, f"{field} {operator} %s"]))
+            positions.extend(range(idx + 1))
+        return "(" + " OR ".join(f"({clause})" for clause in clauses) + ")", positions
+
+    def seek(self, position, limit, reverse=False):
+        """
+        Returns up to ``limit`` rows following ``position`` (the ordering values
+        of a boundary row) as ``(rows, keys)``, without any OFFSET scan.
+        """
+        rows = self.fetch(*self.seek_sql(position, limit, reverse))
+        width = len(self.select)
+        return self.format_rows(rows), [list(row[width:]) for row in rows]
+
+    def seek_sql(self, position, limit, reverse=False):
+        keys = [
+            (f"_key{idx}", field.lstrip("-")) for idx, field in enumerate(self.ordering)
+        ]
+        where_sql, params = self.where_sql, list(self.params)
+        if position is not None:
+            keyset_sql, positions = self.keyset_sql(reverse)
+            joiner = " AND " if where_sql else "WHERE "
+            where_sql = f"{where_sql}{joiner}{keyset_sql}"
+            params.extend(position[idx] for idx in positions)
+        sql = (
+            f"SELECT {self.select_sql(keys)} FROM {self.from_sql} {where_sql} "
+            f"{self.order_by_sql(reverse)} LIMIT %s"
+        )
+        return sql, [*params, limit]
+
+
+class RawPageNumberPagination(PageNumberPagination):
+    """``PageNumberPagination`` that async views can also run over a ``RawQuery``."""
+
+    async def apaginate_queryset(self, query, request, view=None):
+        page_size = self.get_page_size(request)
+        if page_size:
+            paginator = self.django_paginator_class(query, page_size)
+            await query.acount()
+            try:
+                number = paginator.validate_number(
+                    self.get_page_number(request, paginator)
+                )
+            except InvalidPage:
+                # paginate_queryset raises the 404.
+                pass
+            else:
+                start = (number - 1) * page_size
+                stop = min(start + page_size, query.count())
+                await query.afetch(*query.slice_sql(start, stop))
+        return self.paginate_queryset(query, request, view)
+
+
+class CursorSerializer:
+    """``signing`` serializer for cursors, which may hold dates or decimals."""
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"), default=str).encode("latin-1")
+
+    def loads(self, data):
+        return json.loads(data.decode("latin-1"))
+
+
+class RawCursorPagination(BasePagination):
+    """
+    Keyset pagination for ``RawQuery`` results, enabled with ``?cursor=``.
+
+    The cursor is an opaque encoding of the ordering values of the boundary row,
+    so every page costs the same index range scan however deep the client goes.
+    Cursors are signed, so the values compared in SQL are always ones read from
+    the ordering columns, never arbitrary client input.
+    """
+
+    cursor_query_param = "cursor"
+    cursor_salt = "api.pagination.RawCursorPagination"
+    invalid_cursor_message = "Invalid cursor"
+
+    def __init__(self):
+        self.page_size = api_settings.PAGE_SIZE
+
+    def paginate_queryset(self, query, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        position, reverse = self.decode_position(query, request)
+        rows, keys = query.seek(position, self.page_size + 1, reverse)
+        has_more = len(rows) > self.page_size
+        rows, keys = rows[: self.page_size], keys[: self.page_size]
+        if reverse:
+            rows.reverse()
+            keys.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.next_position = keys[-1] if keys else None
+        self.previous_position = keys[0] if keys else None
+        return rows
+
+    async def apaginate_queryset(self, query, request, view=None):
+        position, reverse = self.decode_position(query, request)
+        await query.afetch(*query.seek_sql(position, self.page_size + 1, reverse))
+        return self.paginate_queryset(query, request, view)
+
+    def decode_position(self, query, request):
+        position, reverse = self.decode_cursor(request)
+        if position is not None and len(position) != len(query.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = signing.loads(
+                encoded, salt=self.cursor_salt, serializer=CursorSerializer
+            )
+            return list(data["p"]), bool(data.get("r"))
+        except (signing.BadSignature, TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, position, reverse):
+        data = {"p": position}
+        if reverse:
+            data["r"] = 1
+        encoded = signing.dumps(
+            data, salt=self.cursor_salt, serializer=CursorSerializer
+        )
+        return replace_query_param(
+            remove_query_param(self.base_url, "page"),
+            self.cursor_query_param,
+            encoded,
+        )
+
+    def get_next_link(self):
+        if not self.has_next or self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "previous": self.get_previous_link(),
+                "results": data,
+            }
+        )
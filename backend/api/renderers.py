@@ -0,0 +1,87 @@
+import csv
+import json
+import math
+
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+def finite(data):
+    """
+    Returns ``data`` with NaN and infinite floats replaced by None. JSON has no
+    spelling for them, and orjson writes null, so every JSON renderer does.
+    """
+    if isinstance(data, float):
+        return data if math.isfinite(data) else None
+    if isinstance(data, dict):
+        return {key: finite(value) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [finite(value) for value in data]
+    return data
+
+
+class StreamingRenderer(BaseRenderer):
+    """
+    Renderer for views returning a ``StreamingHttpResponse``. Content negotiation
+    (including ``?format=``) picks the renderer, whose ``stream`` method then
+    encodes rows one at a time as they are read from the database.
+    """
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only non-streamed responses, such as errors, reach this method.
+        if data is None:
+            return b""
+        rows = self.stream(list(data), [list(data.values())])
+        return "".join(rows).encode(self.charset)
+
+    def stream(self, columns, rows):
+        raise NotImplementedError
+
+
+class NDJSONRenderer(StreamingRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def stream(self, columns, rows):
+        for row in rows:
+            yield json.dumps(dict(zip(columns, finite(row)))) + "\n"
+
+
+class CSVRenderer(StreamingRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    class Echo:
+        def write(self, value):
+            return value
+
+    def stream(self, columns, rows):
+        writer = csv.writer(self.Echo())
+        yield writer.writerow(columns)
+        for row in rows:
+            yield writer.writerow(row)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    ``JSONRenderer`` encoding with orjson, which is several times faster on
+    long result lists. Types orjson doesn't know go through DRF's encoder, and
+    indented output, as requested in the Accept header, through the stdlib.
+    NaN and infinite floats render as null on both paths, where DRF's strict
+    encoder would fail.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(finite(data), accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=self.encoder_class().default)
+        # Like JSONRenderer, escape the separators that break JSON in JS.
+        if b"\xe2\x80" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+                b"\xe2\x80\xa9", b"\\u2029"
+            )
+        return ret
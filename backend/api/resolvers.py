@@ -0,0 +1,38 @@
+import functools
+
+from django.db.models import Q
+
+from drugs.models import Drug, normalize_name
+
+from .versioning import get_versions
+
+
+def resolve_drug(identifier):
+    """
+    Returns the dbid of the drug ``identifier`` refers to, or None. The
+    identifier may be a dbid, ChEMBL id, InChIKey or name; names match ignoring
+    case, whitespace and punctuation.
+    """
+    # Keying on the versions lets a drug edit in any worker retire stale entries.
+    return _resolve_drug(identifier, tuple(get_versions(["drugs"])))
+
+
+@functools.lru_cache(maxsize=4096)
+def _resolve_drug(identifier, versions):
+    code = identifier.strip().upper()
+    normalized = normalize_name(identifier)
+    if not code:
+        return None
+    lookup = Q(dbid=code) | Q(chembl_id=code) | Q(inchikey=code)
+    if normalized:
+        lookup |= Q(normalized_name=normalized)
+    matches = list(
+        Drug.objects.filter(lookup)
+        .order_by("dbid")
+        .values_list("dbid", "chembl_id", "inchikey")
+    )
+    # Identifiers are unique, so prefer them over the first name match.
+    for dbid, chembl_id, inchikey in matches:
+        if code in (dbid, chembl_id, inchikey):
+            return dbid
+    return matches[0][0] if matches else None
@@ -10,11 +10,25 @@ from drugs.models import (
     DiseaseIndication,
     MechanismOfAction,
 )
+from drugs.scores import compact, decode_percentile
 from djoser.serializers import UserCreateSerializer as BaseUserCreateSerializer
 from .models import CustomUser
 
 
-class DrugSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    Takes an extra ``fields`` argument limiting which of ``Meta.fields`` are
+    serialized.
+    """
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class DrugSerializer(DynamicFieldsModelSerializer):
     class Meta:
         model = Drug
         fields = [
@@ -47,22 +61,71 @@ class DiseaseSerializer(serializers.ModelSerializer):
         fields = ["name"]
 
 
-class DrugDiseaseProbabilitySerializer(serializers.Serializer):
+class PercentileField(serializers.FloatField):
+    """Decodes percentiles read with raw SQL from the compact schema."""
+
+    def to_representation(self, value):
+        return super().to_representation(decode_percentile(value))
+
+
+class RawRowSerializer(serializers.Serializer):
+    """
+    Serializer for rows read with raw SQL from a cursor. Their values already
+    have the types of the declared fields, so ``trusted_data`` can return them
+    as they are, in field order and with percentiles decoded, without running
+    each field's ``to_representation``.
+    """
+
+    @classmethod
+    def trusted_data(cls, rows):
+        fields = cls._declared_fields
+        if rows and list(rows[0]) != list(fields):
+            rows = [{name: row[name] for name in fields} for row in rows]
+        if compact():
+            percentiles = [
+                name
+                for name, field in fields.items()
+                if isinstance(field, PercentileField)
+            ]
+            for row in rows:
+                for name in percentiles:
+                    row[name] = decode_percentile(row[name])
+        return rows
+
+
+class DrugDiseaseProbabilitySerializer(RawRowSerializer):
     id = serializers.IntegerField()
     drug_name = serializers.CharField()
     disease_name = serializers.CharField()
     prediction = serializers.FloatField()
-    compound_prediction = serializers.FloatField()
-    disease_prediction = serializers.FloatField()
+    compound_prediction = PercentileField()
+    disease_prediction = PercentileField()
     category = serializers.CharField()
     trial_count = serializers.IntegerField()
 
 
+class RankedPredictionSerializer(DrugDiseaseProbabilitySerializer):
+    rank = serializers.IntegerField()
+    drug_id = serializers.CharField()
+    disease_id = serializers.CharField()
+
+
+class PairSerializer(serializers.Serializer):
+    drug = serializers.CharField(max_length=250)
+    disease = serializers.CharField(max_length=200)
+
+
+class PairBatchSerializer(serializers.Serializer):
+    pairs = serializers.ListField(
+        child=PairSerializer(), allow_empty=False, max_length=1000
+    )
+
+
 class BasePathPredictionSerializer(serializers.ModelSerializer):
     drug_disease_probability = DrugDiseaseProbabilitySerializer()
 
 
-class PathPredictionSerializer(serializers.Serializer):
+class PathPredictionSerializer(RawRowSerializer):
     percent_of_prediction = serializers.FloatField()
     percent_of_dwpc = serializers.FloatField()
     metapath = serializers.CharField(max_length=255)
@@ -70,7 +133,7 @@ class PathPredictionSerializer(serializers.Serializer):
     verbose_path = serializers.CharField(max_length=255)
 
 
-class MetapathPredictionSerializer(serializers.Serializer):
+class MetapathPredictionSerializer(RawRowSerializer):
     metapath = serializers.CharField(max_length=255)
     percent_of_prediction = serializers.FloatField()
     path_count = serializers.IntegerField()
@@ -78,14 +141,14 @@ class MetapathPredictionSerializer(serializers.Serializer):
     verbose = serializers.CharField(max_length=255)
 
 
-class SourceEdgePredictionSerializer(serializers.Serializer):
+class SourceEdgePredictionSerializer(RawRowSerializer):
     source_edge = serializers.CharField(max_length=255)
     percent_of_prediction = serializers.FloatField()
     path_count = serializers.IntegerField()
     distinct_metapaths = serializers.IntegerField()
 
 
-class TargetEdgePredictionSerializer(serializers.Serializer):
+class TargetEdgePredictionSerializer(RawRowSerializer):
     target_edge = serializers.CharField(max_length=255)
     percent_of_prediction = serializers.FloatField()
     path_count = serializers.IntegerField()
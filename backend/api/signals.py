@@ -0,0 +1,143 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from drugs.matrix import write_matrix
+from drugs.models import (
+    Disease,
+    DiseaseIndication,
+    Drug,
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    ExplanationTerm,
+    MechanismOfAction,
+    MetaPathPrediction,
+    PathPrediction,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+)
+from drugs.signals import dataset_changed, explanations_deleted, predictions_refreshed
+
+from .versioning import DATASET, bump, get_versions
+
+EXPLANATION_MODELS = [
+    PathPrediction,
+    MetaPathPrediction,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+]
+
+
+class PendingBump:
+    """The scopes a transaction changed, bumped together once it commits."""
+
+    def __init__(self, scopes):
+        self.scopes = set(scopes)
+
+    def __call__(self):
+        bump(*self.scopes)
+
+
+def bump_on_commit(*scopes):
+    for _, func, _ in transaction.get_connection().run_on_commit:
+        if isinstance(func, PendingBump):
+            func.scopes.update(scopes)
+            return
+    transaction.on_commit(PendingBump(scopes))
+
+
+@receiver(pre_save, sender=Drug)
+@receiver(pre_save, sender=Disease)
+def remember_previous_name(sender, instance, **kwargs):
+    instance._previous_name = (
+        sender.objects.filter(pk=instance.pk).values_list("name", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Drug)
+@receiver(post_delete, sender=Drug)
+def drug_changed(sender, instance, **kwargs):
+    previous_name = getattr(instance, "_previous_name", None)
+    if kwargs.get("created") is False and previous_name != instance.name:
+        DrugDiseasePrediction.refresh_on_commit()
+    bump_on_commit("drugs", "indications", "mechanisms", f"drug:{instance.dbid}")
+
+
+@receiver(post_save, sender=Disease)
+@receiver(post_delete, sender=Disease)
+def disease_changed(sender, instance, **kwargs):
+    previous_name = getattr(instance, "_previous_name", None)
+    if kwargs.get("created") is False and previous_name != instance.name:
+        DrugDiseasePrediction.refresh_on_commit()
+    bump_on_commit("diseases")
+
+
+@receiver(post_save, sender=DrugDiseaseProbability)
+@receiver(post_delete, sender=DrugDiseaseProbability)
+def probability_changed(sender, instance, **kwargs):
+    DrugDiseasePrediction.refresh_on_commit()
+    bump_on_commit(f"pair:{instance.pk}", f"drug:{instance.drug_id}")
+
+
+@receiver(post_delete, sender=DrugDiseaseProbability)
+def probability_deleted(sender, instance, **kwargs):
+    # The pair's explanations went with it, in one cascading DELETE per table.
+    bump_on_commit(
+        *(f"explanations:{model._meta.db_table}" for model in EXPLANATION_MODELS)
+    )
+
+
+@receiver(post_save, sender=PathPrediction)
+@receiver(post_save, sender=MetaPathPrediction)
+@receiver(post_save, sender=SourceEdgePrediction)
+@receiver(post_save, sender=TargetEdgePrediction)
+def explanation_changed(sender, instance, **kwargs):
+    bump_on_commit(
+        f"pair:{instance.drug_disease_probability_id}",
+        f"explanations:{sender._meta.db_table}",
+    )
+
+
+@receiver(explanations_deleted)
+def explanation_deleted(sender, pair_ids, **kwargs):
+    bump_on_commit(
+        *(f"pair:{pk}" for pk in pair_ids), f"explanations:{sender._meta.db_table}"
+    )
+
+
+@receiver(post_save, sender=ExplanationTerm)
+@receiver(post_delete, sender=ExplanationTerm)
+def explanation_term_changed(sender, instance, **kwargs):
+    # Terms appear in the explanations of any number of pairs.
+    bump_on_commit(DATASET)
+
+
+@receiver(post_save, sender=DiseaseIndication)
+@receiver(post_delete, sender=DiseaseIndication)
+def indication_changed(sender, instance, **kwargs):
+    bump_on_commit("indications")
+
+
+@receiver(post_save, sender=MechanismOfAction)
+@receiver(post_delete, sender=MechanismOfAction)
+def mechanism_changed(sender, instance, **kwargs):
+    bump_on_commit("mechanisms")
+
+
+def write_current_matrix():
+    write_matrix(version=get_versions(["predictions"])[-1])
+
+
+@receiver(predictions_refreshed)
+def predictions_view_refreshed(sender, **kwargs):
+    bump_on_commit("predictions")
+    # Queued after the bump, so the matrix records the version it matches and
+    # the top views can use it (see TopPredictionsView.current_matrix).
+    pending = transaction.get_connection().run_on_commit
+    if not any(func == write_current_matrix for _, func, _ in pending):
+        transaction.on_commit(write_current_matrix)
+
+
+@receiver(dataset_changed)
+def dataset_version_changed(sender, **kwargs):
+    bump(DATASET)
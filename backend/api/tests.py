@@ -1,3 +1,1352 @@
-from django.test import TestCase
+import asyncio
+import base64
+import contextlib
+import gzip
+import io
+import json
+import os
+import struct
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.core import signing
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from api import async_views, compression, db, pagination, views
+from api.cache import SQLiteLRUCache
+from api.models import CustomUser
+from api.pagination import RawCursorPagination, RawQuery
+from api.renderers import FastJSONRenderer
+from api.versioning import bump
+from drugs.checks import check_score_columns
+from drugs.models import (
+    Disease,
+    Drug,
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    ExplanationTerm,
+    MetaPathPrediction,
+    PathPrediction,
+    PathPredictionSummary,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+)
+from drugs.scores import PERCENTILE_SCALE
+
+
+def term(name):
+    return ExplanationTerm.objects.get_or_create(name=name)[0]
+
+
+def create_pair(disease=None, **fields):
+    """
+    Creates a prediction for Aspirin (DB00001), against Headache (DOID:1)
+    unless another ``disease`` is given.
+    """
+    drug, _ = Drug.objects.get_or_create(
+        dbid="DB00001", defaults={"name": "Aspirin", "chembl_id": "C1"}
+    )
+    if disease is None:
+        disease, _ = Disease.objects.get_or_create(
+            doid="DOID:1", defaults={"name": "Headache"}
+        )
+    return DrugDiseaseProbability.objects.create(drug=drug, disease=disease, **fields)
+
+
+def create_paths(pair, percents, percent_of_dwpc=None):
+    for rank, percent in enumerate(percents):
+        PathPrediction.objects.create(
+            drug_disease_probability=pair,
+            percent_of_prediction=percent,
+            percent_of_dwpc=percent if percent_of_dwpc is None else percent_of_dwpc,
+            metapath=term("CbGaD"),
+            length=3,
+            verbose_path=f"path {rank}",
+        )
+
+
+def create_explanations(pair, percents):
+    """Creates a path, metapath, source edge and target edge per percent."""
+    create_paths(pair, percents)
+    for rank, percent in enumerate(percents):
+        MetaPathPrediction.objects.create(
+            drug_disease_probability=pair,
+            metapath=term(f"metapath {rank}"),
+            percent_of_prediction=percent,
+            path_count=rank,
+            length=3,
+            verbose=term("Compound binds Gene associates Disease"),
+        )
+        SourceEdgePrediction.objects.create(
+            drug_disease_probability=pair,
+            source_edge=term(f"source {rank}"),
+            percent_of_prediction=percent,
+            path_count=rank,
+            distinct_metapaths=1,
+        )
+        TargetEdgePrediction.objects.create(
+            drug_disease_probability=pair,
+            target_edge=term(f"target {rank}"),
+            percent_of_prediction=percent,
+            path_count=rank,
+            distinct_metapaths=1,
+        )
+
+
+class APITestMixin:
+    """Starts every test with an empty cache and a client logged in as a reader."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.user = CustomUser.objects.create_user("reader", "reader@example.com", "pw")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def on_commit(self):
+        """
+        Runs the on_commit callbacks, such as materialized view refreshes, of
+        the writes in the block. Autocommit runs them as each write commits.
+        """
+        return contextlib.nullcontext()
+
+
+MATRIX_PATH = os.path.join(tempfile.mkdtemp(), "predictions.matrix")
+
+
+# Tests refresh the read view as each write commits, not in the background.
+@override_settings(PREDICTIONS_REFRESH_DELAY=0, PREDICTION_MATRIX_PATH=MATRIX_PATH)
+class APITestCase(APITestMixin, TestCase):
+    @contextlib.contextmanager
+    def on_commit(self):
+        yield
+        # Run and forget every callback registered so far, as a commit would.
+        while connection.run_on_commit:
+            sids, func, robust = connection.run_on_commit.pop(0)
+            func()
+
+
+@override_settings(PREDICTIONS_REFRESH_DELAY=0, PREDICTION_MATRIX_PATH=MATRIX_PATH)
+class APITransactionTestCase(APITestMixin, TransactionTestCase):
+    """
+    For tests that need their data committed: the connection pools can't see a
+    test transaction, and VACUUM or convert_scores can't run inside one.
+    """
+
+    def setUp(self):
+        super().setUp()
+        # The flush after each test empties the tables but not the view.
+        DrugDiseasePrediction.refresh(concurrently=False)
+
+
+class ExplanationQueryPlanTests(APITransactionTestCase):
+    """
+    The explanation endpoints filter on one pair and order by
+    -percent_of_prediction, which the (pair, -percent, -id) indexes should serve
+    without a sort.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.pair = create_pair()
+        other = create_pair(Disease.objects.create(doid="DOID:2", name="Fever"))
+        for pair in [self.pair, other]:
+            create_explanations(pair, [rank / 50 for rank in range(50)])
+
+        with connection.cursor() as cursor:
+            for table in [
+                "path_prediction",
+                "metapath_prediction",
+                "sourceedge_prediction",
+                "targetedge_prediction",
+            ]:
+                cursor.execute(f"VACUUM ANALYZE {table}")
+
+    def explain_page_query(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {"search": self.pair.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["count"], 50)
+        percents = [row["percent_of_prediction"] for row in response.json()["results"]]
+        self.assertEqual(percents, sorted(percents, reverse=True))
+
+        page_sql = next(
+            query["sql"]
+            for query in queries.captured_queries
+            if query["sql"].lstrip().startswith("SELECT") and "LIMIT" in query["sql"]
+        )
+        self.assertNotIn(" JOIN ", page_sql)
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            cursor.execute("SET enable_bitmapscan = off")
+            try:
+                cursor.execute(f"EXPLAIN {page_sql}")
+                return "\n".join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute("RESET enable_seqscan")
+                cursor.execute("RESET enable_bitmapscan")
+
+    def test_terms_are_returned_as_strings(self):
+        response = self.client.get(
+            "/api/metapath-predictions/", {"search": self.pair.pk}
+        )
+        self.assertEqual(
+            response.json()["results"][0],
+            {
+                "metapath": "metapath 49",
+                "percent_of_prediction": 0.98,
+                "path_count": 49,
+                "length": 3,
+                "verbose": "Compound binds Gene associates Disease",
+            },
+        )
+        response = self.client.get(
+            f"/api/drug-diseases-probability/{self.pair.pk}/explanation/"
+        )
+        self.assertEqual(
+            [
+                row["source_edge"]
+                for row in response.json()["source_edge_predictions"]["results"][:2]
+            ],
+            ["source 49", "source 48"],
+        )
+
+    def test_path_predictions_use_ordered_index_scan(self):
+        plan = self.explain_page_query("/api/path-predictions/")
+        self.assertIn("Index Scan using path_pred_pair_rank", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_metapath_predictions_use_index_only_scan(self):
+        plan = self.explain_page_query("/api/metapath-predictions/")
+        self.assertIn("Index Only Scan using metapath_pred_pair_rank", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_source_edge_predictions_use_index_only_scan(self):
+        plan = self.explain_page_query("/api/source-edge-predictions/")
+        self.assertIn("Index Only Scan using sourceedge_pred_pair_rank", plan)
+        self.assertNotIn("Sort", plan)
+
+    def test_target_edge_predictions_use_index_only_scan(self):
+        plan = self.explain_page_query("/api/target-edge-predictions/")
+        self.assertIn("Index Only Scan using targetedge_pred_pair_rank", plan)
+        self.assertNotIn("Sort", plan)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.drug = Drug.objects.create(dbid="DB00001", name="Aspirin", chembl_id="C1")
+
+    def test_matching_etag_is_answered_without_queries(self):
+        response = self.client.get("/api/drugs/")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Last-Modified", response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/drugs/", HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(len(queries.captured_queries), 0)
+
+    def test_etag_changes_with_query_and_data(self):
+        etag = self.client.get("/api/drugs/")["ETag"]
+        self.assertNotEqual(self.client.get("/api/drugs/?page=1")["ETag"], etag)
+
+        with self.on_commit():
+            self.drug.name = "Acetylsalicylic acid"
+            self.drug.save()
+        response = self.client.get("/api/drugs/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class RawQueryTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for idx in range(5):
+            Drug.objects.create(dbid=f"DB0000{idx}", name=f"Drug {idx}", chembl_id=idx)
+
+    def query(self, **kwargs):
+        return RawQuery(
+            select=[("dbid", "d.dbid")],
+            from_sql="drug d",
+            ordering=["-d.dbid"],
+            **kwargs,
+        )
+
+    def test_slices_become_limit_and_offset(self):
+        query = self.query()
+        self.assertEqual(
+            query.slice_sql(2, 4),
+            (
+                "SELECT d.dbid AS dbid FROM drug d  ORDER BY d.dbid DESC OFFSET %s "
+                "LIMIT %s",
+                [2, 2],
+            ),
+        )
+        self.assertEqual([row["dbid"] for row in query[1:3]], ["DB00003", "DB00002"])
+        self.assertEqual(query[4], {"dbid": "DB00000"})
+        self.assertEqual([row["dbid"] for row in query[3:]], ["DB00001", "DB00000"])
+        self.assertEqual(query[5:9], [])
+
+    def test_counts_are_exact_and_cached_per_version(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.query().count(), 5)
+            self.assertEqual(self.query().count(), 5)
+        self.assertEqual(len(queries.captured_queries), 2)
+
+        self.assertEqual(self.query(count_version="v1").count(), 5)
+        Drug.objects.create(dbid="DB00009", name="Drug 9", chembl_id=9)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.query(count_version="v1").count(), 5)
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual(self.query(count_version="v2").count(), 6)
+
+        filtered = self.query(
+            where_sql="WHERE d.dbid < %s", params=["DB00002"], count_version="v2"
+        )
+        self.assertEqual(filtered.count(), 2)
+
+    def test_last_page_is_served_with_no_next_link(self):
+        with self.on_commit():
+            for idx in range(45):
+                create_pair(
+                    Disease.objects.create(doid=f"DOID:{idx}", name=f"Disease {idx}")
+                )
+        self.client.get("/api/drug-diseases-probability/", {"page": 1})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/drug-diseases-probability/", {"page": 3})
+        # The count of page 1 is reused.
+        self.assertFalse(
+            any("COUNT(*)" in query["sql"] for query in queries.captured_queries)
+        )
+        data = response.json()
+        self.assertEqual(data["count"], 45)
+        self.assertEqual(len(data["results"]), 5)
+        self.assertIsNone(data["next"])
+        response = self.client.get("/api/drug-diseases-probability/", {"page": 4})
+        self.assertEqual(response.status_code, 404)
+
+
+class CursorPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.pair = create_pair()
+        # Ties on percent_of_prediction are broken by id.
+        create_paths(self.pair, [rank // 3 / 20 for rank in range(45)])
+        self.expected = list(
+            PathPrediction.objects.order_by(
+                "-percent_of_prediction", "-id"
+            ).values_list("verbose_path", flat=True)
+        )
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        return [row["verbose_path"] for row in data["results"]], data
+
+    def test_next_and_previous_links_walk_every_row_once(self):
+        pages, url = [], None
+        rows, data = self.get("/api/path-predictions/", search=self.pair.pk, cursor="")
+        self.assertIsNone(data["previous"])
+        pages.append(rows)
+        while data["next"]:
+            url = data["next"]
+            rows, data = self.get(url)
+            pages.append(rows)
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(sum(pages, []), self.expected)
+
+        # Back from the last page, in reverse.
+        walked = []
+        while data["previous"]:
+            rows, data = self.get(data["previous"])
+            walked.append(rows)
+        self.assertEqual(walked, pages[-2::-1])
+        self.assertIsNone(data["previous"])
+        self.assertIsNotNone(data["next"])
+
+    def test_mixed_directions_seek_past_ties(self):
+        for idx, name in enumerate(["b", "a", "b", "a", "c"]):
+            Drug.objects.create(dbid=f"DB0010{idx}", name=name, chembl_id=idx)
+        query = RawQuery(
+            select=[("dbid", "d.dbid")],
+            from_sql="drug d",
+            where_sql="WHERE d.dbid >= %s",
+            params=["DB00100"],
+            ordering=["d.name", "-d.dbid"],
+        )
+        walked, position = [], None
+        while True:
+            rows, keys = query.seek(position, 2)
+            if not rows:
+                break
+            walked.extend(row["dbid"] for row in rows)
+            position = keys[-1]
+        self.assertEqual(
+            walked, ["DB00103", "DB00101", "DB00102", "DB00100", "DB00104"]
+        )
+        rows, _ = query.seek(["b", "DB00100"], 2, reverse=True)
+        self.assertEqual([row["dbid"] for row in rows], ["DB00102", "DB00101"])
+
+    def test_invalid_cursors_are_not_found(self):
+        unsigned = base64.urlsafe_b64encode(b'{"p":["x","y"]}').decode()
+        wrong_length = signing.dumps(
+            {"p": [1]},
+            salt=RawCursorPagination.cursor_salt,
+            serializer=pagination.CursorSerializer,
+        )
+        for cursor in [unsigned, unsigned + ":forged", "%%%", wrong_length]:
+            response = self.client.get(
+                "/api/path-predictions/", {"search": self.pair.pk, "cursor": cursor}
+            )
+            self.assertEqual(response.status_code, 404, cursor)
+            self.assertEqual(response.json(), {"detail": "Invalid cursor"})
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        headache = Disease.objects.create(doid="DOID:1", name="Headache")
+        fever = Disease.objects.create(doid="DOID:2", name="Fever")
+        ibuprofen = Drug.objects.create(
+            dbid="DB00002", name="Ibu_profen 100%", chembl_id="C2"
+        )
+        with self.on_commit():
+            create_pair(headache)
+            create_pair(fever)
+            DrugDiseaseProbability.objects.create(drug=ibuprofen, disease=headache)
+
+    def search(self, query):
+        response = self.client.get("/api/drug-diseases-probability/", {"search": query})
+        self.assertEqual(response.status_code, 200)
+        return sorted(
+            (row["drug_name"], row["disease_name"])
+            for row in response.json()["results"]
+        )
+
+    def test_terms_match_names_ignoring_case(self):
+        self.assertEqual(
+            self.search("ASPIRIN"), [("Aspirin", "Fever"), ("Aspirin", "Headache")]
+        )
+        self.assertEqual(
+            self.search("ache"),
+            [("Aspirin", "Headache"), ("Ibu_profen 100%", "Headache")],
+        )
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search("aspirin HEAD"), [("Aspirin", "Headache")])
+        self.assertEqual(self.search("head ibu"), [("Ibu_profen 100%", "Headache")])
+        self.assertEqual(self.search("aspirin migraine"), [])
+
+    def test_wildcards_in_terms_match_literally(self):
+        self.assertEqual(self.search("_"), [("Ibu_profen 100%", "Headache")])
+        self.assertEqual(self.search("0%"), [("Ibu_profen 100%", "Headache")])
+        self.assertEqual(self.search("a%n"), [])
+        self.assertEqual(self.search("as_irin"), [])
+        self.assertEqual(self.search("\\"), [])
+
+
+class ReadModelTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.on_commit():
+            self.pair = create_pair(prediction=0.5, category="DM")
+
+    def first_row(self):
+        response = self.client.get("/api/drug-diseases-probability/")
+        return response.json()["results"][0]
+
+    def test_list_reads_the_view_without_joins(self):
+        with CaptureQueriesContext(connection) as queries:
+            row = self.first_row()
+        self.assertEqual(
+            (row["drug_name"], row["disease_name"], row["prediction"]),
+            ("Aspirin", "Headache", 0.5),
+        )
+        for query in queries.captured_queries:
+            if "drug_disease_prediction" in query["sql"]:
+                self.assertNotIn(" JOIN ", query["sql"])
+
+    def test_renames_reach_the_view(self):
+        with self.on_commit():
+            disease = Disease.objects.get()
+            disease.name = "Migraine"
+            disease.save()
+        self.assertEqual(self.first_row()["disease_name"], "Migraine")
+
+    def test_refresh_command_picks_up_bulk_changes(self):
+        DrugDiseaseProbability.objects.update(prediction=0.75)
+        self.assertEqual(self.first_row()["prediction"], 0.5)
+        call_command("refresh_predictions", stdout=io.StringIO())
+        self.assertEqual(self.first_row()["prediction"], 0.75)
+
+
+class CacheInvalidationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.on_commit():
+            self.pair = create_pair(prediction=0.5)
+            create_paths(self.pair, [0.1, 0.2])
+        self.pk = self.pair.pk
+
+    def paths(self):
+        response = self.client.get("/api/path-predictions/", {"search": self.pk})
+        return response.json()["count"]
+
+    def test_writes_invalidate_cached_responses(self):
+        self.assertEqual(self.paths(), 2)
+        self.assertEqual(
+            self.client.get("/api/drugs/DB00001/").json()["name"], "Aspirin"
+        )
+        with self.on_commit():
+            create_paths(self.pair, [0.3])
+            drug = Drug.objects.get()
+            drug.name = "Acetylsalicylic acid"
+            drug.save()
+        self.assertEqual(self.paths(), 3)
+        response = self.client.get("/api/drugs/DB00001/")
+        self.assertEqual(response.json()["name"], "Acetylsalicylic acid")
+        response = self.client.get("/api/drug-diseases-probability/")
+        self.assertEqual(
+            response.json()["results"][0]["drug_name"], "Acetylsalicylic acid"
+        )
+
+    def test_a_transaction_bumps_versions_once(self):
+        with mock.patch("api.signals.bump") as bump:
+            with self.on_commit():
+                create_paths(self.pair, [0.3, 0.4, 0.5])
+                self.pair.prediction = 0.6
+                self.pair.save()
+        # The second call comes from the refresh of the read view.
+        self.assertEqual(bump.call_count, 2)
+        self.assertEqual(
+            set(bump.call_args_list[0].args),
+            {
+                f"pair:{self.pair.pk}",
+                "drug:DB00001",
+                "explanations:path_prediction",
+            },
+        )
+        self.assertEqual(bump.call_args_list[1].args, ("predictions",))
+
+    def test_deleting_a_pair_cascades_in_one_statement(self):
+        self.assertEqual(self.paths(), 2)
+        with self.on_commit(), CaptureQueriesContext(connection) as queries:
+            self.pair.delete()
+        path_queries = [
+            query["sql"]
+            for query in queries.captured_queries
+            if '"path_prediction"' in query["sql"]
+        ]
+        self.assertEqual(len(path_queries), 1)
+        self.assertTrue(path_queries[0].startswith("DELETE"))
+        self.assertEqual(self.paths(), 0)
+
+    def test_direct_explanation_deletes_invalidate(self):
+        self.assertEqual(self.paths(), 2)
+        with self.on_commit():
+            PathPrediction.objects.filter(percent_of_prediction=0.1).delete()
+        self.assertEqual(self.paths(), 1)
+        with self.on_commit():
+            PathPrediction.objects.get().delete()
+        self.assertEqual(self.paths(), 0)
+
+    def test_saves_without_pre_save_are_handled(self):
+        disease = Disease.objects.get()
+        post_save.send(sender=Disease, instance=disease, created=False)
+        post_save.send(sender=Drug, instance=Drug.objects.get(), created=False)
+
+
+class DeferredRefreshTests(APITransactionTestCase):
+    @override_settings(PREDICTIONS_REFRESH_DELAY=1)
+    def test_edits_share_one_background_refresh(self):
+        with mock.patch.object(
+            DrugDiseasePrediction, "refresh", wraps=DrugDiseasePrediction.refresh
+        ) as refresh:
+            pair = create_pair()
+            create_pair(Disease.objects.create(doid="DOID:2", name="Fever"))
+            timer = DrugDiseasePrediction._refresh_timer
+            self.assertEqual(DrugDiseasePrediction.objects.count(), 0)
+            refresh.assert_not_called()
+            timer.join()
+        refresh.assert_called_once()
+        self.assertIsNone(DrugDiseasePrediction._refresh_timer)
+        response = self.client.get("/api/drug-diseases-probability/")
+        self.assertEqual(response.json()["count"], 2)
+        self.assertEqual(response.json()["results"][0]["id"], pair.pk)
+
+
+class SQLiteLRUCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 1000.0
+        clock = mock.patch("time.time", side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def make_cache(self, **options):
+        location = os.path.join(tempfile.mkdtemp(), "cache.sqlite3")
+        options = {"CULL_EVERY": 1, "TOUCH_BATCH": 1, **options}
+        return SQLiteLRUCache(location, {"OPTIONS": options})
+
+    def set_all(self, cache, keys, value="x"):
+        for key in keys:
+            self.now += 1
+            cache.set(key, value)
+
+    def count(self, cache):
+        return cache._connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    def test_least_recently_used_is_evicted_first(self):
+        cache = self.make_cache(MAX_ENTRIES=3)
+        self.set_all(cache, ["a", "b", "c"])
+        self.now += 1
+        self.assertEqual(cache.get("a"), "x")
+        self.set_all(cache, ["d"])
+        self.assertEqual(cache.get_many(["a", "b", "c", "d"]).keys(), {"a", "c", "d"})
+
+    def test_size_is_bounded(self):
+        cache = self.make_cache(MAX_SIZE=1000)
+        self.set_all(cache, ["a", "b", "c", "d", "e"], value="x" * 400)
+        size = cache._connection.execute("SELECT SUM(size) FROM cache").fetchone()[0]
+        self.assertLessEqual(size, 1000)
+        self.assertEqual(cache.get_many(["a", "b", "c", "d", "e"]).keys(), {"d", "e"})
+
+    def test_expired_entries_are_missed_and_removed(self):
+        cache = self.make_cache()
+        cache.set("stale", "x", timeout=0)
+        cache.set("fresh", "x", timeout=None)
+        self.assertIsNone(cache.get("stale"))
+        self.assertFalse(cache.has_key("stale"))
+        self.assertEqual(self.count(cache), 1)
+        self.assertEqual(cache.get("fresh"), "x")
+
+    def test_culls_every_few_sets(self):
+        cache = self.make_cache(MAX_ENTRIES=2, CULL_EVERY=3)
+        self.set_all(cache, ["a", "b"])
+        self.assertEqual(self.count(cache), 2)
+        self.set_all(cache, ["c"])
+        self.assertEqual(self.count(cache), 2)
+        self.set_all(cache, ["d"])
+        self.assertEqual(self.count(cache), 3)
+
+    def test_access_times_are_written_in_batches(self):
+        cache = self.make_cache(TOUCH_BATCH=2, TOUCH_INTERVAL=60)
+        self.set_all(cache, ["a", "b"])
+
+        def accessed():
+            return dict(cache._connection.execute("SELECT key, accessed FROM cache"))
+
+        before = accessed()
+        self.now += 1
+        cache.get("a")
+        cache.get("a")
+        self.assertEqual(accessed(), before)
+        cache.get("b")
+        self.assertEqual(set(accessed().values()), {self.now})
+
+
+class CompressionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.on_commit():
+            for idx in range(40):
+                create_pair(
+                    Disease.objects.create(doid=f"DOID:{idx}", name=f"Disease {idx}")
+                )
+
+    def test_negotiation(self):
+        cases = {
+            "": None,
+            "identity": None,
+            "gzip, deflate, br": "br",
+            "gzip, deflate, br, zstd": "zstd",
+            "br;q=0.5, gzip;q=0.9": "gzip",
+            "*": "zstd",
+            "*, zstd;q=0": "br",
+            "gzip;q=bogus": None,
+        }
+        factory = APIRequestFactory()
+        for header, encoding in cases.items():
+            request = factory.get("/", HTTP_ACCEPT_ENCODING=header)
+            self.assertEqual(compression.negotiate(request), encoding, header)
+
+    def test_cached_responses_are_stored_compressed(self):
+        path = "/api/drug-diseases-probability/"
+        plain = self.client.get(path)
+        self.assertNotIn("Content-Encoding", plain)
+        with mock.patch.object(
+            compression, "compress", wraps=compression.compress
+        ) as compress:
+            first = self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+            second = self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(compress.call_count, 1)
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(second["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", second["Vary"])
+        self.assertEqual(gzip.decompress(second.content), plain.content)
+        self.assertNotEqual(second["ETag"], plain["ETag"])
+
+        response = self.client.get(
+            path, HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=second["ETag"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get("/api/drugs/DB00001/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_html_is_not_compressed(self):
+        response = self.client.get(
+            "/api/drug-diseases-probability/",
+            HTTP_ACCEPT="text/html",
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "csrf")
+        self.assertNotIn("Content-Encoding", response)
+
+    def test_streams_are_compressed_incrementally(self):
+        path = "/api/drug-diseases-probability/export/?drug=DB00001&format=ndjson"
+        plain = b"".join(self.client.get(path).streaming_content)
+        response = self.client.get(path, HTTP_ACCEPT_ENCODING="gzip")
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", response)
+        self.assertEqual(gzip.decompress(b"".join(response.streaming_content)), plain)
+
+
+class ExportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        with self.on_commit():
+            self.pairs = [
+                create_pair(
+                    Disease.objects.create(doid=f"DOID:{idx}", name=f"Disease, {idx}"),
+                    prediction=idx / 10,
+                    category="DM",
+                )
+                for idx in range(5)
+            ]
+            Drug.objects.create(dbid="DB00002", name="Ibuprofen", chembl_id="C2")
+
+    def export(self, **params):
+        response = self.client.get(
+            "/api/drug-diseases-probability/export/", {"drug": "aspirin", **params}
+        )
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content).decode()
+
+    @mock.patch.object(views.DrugDiseaseProbabilityExportView, "chunk_size", 2)
+    def test_ndjson_streams_every_row_in_order(self):
+        rows = [json.loads(line) for line in self.export(format="ndjson").splitlines()]
+        self.assertEqual([row["id"] for row in rows], [pair.pk for pair in self.pairs])
+        self.assertEqual(
+            rows[1],
+            {
+                "id": self.pairs[1].pk,
+                "drug_name": "Aspirin",
+                "disease_name": "Disease, 1",
+                "prediction": 0.1,
+                "compound_prediction": 0.0,
+                "disease_prediction": 0.0,
+                "category": "DM",
+                "trial_count": 0,
+            },
+        )
+
+    def test_csv_has_a_header_and_quotes_values(self):
+        lines = self.export(format="csv").splitlines()
+        self.assertEqual(
+            lines[0],
+            "id,drug_name,disease_name,prediction,compound_prediction,"
+            "disease_prediction,category,trial_count",
+        )
+        self.assertEqual(len(lines), 6)
+        self.assertEqual(
+            lines[1], f'{self.pairs[0].pk},Aspirin,"Disease, 0",0.0,0.0,0.0,DM,0'
+        )
+
+    def test_drug_without_predictions_exports_only_a_header(self):
+        self.assertEqual(self.export(drug="DB00002", format="csv").count("\n"), 1)
+        self.assertEqual(self.export(drug="DB00002", format="ndjson"), "")
+
+
+class SparseFieldsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Drug.objects.create(
+            dbid="DB00001", name="Aspirin", chembl_id="C1", toxicity="x" * 5000
+        )
+
+    def test_list_defaults_to_compact_fields(self):
+        row = self.client.get("/api/drugs/").json()["results"][0]
+        self.assertEqual(row["name"], "Aspirin")
+        self.assertNotIn("toxicity", row)
+
+    def test_fields_are_pushed_into_the_query(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/drugs/", {"fields": "name,toxicity"})
+        self.assertEqual(
+            response.json()["results"], [{"name": "Aspirin", "toxicity": "x" * 5000}]
+        )
+        page_sql = queries.captured_queries[-1]["sql"]
+        self.assertNotIn('"description"', page_sql)
+
+        response = self.client.get("/api/drugs/", {"omit": "description,categories"})
+        self.assertNotIn("description", response.json()["results"][0])
+        response = self.client.get("/api/drugs/", {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+
+
+class DrugResolutionTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Drug.objects.create(
+            dbid="DB00945", name="Acetylsalicylic acid", chembl_id="CHEMBL25"
+        )
+
+    def test_detail_resolves_names_and_identifiers(self):
+        for identifier in [
+            "Acetylsalicylic acid",
+            "ACETYLSALICYLIC-ACID",
+            "db00945",
+            "chembl25",
+        ]:
+            response = self.client.get(f"/api/drugs/{identifier}/")
+            self.assertEqual(response.status_code, 200, identifier)
+            self.assertEqual(response.json()["dbid"], "DB00945")
+        self.assertEqual(self.client.get("/api/drugs/aspirin/").status_code, 404)
+
+    def test_export_resolves_names_and_identifiers(self):
+        path = "/api/drug-diseases-probability/export/?format=csv&drug="
+        for identifier in ["acetylsalicylic acid", "chembl25"]:
+            response = self.client.get(path + identifier)
+            self.assertEqual(response.status_code, 200, identifier)
+            self.assertIn("DB00945-predictions.csv", response["Content-Disposition"])
+        self.assertEqual(self.client.get(path + "aspirin").status_code, 404)
+        self.assertEqual(self.client.get(path).status_code, 404)
+
+
+class AutocompleteTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        Drug.objects.create(
+            dbid="DB00945",
+            name="Acetylsalicylic acid",
+            chembl_id="CHEMBL25",
+            treatment_count=10,
+        )
+        Drug.objects.create(
+            dbid="DB00316",
+            name="Acetaminophen",
+            chembl_id="CHEMBL112",
+            treatment_count=20,
+        )
+        Disease.objects.create(doid="DOID:10763", name="Acute hypertension")
+
+    def test_prefix_matches_are_ranked_without_queries(self):
+        self.client.get("/api/autocomplete/", {"q": "a"})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/autocomplete/", {"q": "ac"})
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]],
+            ["DB00316", "DB00945", "DOID:10763"],
+        )
+
+    def test_words_identifiers_and_type_filter(self):
+        response = self.client.get("/api/autocomplete/", {"q": "acid"})
+        self.assertEqual(response.json()["results"][0]["id"], "DB00945")
+        response = self.client.get("/api/autocomplete/", {"q": "chembl112"})
+        self.assertEqual(response.json()["results"][0]["id"], "DB00316")
+        response = self.client.get("/api/autocomplete/", {"q": "ac", "type": "disease"})
+        self.assertEqual(len(response.json()["results"]), 1)
+
+    def test_index_rebuilds_when_drugs_change(self):
+        self.client.get("/api/autocomplete/", {"q": "ac"})
+        with self.on_commit():
+            Drug.objects.create(dbid="DB00001", name="Acarbose", chembl_id="C1")
+        response = self.client.get("/api/autocomplete/", {"q": "acar"})
+        self.assertEqual(response.json()["results"][0]["id"], "DB00001")
+
+
+class TopPredictionsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        disease = Disease.objects.create(doid="DOID:10763", name="Hypertension")
+        with self.on_commit():
+            for idx, (prediction, category, trials) in enumerate(
+                [(0.2, "DM", 0), (0.9, "SYM", 1), (0.5, "DM", 4)]
+            ):
+                drug = Drug.objects.create(
+                    dbid=f"DB0000{idx}", name=f"Drug {idx}", chembl_id=idx
+                )
+                DrugDiseaseProbability.objects.create(
+                    drug=drug,
+                    disease=disease,
+                    prediction=prediction,
+                    category=category,
+                    trial_count=trials,
+                )
+
+    def top(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return [(row["rank"], row["drug_id"]) for row in response.json()["results"]]
+
+    def test_top_drugs_for_disease(self):
+        url = "/api/diseases/DOID:10763/top-drugs/"
+        self.assertEqual(
+            self.top(url), [(1, "DB00001"), (2, "DB00002"), (3, "DB00000")]
+        )
+        self.assertEqual(self.top(url, k=1), [(1, "DB00001")])
+        self.assertEqual(
+            self.top(url, category="dm", min_trial_count=1), [(2, "DB00002")]
+        )
+        self.assertEqual(
+            self.client.get("/api/diseases/DOID:1/top-drugs/").status_code, 404
+        )
+
+    def test_top_diseases_for_drug(self):
+        self.assertEqual(self.top("/api/drugs/drug 2/top-diseases/"), [(1, "DB00002")])
+
+    def test_matrix_answers_the_key_check_while_current(self):
+        url = "/api/diseases/DOID:10763/top-drugs/"
+        with self.assertNumQueries(1):
+            self.assertEqual(self.top(url, k=1), [(1, "DB00001")])
+        bump("predictions")
+        with self.assertNumQueries(2):
+            self.assertEqual(self.top(url, k=1), [(1, "DB00001")])
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                self.client.get("/api/diseases/DOID:1/top-drugs/").status_code, 404
+            )
+
+
+class PathTopTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.pair = create_pair()
+        create_paths(self.pair, [rank / 100 for rank in range(10)], 0.5)
+
+    def top(self, **params):
+        return self.client.get(
+            "/api/path-predictions/", {"search": self.pair.pk, **params}
+        )
+
+    def test_top_paths_and_rest_summary(self):
+        data = self.top(top=3).json()
+        self.assertEqual(data["count"], 10)
+        self.assertEqual(
+            [row["verbose_path"] for row in data["results"]],
+            ["path 9", "path 8", "path 7"],
+        )
+        self.assertEqual(data["rest"]["count"], 7)
+        self.assertAlmostEqual(data["rest"]["percent_of_prediction"], 0.21)
+
+        data = self.top(top=3, min_percent=0.085).json()
+        self.assertEqual(len(data["results"]), 1)
+        self.assertEqual(data["rest"]["count"], 9)
+        self.assertAlmostEqual(data["rest"]["percent_of_prediction"], 0.36)
+
+    def summary(self):
+        return (
+            PathPredictionSummary.objects.filter(drug_disease_probability=self.pair)
+            .values_list("path_count", "percent_sum")
+            .first()
+        )
+
+    def test_summary_follows_path_writes(self):
+        count, percent_sum = self.summary()
+        self.assertEqual(count, 10)
+        self.assertAlmostEqual(percent_sum, 0.45)
+
+        paths = PathPrediction.objects.filter(drug_disease_probability=self.pair)
+        paths.filter(percent_of_prediction__gte=0.05).update(percent_of_prediction=0.5)
+        count, percent_sum = self.summary()
+        self.assertEqual(count, 10)
+        self.assertAlmostEqual(percent_sum, 2.6)
+        rest = self.top(top=0).json()["rest"]
+        self.assertEqual(rest["count"], 10)
+        self.assertAlmostEqual(rest["percent_of_prediction"], 2.6)
+
+        paths.filter(percent_of_prediction__lt=0.05).delete()
+        self.assertEqual(self.summary()[0], 5)
+        paths.delete()
+        self.assertIsNone(self.summary())
+        self.assertEqual(
+            self.top(top=1).json()["rest"], {"count": 0, "percent_of_prediction": 0.0}
+        )
+
+    def test_top_reads_only_the_top_rows(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.top(top=3)
+        sql = queries.captured_queries[-1]["sql"]
+        self.assertIn("path_prediction_summary", sql)
+        self.assertNotIn("SUM(", sql.upper())
+
+    def test_top_requires_a_pair(self):
+        response = self.client.get("/api/path-predictions/", {"top": 3})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.top(top="all").status_code, 400)
+        response = self.client.get(
+            "/api/path-predictions/", {"search": "abc", "top": 5}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("search", response.json())
+
+
+class TrustedRowsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        disease = Disease.objects.create(doid="DOID:1", name="Headache \u2028 é")
+        with self.on_commit():
+            self.pair = create_pair(
+                disease,
+                prediction=0.1 + 0.2,
+                compound_prediction=1,
+                disease_prediction=1e-05,
+                category="DM",
+            )
+        create_explanations(self.pair, [rank / 3 for rank in range(3)])
+
+    def test_trusted_rows_render_like_serializers(self):
+        request = Request(APIRequestFactory().get("/", {"search": self.pair.pk}))
+        cases = [
+            (
+                views.DrugDiseaseProbabilityListView().get_query("", []),
+                views.DrugDiseaseProbabilitySerializer,
+            ),
+            (
+                views.TopDiseasesForDrugView().get_query(request, "DB00001")[0],
+                views.RankedPredictionSerializer,
+            ),
+        ]
+        for view_class in [
+            views.PathPredictionListView,
+            views.MetaPathPredictionListView,
+            views.SourceEdgePredictionListView,
+            views.TargetEdgePredictionListView,
+        ]:
+            cases.append((view_class().get_query(request), view_class.serializer_class))
+
+        for query, serializer_class in cases:
+            with self.subTest(serializer_class.__name__):
+                expected = JSONRenderer().render(
+                    serializer_class(query[:], many=True).data
+                )
+                actual = FastJSONRenderer().render(
+                    serializer_class.trusted_data(query[:])
+                )
+                # Floats may be spelled differently (1e-05, 0.00001).
+                self.assertEqual(
+                    json.loads(actual, object_pairs_hook=list),
+                    json.loads(expected, object_pairs_hook=list),
+                )
+
+    def test_fast_renderer_escapes_separators_and_indents_like_drf(self):
+        data = {"name": "a\u2028b", "values": [1, 0.5, None]}
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            FastJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+    def test_non_finite_floats_render_as_null(self):
+        data = {"values": [float("nan"), float("inf"), -float("inf"), 0.5]}
+        expected = {"values": [None, None, None, 0.5]}
+        for media_type in ["application/json", "application/json; indent=2"]:
+            with self.subTest(media_type):
+                content = FastJSONRenderer().render(data, media_type)
+                self.assertEqual(json.loads(content), expected)
+
+        pk = self.pair.pk
+        DrugDiseaseProbability.objects.filter(pk=pk).update(prediction=float("nan"))
+        DrugDiseasePrediction.refresh(concurrently=False)
+        cache.clear()
+        # Trusted rows, serializer output and the NDJSON export agree.
+        listed = self.client.get("/api/drug-diseases-probability/").json()
+        bundle = self.client.get(
+            f"/api/drug-diseases-probability/{pk}/explanation/"
+        ).json()
+        export = self.client.get(
+            "/api/drug-diseases-probability/export/",
+            {"drug": "DB00001", "format": "ndjson"},
+        )
+        exported = json.loads(b"".join(export.streaming_content))
+        self.assertIsNone(listed["results"][0]["prediction"])
+        self.assertIsNone(bundle["probability"]["prediction"])
+        self.assertIsNone(exported["prediction"])
+
+
+class BatchLookupTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        drug = Drug.objects.create(
+            dbid="DB00945", name="Acetylsalicylic acid", chembl_id="C1"
+        )
+        disease = Disease.objects.create(doid="DOID:10763", name="Hypertension")
+        Disease.objects.create(doid="DOID:1", name="Fever")
+        with self.on_commit():
+            DrugDiseaseProbability.objects.create(
+                drug=drug, disease=disease, prediction=0.5, category="DM"
+            )
+
+    def test_pairs_resolve_in_one_query_with_per_item_errors(self):
+        pairs = [
+            {"drug": "db00945", "disease": "DOID:10763"},
+            {"drug": "acetylsalicylic-acid", "disease": "Hypertension"},
+            {"drug": "DB00945", "disease": "doid:10763"},
+            {"drug": "C1", "disease": "HYPERTENSION"},
+            {"drug": "aspirin", "disease": "DOID:10763"},
+            {"drug": "DB00945", "disease": "Gout"},
+            {"drug": "DB00945", "disease": "DOID:1"},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(
+                "/api/drug-diseases-probability/batch/", {"pairs": pairs}, format="json"
+            )
+        self.assertEqual(len(queries.captured_queries), 1)
+        results = response.json()["results"]
+        self.assertEqual(
+            [row["prediction"] for row in results[:4]], [0.5, 0.5, 0.5, 0.5]
+        )
+        self.assertEqual(
+            [row.get("error") for row in results[4:]],
+            ["Unknown drug.", "Unknown disease.", "No prediction for this pair."],
+        )
+
+    def test_batch_size_is_bounded(self):
+        pairs = [{"drug": "DB00945", "disease": "DOID:1"}] * 1001
+        response = self.client.post(
+            "/api/drug-diseases-probability/batch/", {"pairs": pairs}, format="json"
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class AsyncViewTests(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pair = create_pair(prediction=0.5, category="DM")
+        create_paths(self.pair, [rank / 30 for rank in range(30)])
+
+    def request(self, path):
+        request = APIRequestFactory().get(path)
+        force_authenticate(request, self.user)
+        return request
+
+    def render(self, response):
+        response.render()
+        return response.status_code, response.content
+
+    async def compare(self, cases):
+        try:
+            for name, path, kwargs in cases:
+                with self.subTest(name, path=path):
+                    view_class = getattr(async_views, name)
+                    self.assertTrue(view_class.view_is_async)
+                    await sync_to_async(cache.clear)()
+                    expected = await sync_to_async(getattr(views, name).as_view())(
+                        self.request(path), **kwargs
+                    )
+                    await sync_to_async(cache.clear)()
+                    actual = await view_class.as_view()(self.request(path), **kwargs)
+                    self.assertEqual(self.render(actual), self.render(expected))
+        finally:
+            await db.close_pool()
+
+    def test_async_views_match_sync_views(self):
+        pk = self.pair.pk
+        async_to_sync(self.compare)(
+            [
+                ("DrugDiseaseProbabilityListView", "/api/?search=aspirin", {}),
+                ("PathPredictionListView", f"/api/?search={pk}&page=2", {}),
+                ("PathPredictionListView", f"/api/?search={pk}&cursor=", {}),
+                ("PathPredictionListView", f"/api/?search={pk}&top=5", {}),
+                ("DrugDiseaseExplanationView", "/api/?limit=3", {"pk": pk}),
+                ("TopDrugsForDiseaseView", "/api/", {"doid": "DOID:1"}),
+                ("TopDiseasesForDrugView", "/api/", {"drugname": "nope"}),
+            ]
+        )
+
+    async def fetch_twice(self, path, **kwargs):
+        view = async_views.TopDrugsForDiseaseView.as_view()
+        try:
+            responses = []
+            for _ in range(2):
+                response = await view(self.request(path), **kwargs)
+                await sync_to_async(response.render)()
+                responses.append(response)
+            return responses
+        finally:
+            await db.close_pool()
+
+    def test_cache_is_read_off_the_event_loop(self):
+        on_event_loop = []
+
+        def record(method):
+            def wrapper(*args, **kwargs):
+                on_event_loop.append(asyncio._get_running_loop() is not None)
+                return method(*args, **kwargs)
+
+            return wrapper
+
+        with mock.patch.object(
+            SQLiteLRUCache, "get", autospec=True, side_effect=record(SQLiteLRUCache.get)
+        ), mock.patch.object(
+            SQLiteLRUCache,
+            "get_many",
+            autospec=True,
+            side_effect=record(SQLiteLRUCache.get_many),
+        ):
+            first, second = async_to_sync(self.fetch_twice)("/api/", doid="DOID:1")
+        self.assertEqual(second.content, first.content)
+        self.assertTrue(on_event_loop)
+        self.assertNotIn(True, on_event_loop)
+
+
+class ConnectionPoolTests(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        create_pair()
+        admin = CustomUser.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_authenticate(admin)
+
+    def tearDown(self):
+        db.close_sync_pool()
+
+    def test_raw_queries_reuse_pooled_connections(self):
+        pool = {
+            "ENABLED": True,
+            "MIN_SIZE": 1,
+            "MAX_SIZE": 2,
+            "MAX_IDLE": 60,
+            "TIMEOUT": 5,
+        }
+        with self.settings(DB_POOL=pool):
+            for page in range(3):
+                cache.clear()
+                response = self.client.get(
+                    "/api/drug-diseases-probability/", {"search": "aspirin"}
+                )
+                self.assertEqual(response.json()["count"], 1)
+
+        stats = self.client.get("/api/pool-stats/").json()["sync"]
+        # Three statements per request, on at most two connections.
+        self.assertEqual(stats["requests_num"], 9)
+        self.assertLessEqual(stats["connections_num"], 2)
+        self.assertIsNone(stats.get("connections_errors"))
+
+
+class CompactScoresTests(APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pair = create_pair(
+            prediction=0.123456789,
+            compound_prediction=0.987654321,
+            disease_prediction=0.333333333,
+            category="DM",
+        )
+        create_paths(self.pair, [0.456789123], 0.111111111)
+        # The flush between tests doesn't restore column types.
+        self.addCleanup(call_command, "convert_scores", stdout=io.StringIO())
+
+    def responses(self):
+        cache.clear()
+        pk = self.pair.pk
+        batch = self.client.post(
+            "/api/drug-diseases-probability/batch/",
+            {"pairs": [{"drug": "DB00001", "disease": "DOID:1"}]},
+            format="json",
+        )
+        export = self.client.get(
+            "/api/drug-diseases-probability/export/",
+            {"drug": "DB00001", "format": "ndjson"},
+        )
+        return {
+            "list": self.client.get("/api/drug-diseases-probability/").json(),
+            "bundle": self.client.get(
+                f"/api/drug-diseases-probability/{pk}/explanation/"
+            ).json(),
+            "paths": self.client.get("/api/path-predictions/", {"search": pk}).json(),
+            "path_top": self.client.get(
+                "/api/path-predictions/", {"search": pk, "top": 1}
+            ).json(),
+            "top": self.client.get("/api/diseases/DOID:1/top-drugs/").json(),
+            "batch": batch.json(),
+            "export": json.loads(b"".join(export.streaming_content)),
+        }
+
+    def assertWithinTolerance(self, actual, expected, key=None):
+        if isinstance(expected, dict):
+            self.assertEqual(actual.keys(), expected.keys())
+            for name in expected:
+                self.assertWithinTolerance(actual[name], expected[name], name)
+        elif isinstance(expected, list):
+            self.assertEqual(len(actual), len(expected))
+            for item, expected_item in zip(actual, expected):
+                self.assertWithinTolerance(item, expected_item, key)
+        elif isinstance(expected, float):
+            if key in ("compound_prediction", "disease_prediction"):
+                delta = 0.5 / PERCENTILE_SCALE
+            else:
+                delta = 1e-7
+            self.assertAlmostEqual(actual, expected, delta=delta, msg=key)
+        else:
+            self.assertEqual(actual, expected, key)
+
+    def test_compact_scores_are_served_within_tolerance(self):
+        expected = self.responses()
+        with self.settings(COMPACT_SCORES=True):
+            call_command("convert_scores", stdout=io.StringIO())
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_name = 'drug_disease_probability' "
+                    "AND column_name = 'compound_prediction'"
+                )
+                self.assertEqual(cursor.fetchone()[0], "smallint")
+            actual = self.responses()
+            pair = DrugDiseaseProbability.objects.get()
+        self.assertWithinTolerance(actual, expected)
+        self.assertAlmostEqual(pair.disease_prediction, 0.3333, places=6)
+        # Rows aggregated to JSON in SQL decode to the same floats as rows
+        # read through the cursor.
+        path = actual["paths"]["results"][0]
+        stored = struct.unpack("f", struct.pack("f", 0.456789123))[0]
+        self.assertEqual(path["percent_of_prediction"], stored)
+        self.assertEqual(actual["path_top"]["results"][0], path)
+        self.assertEqual(actual["bundle"]["path_predictions"]["results"][0], path)
+        self.assertEqual(
+            actual["bundle"]["probability"]["prediction"],
+            actual["list"]["results"][0]["prediction"],
+        )
+
+    def test_system_check_compares_column_types(self):
+        self.assertEqual(check_score_columns(None, databases=["default"]), [])
+        with self.settings(COMPACT_SCORES=True):
+            errors = check_score_columns(None, databases=["default"])
+            self.assertEqual({error.id for error in errors}, {"drugs.E001"})
+            self.assertIn(
+                "drug_disease_probability stores",
+                "\n".join(error.msg for error in errors),
+            )
+            call_command("convert_scores", stdout=io.StringIO())
+            self.assertEqual(check_score_columns(None, databases=["default"]), [])
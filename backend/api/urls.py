@@ -1,9 +1,17 @@
+from django.conf import settings
 from django.urls import path, include
 from .views import (
     DrugListView,
     DrugDetailView,
     DiseaseListView,
     DrugDiseaseProbabilityListView,
+    DrugDiseaseExplanationView,
+    DrugDiseaseProbabilityBatchView,
+    DrugDiseaseProbabilityExportView,
+    TopDiseasesForDrugView,
+    TopDrugsForDiseaseView,
+    AutocompleteView,
+    PoolStatsView,
     api_overview,
     PathPredictionListView,
     MetaPathPredictionListView,
@@ -14,18 +22,58 @@ from .views import (
     activate_user,
 )
 
+if settings.ASYNC_API_VIEWS:
+    from .async_views import (
+        DrugDiseaseProbabilityListView,
+        DrugDiseaseExplanationView,
+        DrugDiseaseProbabilityBatchView,
+        TopDiseasesForDrugView,
+        TopDrugsForDiseaseView,
+        PathPredictionListView,
+        MetaPathPredictionListView,
+        SourceEdgePredictionListView,
+        TargetEdgePredictionListView,
+    )
+
 urlpatterns = [
     path("", api_overview, name="api-overview"),
     path("drugs/", DrugListView.as_view(), name="drugs"),
     path(
         "drugs/<str:drugname>/", DrugDetailView.as_view(), name="drug-detail"
     ),  # Используем str для drugname
+    path(
+        "drugs/<str:drugname>/top-diseases/",
+        TopDiseasesForDrugView.as_view(),
+        name="drug-top-diseases",
+    ),
     path("diseases/", DiseaseListView.as_view(), name="disease-list"),
+    path(
+        "diseases/<str:doid>/top-drugs/",
+        TopDrugsForDiseaseView.as_view(),
+        name="disease-top-drugs",
+    ),
+    path("autocomplete/", AutocompleteView.as_view(), name="autocomplete"),
+    path("pool-stats/", PoolStatsView.as_view(), name="pool-stats"),
     path(
         "drug-diseases-probability/",
         DrugDiseaseProbabilityListView.as_view(),
         name="probability-list",
     ),
+    path(
+        "drug-diseases-probability/batch/",
+        DrugDiseaseProbabilityBatchView.as_view(),
+        name="probability-batch",
+    ),
+    path(
+        "drug-diseases-probability/export/",
+        DrugDiseaseProbabilityExportView.as_view(),
+        name="probability-export",
+    ),
+    path(
+        "drug-diseases-probability/<int:pk>/explanation/",
+        DrugDiseaseExplanationView.as_view(),
+        name="probability-explanation",
+    ),
     path(
         "path-predictions/", PathPredictionListView.as_view(), name="path-predictions"
     ),
@@ -0,0 +1,33 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+
+DATASET = "dataset"
+
+
+def version_key(scope):
+    return "version:" + hashlib.md5(scope.encode()).hexdigest()
+
+
+def get_versions(scopes):
+    """
+    Returns the current version of the dataset followed by the version of each
+    scope. A version missing from the cache, e.g. after LRU eviction, is
+    recreated from the clock so it never matches an older one.
+    """
+    keys = [version_key(scope) for scope in [DATASET, *scopes]]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    cache.set_many({version_key(scope): time.time_ns() for scope in scopes}, None)
+
+
+def cache_key_prefix(versions):
+    return "v" + ".".join(str(version) for version in versions)
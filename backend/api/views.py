@@ -1,20 +1,30 @@
+import hashlib
+import math
+
 from django.shortcuts import render
 from drugs.models import (
     Drug,
     Disease,
     DrugDiseaseProbability,
     PathPrediction,
+    PathPredictionSummary,
     MetaPathPrediction,
     SourceEdgePrediction,
     TargetEdgePrediction,
     DiseaseIndication,
     MechanismOfAction,
+    normalize_name,
 )
+from drugs.matrix import get_matrix
+from drugs.scores import compact, decode_percentile
 from .serializers import (
     DrugSerializer,
     DiseaseSerializer,
     DrugDiseaseProbabilitySerializer,
+    PairBatchSerializer,
+    RawRowSerializer,
     PathPredictionSerializer,
+    RankedPredictionSerializer,
     MetapathPredictionSerializer,
     SourceEdgePredictionSerializer,
     TargetEdgePredictionSerializer,
@@ -22,55 +32,251 @@ from .serializers import (
     MechanismOfActionSerializer,
 )
 from rest_framework import filters, generics
-from rest_framework.permissions import IsAuthenticated
-from django.utils.decorators import method_decorator
+from rest_framework.exceptions import APIException, NotFound, ValidationError
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
+from asgiref.sync import sync_to_async
+from django.middleware.cache import CacheMiddleware
 from django.views.decorators.cache import cache_page
-from django.db import connection
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.settings import api_settings
+from . import db
+from .compression import compress_page, negotiate
+from .pagination import RawCursorPagination, RawPageNumberPagination, RawQuery
+from .renderers import CSVRenderer, NDJSONRenderer
+from .autocomplete import autocomplete_index
+from .resolvers import resolve_drug
+from .versioning import cache_key_prefix, get_versions
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.tokens import default_token_generator
 from django.utils.http import urlsafe_base64_decode
 from django.contrib.auth import get_user_model
-from django.http import HttpResponse
-
-
-class BaseListView(generics.ListAPIView):
+from django.http import HttpResponse, StreamingHttpResponse
+
+
+class CachePageMixin:
+    """
+    Caches whole GET responses in the default cache, keyed by URL and by the
+    current versions of the dataset and of the view's cache scopes. Model
+    signals bump the scopes a change affects (see ``api.signals``), so entries
+    can live for a long time without going stale.
+    """
+
+    cache_timeout = 60 * 60 * 24
+    cache_scopes = []
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return self.cache_scopes
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self.adispatch(request, *args, **kwargs)
+        if request.method not in ("GET", "HEAD"):
+            return super().dispatch(request, *args, **kwargs)
+
+        versions = get_versions(self.get_cache_scopes(request, *args, **kwargs))
+        etag, last_modified = self.get_validators(request, versions)
+        # The versions move whenever the data behind the URL may have changed,
+        # so a matching validator is answered without building the response.
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            # Compressing inside cache_page stores the compressed bytes, one
+            # entry per Accept-Encoding, so cache hits aren't compressed again.
+            view = cache_page(
+                self.cache_timeout, key_prefix=cache_key_prefix(versions)
+            )(compress_page(super().dispatch))
+            response = view(request, *args, **kwargs)
+        return self.add_validators(response, etag, last_modified)
+
+    async def adispatch(self, request, *args, **kwargs):
+        dispatch = super().dispatch
+        if request.method not in ("GET", "HEAD"):
+            return await dispatch(request, *args, **kwargs)
+
+        # The same steps as dispatch(), with the cache reads moved off the event
+        # loop. Cache writes run in post-render callbacks, and Django renders
+        # responses in a thread.
+        scopes = await sync_to_async(self.get_cache_scopes)(request, *args, **kwargs)
+        versions = await sync_to_async(get_versions)(scopes)
+        etag, last_modified = self.get_validators(request, versions)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            middleware = CacheMiddleware(
+                dispatch,
+                page_timeout=self.cache_timeout,
+                key_prefix=cache_key_prefix(versions),
+            )
+            response = await sync_to_async(middleware.process_request)(request)
+        if response is None:
+            response = await compress_page(dispatch)(request, *args, **kwargs)
+            if callable(getattr(response, "render", None)):
+                response.add_post_render_callback(
+                    lambda response: middleware.process_response(request, response)
+                )
+            else:
+                response = await sync_to_async(middleware.process_response)(
+                    request, response
+                )
+        return self.add_validators(response, etag, last_modified)
+
+    def get_validators(self, request, versions):
+        self.cache_versions = versions
+        return self.get_etag(request, versions), max(versions) // 10**9
+
+    def add_validators(self, response, etag, last_modified):
+        if not getattr(response, "is_rendered", True):
+            # After compress_page, which would weaken the ETag. It already
+            # includes the negotiated encoding, so it can stay strong.
+            response.add_post_render_callback(
+                lambda response: self.add_validators(response, etag, last_modified)
+            )
+            return response
+        if response.status_code in (200, 304):
+            response["ETag"] = etag
+            response["Last-Modified"] = http_date(last_modified)
+            # Have clients revalidate every time; that costs a 304 when nothing
+            # changed instead of serving stale data for the cache timeout.
+            response["Cache-Control"] = "private, no-cache"
+            del response["Expires"]
+        return response
+
+    def get_etag(self, request, versions):
+        validator = "|".join(
+            [
+                *map(str, versions),
+                request.get_full_path(),
+                request.headers.get("Accept", ""),
+                negotiate(request) or "",
+            ]
+        )
+        return '"%s"' % hashlib.md5(validator.encode()).hexdigest()
+
+
+class SparseFieldsMixin:
+    """
+    Lets clients pick serializer fields with ``?fields=a,b`` or drop some with
+    ``?omit=a,b``. The selection is pushed into ``.only()``, so columns nobody
+    asked for are never read from the database.
+    """
+
+    default_fields = None
+
+    def get_requested_fields(self):
+        available = self.get_serializer_class().Meta.fields
+        params = self.request.query_params
+        if "fields" in params:
+            fields = [name for name in params["fields"].split(",") if name]
+        else:
+            fields = list(self.default_fields or available)
+        omit = [name for name in params.get("omit", "").split(",") if name]
+        unknown = sorted(set(fields + omit) - set(available))
+        if unknown:
+            raise ValidationError({"fields": [f"Unknown fields: {', '.join(unknown)}"]})
+        return [name for name in fields if name not in omit]
+
+    def get_queryset(self):
+        return super().get_queryset().only(*self.get_requested_fields())
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault("fields", self.get_requested_fields())
+        return super().get_serializer(*args, **kwargs)
+
+
+class BaseListView(CachePageMixin, generics.ListAPIView):
     filter_backends = [filters.SearchFilter]
 
 
-class BaseDetailView(generics.RetrieveAPIView):
+class BaseDetailView(CachePageMixin, generics.RetrieveAPIView):
     lookup_field = "name"
     lookup_url_kwarg = "drugname"
 
 
-class DrugListView(BaseListView):
+class DrugListView(SparseFieldsMixin, BaseListView):
     queryset = Drug.objects.all()
     serializer_class = DrugSerializer
     search_fields = ["name"]
-
-
-class DrugDetailView(BaseDetailView):
+    cache_scopes = ["drugs"]
+    default_fields = [
+        "name",
+        "dbid",
+        "treatment_count",
+        "auroc",
+        "type",
+        "group",
+        "categories",
+        "description",
+    ]
+
+
+class DrugDetailView(SparseFieldsMixin, BaseDetailView):
     queryset = Drug.objects.all()
     serializer_class = DrugSerializer
 
+    def get_cache_scopes(self, request, *args, **kwargs):
+        dbid = resolve_drug(kwargs[self.lookup_url_kwarg])
+        # Not-found responses are never cached, so they need no scope.
+        return [f"drug:{dbid}"] if dbid else []
+
+    def get_object(self):
+        dbid = resolve_drug(self.kwargs[self.lookup_url_kwarg])
+        if dbid is None:
+            raise NotFound()
+        drug = generics.get_object_or_404(self.get_queryset(), pk=dbid)
+        self.check_object_permissions(self.request, drug)
+        return drug
+
 
 class DiseaseListView(BaseListView):
     queryset = Disease.objects.all()
     serializer_class = DiseaseSerializer
+    cache_scopes = ["diseases"]
+
 
+class AutocompleteView(APIView):
+    """
+    Typeahead over drug and disease names answered from the in-memory
+    ``autocomplete_index``. Authentication is skipped so the token lookup
+    doesn't put a query back on every keystroke.
+    """
 
-class CachedAPIView(APIView):
-    cache_timeout = 60 * 2
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    default_limit = 10
+    max_limit = 50
 
-    @method_decorator(cache_page(cache_timeout))
-    def dispatch(self, *args, **kwargs):
-        return super().dispatch(*args, **kwargs)
+    def get(self, request):
+        kind = request.query_params.get("type")
+        if kind not in (None, "drug", "disease"):
+            raise ValidationError({"type": ["Expected 'drug' or 'disease'."]})
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            raise ValidationError({"limit": ["A valid integer is required."]})
+        limit = min(max(limit, 1), self.max_limit)
+        results = autocomplete_index.search(
+            request.query_params.get("q", ""), limit, kind
+        )
+        return Response({"results": results})
+
+
+class CachedAPIView(CachePageMixin, APIView):
+    cache_versions = None
+
+    def get_count_version(self):
+        # Row counts stay valid for as long as the cached pages do.
+        if self.cache_versions is None:
+            return None
+        return cache_key_prefix(self.cache_versions)
 
     def execute_query(self, sql_query, params):
-        with connection.cursor() as cursor:
+        with db.cursor() as cursor:
             cursor.execute(sql_query, params)
             return cursor.fetchall()
 
@@ -78,215 +284,656 @@ class CachedAPIView(APIView):
         return [{col: row[idx] for idx, col in enumerate(columns)} for row in rows]
 
     def paginate_results(self, results, request, serializer_class):
-        paginator = PageNumberPagination()
+        # ``results`` is usually a RawQuery, so only the requested page and a
+        # row count are read from the database.
+        paginator = self.get_paginator(request)
         page = paginator.paginate_queryset(results, request)
+        return self.paginated_response(paginator, page, results, serializer_class)
+
+    def paginated_response(self, paginator, page, results, serializer_class):
         if page is not None:
-            serializer = serializer_class(page, many=True)
-            return paginator.get_paginated_response(serializer.data)
-        serializer = serializer_class(results, many=True)
-        return Response(serializer.data)
+            return paginator.get_paginated_response(
+                self.represent(page, serializer_class)
+            )
+        return Response(self.represent(list(results), serializer_class))
+
+    def represent(self, rows, serializer_class):
+        # Rows straight from a cursor skip the per-field serializer work.
+        if issubclass(serializer_class, RawRowSerializer):
+            return serializer_class.trusted_data(rows)
+        return serializer_class(rows, many=True).data
+
+    def get_paginator(self, request):
+        if RawCursorPagination.cursor_query_param in request.query_params:
+            return RawCursorPagination()
+        return RawPageNumberPagination()
 
     def handle_exception(self, e):
+        if isinstance(e, APIException):
+            return super().handle_exception(e)
         print(f"Error executing SQL query: {e}")
         return JsonResponse({"error": str(e)}, status=500)
 
     permission_classes = [IsAuthenticated]
 
-    def build_search_sql(self, search_query, fields):
+    def build_search_sql(self, search_query, lookups):
+        """
+        Builds a WHERE clause requiring every search term to occur, ignoring case,
+        in the name of one of the rows referenced by the ``lookups`` columns.
+
+        ``lookups`` maps a foreign key column to the ``(table, key)`` it points
+        at. Terms are resolved to keys first, through the trigram indexes on
+        ``name``, so the main query only filters on indexed key columns.
+        """
         if not search_query:
             return "", []
 
         search_terms = search_query.split()
-        search_clauses = [
-            f"({' OR '.join(f'{field} LIKE %s' for field in fields)})"
-            for _ in search_terms
-        ]
-        params = [f"%{term}%" for term in search_terms for _ in fields]
+        matches = self.resolve_search_terms(search_terms, lookups.values())
+        return self.search_where_sql(search_terms, lookups, matches)
+
+    def search_where_sql(self, search_terms, lookups, matches):
+        search_clauses, params = [], []
+        for idx in range(len(search_terms)):
+            term_clauses = []
+            for position, column in enumerate(lookups):
+                keys = matches.get((idx, position))
+                if keys:
+                    term_clauses.append(f"{column} = ANY(%s)")
+                    params.append(keys)
+            if not term_clauses:
+                return "WHERE FALSE", []
+            search_clauses.append(f"({' OR '.join(term_clauses)})")
         search_sql = "WHERE " + " AND ".join(search_clauses)
         return search_sql, params
 
+    def resolve_search_terms(self, search_terms, targets):
+        rows = self.execute_query(*self.search_terms_sql(search_terms, targets))
+        return self.group_search_matches(rows)
+
+    def search_terms_sql(self, search_terms, targets):
+        selects, params = [], []
+        for idx, term in enumerate(search_terms):
+            pattern = "%{}%".format(
+                term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            )
+            for position, (table, key) in enumerate(targets):
+                selects.append(
+                    f"SELECT {idx}, {position}, {key} FROM {table} WHERE name ILIKE %s"
+                )
+                params.append(pattern)
+        return " UNION ALL ".join(selects), params
+
+    def group_search_matches(self, rows):
+        matches = {}
+        for idx, position, key in rows:
+            matches.setdefault((idx, position), []).append(key)
+        return matches
+
+
+# Columns holding percentiles, which raw SQL reads encoded from the compact
+# schema (see drugs.scores).
+PERCENTILE_COLUMNS = ["compound_prediction", "disease_prediction"]
+
+
+def score_sql(column):
+    # Scores are real in the compact schema. A real's text is its shortest
+    # float4 form, which json_agg embeds, while binary reads widen it to the
+    # exact double. Casting first makes every path decode the same double.
+    return f"{column}::double precision"
+
 
 class DrugDiseaseProbabilityListView(CachedAPIView):
+    # Reads the denormalized drug_disease_prediction view, so names come back
+    # without joining drug and disease.
+    select = [
+        ("id", "ddp.id"),
+        ("drug_name", "ddp.drug_name"),
+        ("disease_name", "ddp.disease_name"),
+        ("prediction", score_sql("ddp.prediction")),
+        ("compound_prediction", "ddp.compound_prediction"),
+        ("disease_prediction", "ddp.disease_prediction"),
+        ("category", "ddp.category"),
+        ("trial_count", "ddp.trial_count"),
+    ]
+    from_sql = "drug_disease_prediction ddp"
+    ordering = ["ddp.id"]
+    search_lookups = {
+        "ddp.drug_id": ("drug", "dbid"),
+        "ddp.disease_id": ("disease", "doid"),
+    }
+    cache_scopes = ["predictions"]
+
     def get(self, request, format=None):
         search_query = request.query_params.get("search", "")
-        search_sql, params = self.build_search_sql(search_query, ["d.name", "dis.name"])
-
-        sql_query = f"""
-            SELECT 
-                ddp.id, d.name AS drug_name, dis.name AS disease_name, ddp.prediction,
-                ddp.compound_prediction, ddp.disease_prediction, ddp.category, ddp.trial_count
-            FROM drug_disease_probability ddp
-            JOIN drug d ON ddp.drug_id = d.dbid
-            JOIN disease dis ON ddp.disease_id = dis.doid
-            {search_sql}
-        """
+        query = self.get_query(
+            *self.build_search_sql(search_query, self.search_lookups)
+        )
 
         try:
-            rows = self.execute_query(sql_query, params)
-            results = self.format_results(
-                rows,
-                [
-                    "id",
-                    "drug_name",
-                    "disease_name",
-                    "prediction",
-                    "compound_prediction",
-                    "disease_prediction",
-                    "category",
-                    "trial_count",
-                ],
-            )
             return self.paginate_results(
-                results, request, DrugDiseaseProbabilitySerializer
+                query, request, DrugDiseaseProbabilitySerializer
             )
         except Exception as e:
             return self.handle_exception(e)
 
+    def get_query(self, search_sql, params):
+        return RawQuery(
+            select=self.select,
+            from_sql=self.from_sql,
+            where_sql=search_sql,
+            params=params,
+            ordering=self.ordering,
+            count_version=self.get_count_version(),
+        )
+
+
+class DrugDiseaseProbabilityBatchView(CachedAPIView):
+    """
+    Looks up to 1000 ``{"drug": ..., "disease": ...}`` pairs posted as
+    ``{"pairs": [...]}`` in one statement. Drugs may be given by dbid, ChEMBL
+    id, InChIKey or name, diseases by doid or name, all ignoring case. Results come back in input
+    order, with an ``error`` instead of scores for pairs that can't be found.
+    """
+
+    def post(self, request, format=None):
+        pairs = self.get_pairs(request)
+        rows = self.execute_query(*self.batch_sql(pairs))
+        return self.batch_response(pairs, rows)
+
+    def get_pairs(self, request):
+        serializer = PairBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["pairs"]
+
+    def batch_sql(self, pairs):
+        select = ", ".join(
+            expression for _, expression in DrugDiseaseProbabilityListView.select
+        )
+        return (
+            f"""
+            SELECT q.idx, d.dbid, dis.doid, {select}
+            FROM unnest(%s::text[], %s::text[], %s::text[])
+                WITH ORDINALITY AS q(drug, drug_name, disease, idx)
+            LEFT JOIN LATERAL (
+                SELECT dbid FROM drug
+                WHERE dbid = upper(q.drug) OR chembl_id = upper(q.drug)
+                    OR inchikey = upper(q.drug) OR normalized_name = q.drug_name
+                ORDER BY normalized_name = q.drug_name, dbid
+                LIMIT 1
+            ) d ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT doid FROM disease
+                WHERE doid = upper(q.disease) OR lower(name) = lower(q.disease)
+                ORDER BY doid = upper(q.disease) DESC, name = q.disease DESC, doid
+                LIMIT 1
+            ) dis ON TRUE
+            LEFT JOIN {DrugDiseaseProbabilityListView.from_sql}
+                ON ddp.drug_id = d.dbid AND ddp.disease_id = dis.doid
+            ORDER BY q.idx
+            """,
+            [
+                [pair["drug"].strip() for pair in pairs],
+                [normalize_name(pair["drug"]) or None for pair in pairs],
+                [pair["disease"].strip() for pair in pairs],
+            ],
+        )
+
+    def batch_response(self, pairs, rows):
+        columns = [alias for alias, _ in DrugDiseaseProbabilityListView.select]
+        results = []
+        for pair, (_, dbid, doid, *values) in zip(pairs, rows):
+            result = {"drug": pair["drug"], "disease": pair["disease"]}
+            if dbid is None:
+                result["error"] = "Unknown drug."
+            elif doid is None:
+                result["error"] = "Unknown disease."
+            elif values[0] is None:
+                result["error"] = "No prediction for this pair."
+            else:
+                result.update(
+                    drug_id=dbid, disease_id=doid, **dict(zip(columns, values))
+                )
+                for column in PERCENTILE_COLUMNS:
+                    result[column] = decode_percentile(result[column])
+            results.append(result)
+        return Response({"results": results})
+
+
+class DrugDiseaseProbabilityExportView(APIView):
+    """
+    Streams every prediction for one drug (``?drug=<name or identifier>``) as
+    NDJSON or CSV (``?format=ndjson|csv``), row by row from a server-side cursor.
+    """
 
-class PathPredictionListView(CachedAPIView):
-    def get(self, request, format=None):
-        search_query = request.query_params.get("search", "")
-        search_sql = "WHERE ddp.id = %s" if search_query else ""
-        params = [search_query] if search_query else []
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    chunk_size = 2000
 
-        sql_query = f"""
-            SELECT 
-                pp.percent_of_prediction, pp.percent_of_dwpc, pp.metapath, pp.length, 
-                pp.verbose_path, pp.drug_disease_probability_id
-            FROM path_prediction pp 
-            JOIN drug_disease_probability ddp ON ddp.id = pp.drug_disease_probability_id
-            {search_sql}
+    def get(self, request, format=None):
+        dbid = resolve_drug(request.query_params.get("drug", ""))
+        if dbid is None:
+            raise NotFound()
+
+        query = RawQuery(
+            select=DrugDiseaseProbabilityListView.select,
+            from_sql=DrugDiseaseProbabilityListView.from_sql,
+            where_sql="WHERE ddp.drug_id = %s",
+            params=[dbid],
+            ordering=DrugDiseaseProbabilityListView.ordering,
+        )
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(query.columns, self.decoded(query)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
+        )
+        response["Content-Disposition"] = (
+            f'attachment; filename="{dbid}-predictions.{renderer.format}"'
+        )
+        return response
+
+    def decoded(self, query):
+        rows = query.iterator(self.chunk_size)
+        if not compact():
+            return rows
+        positions = [query.columns.index(column) for column in PERCENTILE_COLUMNS]
+        return (
+            [
+                decode_percentile(value) if idx in positions else value
+                for idx, value in enumerate(row)
+            ]
+            for row in rows
+        )
+
+
+class TopPredictionsView(CachedAPIView):
+    """
+    Returns the ``k`` best predicted pairs of one drug or disease, optionally
+    limited to a ``category`` and a ``min_trial_count``. Pairs are walked in the
+    order of the ranks precomputed in drug_disease_prediction, through an
+    (entity, rank) index, so a request reads about ``k`` rows however many
+    pairs the entity has.
+
+    Subclasses set ``key_column`` and ``rank_column`` and define ``get_key``,
+    which turns the URL arguments into the key to filter ``key_column`` on.
+    """
+
+    default_k = 50
+    max_k = 1000
+    categories = ["DM", "SYM", "NOT"]
+    cache_scopes = ["predictions"]
+
+    def get(self, request, format=None, **kwargs):
+        query, k = self.get_query(request, self.get_key(**kwargs))
+        return self.top_response(query, k)
+
+    def top_response(self, query, k):
+        return Response(
+            {"results": self.represent(query[:k], RankedPredictionSerializer)}
+        )
+
+    def get_query(self, request, key):
+        params = request.query_params
+        try:
+            k = int(params.get("k", self.default_k))
+            min_trial_count = int(params.get("min_trial_count", 0))
+        except ValueError:
+            raise ValidationError("k and min_trial_count must be integers.")
+        k = min(max(k, 1), self.max_k)
+
+        where, values = [f"ddp.{self.key_column} = %s"], [key]
+        if "category" in params:
+            category = params["category"].upper()
+            if category not in self.categories:
+                raise ValidationError(
+                    {"category": [f"Expected one of {', '.join(self.categories)}."]}
+                )
+            where.append("ddp.category = %s")
+            values.append(category)
+        if min_trial_count > 0:
+            where.append("ddp.trial_count >= %s")
+            values.append(min_trial_count)
+
+        query = RawQuery(
+            select=[
+                ("rank", f"ddp.{self.rank_column}"),
+                *DrugDiseaseProbabilityListView.select,
+                ("drug_id", "ddp.drug_id"),
+                ("disease_id", "ddp.disease_id"),
+            ],
+            from_sql=DrugDiseaseProbabilityListView.from_sql,
+            where_sql="WHERE " + " AND ".join(where),
+            params=values,
+            ordering=[f"ddp.{self.rank_column}"],
+        )
+        return query, k
+
+    def current_matrix(self):
+        """
+        Returns the prediction matrix if it was written for the predictions
+        this response is cached under, else None. It only tells whether the
+        drug or disease has predictions. Responses also need the pairs' ids,
+        names, categories and trial counts, which the matrix doesn't hold, and
+        fetching those for the matrix's top k was slower than walking the
+        (entity, rank) index.
         """
+        matrix = get_matrix()
+        if matrix is None or not self.cache_versions:
+            return None
+        # The last cache scope is "predictions".
+        if matrix.version != self.cache_versions[-1]:
+            return None
+        return matrix
+
+
+class TopDrugsForDiseaseView(TopPredictionsView):
+    key_column = "disease_id"
+    rank_column = "rank_in_disease"
+
+    def get_key(self, doid):
+        # Diseases with predictions are in the matrix, which saves a query.
+        matrix = self.current_matrix()
+        if matrix is not None and doid in matrix.disease_index:
+            return doid
+        if not Disease.objects.filter(pk=doid).exists():
+            raise NotFound()
+        return doid
+
+
+class TopDiseasesForDrugView(TopPredictionsView):
+    key_column = "drug_id"
+    rank_column = "rank_in_drug"
+
+    def get_key(self, drugname):
+        matrix = self.current_matrix()
+        if matrix is not None and drugname in matrix.drug_index:
+            return drugname
+        dbid = resolve_drug(drugname)
+        if dbid is None:
+            raise NotFound()
+        return dbid
+
+
+def term_sql(column):
+    # The explanation tables store metapaths and edges as keys into
+    # explanation_term. A scalar subquery per returned row decodes them
+    # without joining, so pages are still read from the covering indexes.
+    return f"(SELECT name FROM explanation_term WHERE id = {column})"
+
+
+class ExplanationListView(CachedAPIView):
+    """
+    Lists the rows of one explanation table, optionally filtered to a single
+    drug-disease pair with ``?search=<drug_disease_probability id>``.
+    """
+
+    table = None
+    alias = None
+    select = []
+    serializer_class = None
+
+    @classmethod
+    def get_ordering(cls):
+        return [f"-{cls.alias}.percent_of_prediction", f"-{cls.alias}.id"]
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        search_query = request.GET.get("search", "")
+        if search_query:
+            return [f"pair:{search_query}"]
+        return [f"explanations:{self.table}"]
 
+    def get(self, request, format=None):
         try:
-            rows = self.execute_query(sql_query, params)
-            results = self.format_results(
-                rows,
-                [
-                    "percent_of_prediction",
-                    "percent_of_dwpc",
-                    "metapath",
-                    "length",
-                    "verbose_path",
-                    "drug_disease_probability",
-                ],
+            return self.paginate_results(
+                self.get_query(request), request, self.serializer_class
             )
-            return self.paginate_results(results, request, PathPredictionSerializer)
         except Exception as e:
             return self.handle_exception(e)
 
-
-class MetaPathPredictionListView(CachedAPIView):
-    def get(self, request, format=None):
+    def get_query(self, request):
         search_query = request.query_params.get("search", "")
-        search_sql = "WHERE ddp.id = %s" if search_query else ""
+        search_sql = (
+            f"WHERE {self.alias}.drug_disease_probability_id = %s"
+            if search_query
+            else ""
+        )
         params = [search_query] if search_query else []
 
-        sql_query = f"""
-            SELECT 
-                mp.metapath, mp.percent_of_prediction, mp.path_count, mp.length, 
-                mp.verbose, mp.drug_disease_probability_id
-            FROM metapath_prediction mp
-            JOIN drug_disease_probability ddp ON ddp.id = mp.drug_disease_probability_id
-            {search_sql}
-        """
+        return RawQuery(
+            select=self.select,
+            from_sql=f"{self.table} {self.alias}",
+            where_sql=search_sql,
+            params=params,
+            ordering=self.get_ordering(),
+            count_version=self.get_count_version(),
+        )
+
+
+class PathPredictionListView(ExplanationListView):
+    table = "path_prediction"
+    alias = "pp"
+    select = [
+        ("percent_of_prediction", score_sql("pp.percent_of_prediction")),
+        ("percent_of_dwpc", score_sql("pp.percent_of_dwpc")),
+        ("metapath", term_sql("pp.metapath_id")),
+        ("length", "pp.length"),
+        ("verbose_path", "pp.verbose_path"),
+    ]
+    serializer_class = PathPredictionSerializer
+    max_top = 1000
 
+    def get(self, request, format=None):
+        if "top" not in request.query_params:
+            return super().get(request, format)
         try:
-            rows = self.execute_query(sql_query, params)
-            results = self.format_results(
-                rows,
-                [
-                    "metapath",
-                    "percent_of_prediction",
-                    "path_count",
-                    "length",
-                    "verbose",
-                    "drug_disease_probability",
-                ],
-            )
-            return self.paginate_results(results, request, MetapathPredictionSerializer)
+            rows = self.execute_query(*self.top_sql(request))
         except Exception as e:
             return self.handle_exception(e)
+        return self.top_response(rows)
 
-
-class SourceEdgePredictionListView(CachedAPIView):
-    def get(self, request, format=None):
-        search_query = request.query_params.get("search", "")
-        search_sql = "WHERE ddp.id = %s" if search_query else ""
-        params = [search_query] if search_query else []
-
-        sql_query = f"""
-            SELECT 
-                sp.source_edge, sp.percent_of_prediction, sp.path_count, 
-                sp.distinct_metapaths, sp.drug_disease_probability_id
-            FROM sourceedge_prediction sp
-            JOIN drug_disease_probability ddp ON ddp.id = sp.drug_disease_probability_id
-            {search_sql}
+    def top_sql(self, request):
         """
-
+        With ``?top=N`` (and optionally ``&min_percent=``) a pair's paths are
+        summarized as its N best rows at or above ``min_percent`` and one
+        aggregate of the rest. The top rows come from the (pair, -percent, -id)
+        index, stopping after N; the rest are counted and summed from what
+        path_prediction_summary keeps per pair, less the top rows.
+        """
+        params = request.query_params
+        if not params.get("search"):
+            raise ValidationError({"search": ["Required with top."]})
         try:
-            rows = self.execute_query(sql_query, params)
-            results = self.format_results(
-                rows,
-                [
-                    "source_edge",
-                    "percent_of_prediction",
-                    "path_count",
-                    "distinct_metapaths",
-                    "drug_disease_probability",
-                ],
-            )
-            return self.paginate_results(
-                results, request, SourceEdgePredictionSerializer
+            pk = int(params["search"])
+        except ValueError:
+            raise ValidationError({"search": ["A pair id is required with top."]})
+        try:
+            top = int(params["top"])
+            min_percent = float(params.get("min_percent", 0))
+        except ValueError:
+            raise ValidationError("top and min_percent must be numbers.")
+        top = min(max(top, 0), self.max_top)
+
+        query = RawQuery(
+            select=self.select,
+            from_sql=f"{self.table} {self.alias}",
+            where_sql=f"WHERE {self.alias}.drug_disease_probability_id = %s "
+            f"AND {self.alias}.percent_of_prediction >= %s",
+            params=[pk, min_percent],
+            ordering=self.get_ordering(),
+        )
+        summary = PathPredictionSummary._meta.db_table
+        sql = (
+            f"SELECT {query.json_sql()}, s.path_count, s.percent_sum "
+            f"FROM (SELECT %s::bigint AS id) pair "
+            f"LEFT JOIN {summary} s ON s.drug_disease_probability_id = pair.id"
+        )
+        return sql, [*query.params, top, pk]
+
+    def top_response(self, rows):
+        # The top rows are a prefix of the pair's rows in index order, so the
+        # rest are what the pair's summary holds beyond them.
+        results, path_count, percent_sum = rows[0]
+        rest_count = (path_count or 0) - len(results)
+        rest_percent = 0.0
+        if rest_count:
+            rest_percent = percent_sum - math.fsum(
+                row["percent_of_prediction"] for row in results
             )
-        except Exception as e:
-            return self.handle_exception(e)
-
+        return Response(
+            {
+                "count": len(results) + rest_count,
+                "results": self.serializer_class(results, many=True).data,
+                "rest": {
+                    "count": rest_count,
+                    "percent_of_prediction": rest_percent,
+                },
+            }
+        )
+
+
+class MetaPathPredictionListView(ExplanationListView):
+    table = "metapath_prediction"
+    alias = "mp"
+    select = [
+        ("metapath", term_sql("mp.metapath_id")),
+        ("percent_of_prediction", score_sql("mp.percent_of_prediction")),
+        ("path_count", "mp.path_count"),
+        ("length", "mp.length"),
+        ("verbose", term_sql("mp.verbose_id")),
+    ]
+    serializer_class = MetapathPredictionSerializer
+
+
+class SourceEdgePredictionListView(ExplanationListView):
+    table = "sourceedge_prediction"
+    alias = "sp"
+    select = [
+        ("source_edge", term_sql("sp.source_edge_id")),
+        ("percent_of_prediction", score_sql("sp.percent_of_prediction")),
+        ("path_count", "sp.path_count"),
+        ("distinct_metapaths", "sp.distinct_metapaths"),
+    ]
+    serializer_class = SourceEdgePredictionSerializer
+
+
+class TargetEdgePredictionListView(ExplanationListView):
+    table = "targetedge_prediction"
+    alias = "tp"
+    select = [
+        ("target_edge", term_sql("tp.target_edge_id")),
+        ("percent_of_prediction", score_sql("tp.percent_of_prediction")),
+        ("path_count", "tp.path_count"),
+        ("distinct_metapaths", "tp.distinct_metapaths"),
+    ]
+    serializer_class = TargetEdgePredictionSerializer
+
+
+class DrugDiseaseExplanationView(CachedAPIView):
+    """
+    Returns one drug-disease pair together with the top rows and row counts of
+    all four explanation tables, built by a single SQL statement.
+    """
+
+    explanations = {
+        "path_predictions": PathPredictionListView,
+        "metapath_predictions": MetaPathPredictionListView,
+        "source_edge_predictions": SourceEdgePredictionListView,
+        "target_edge_predictions": TargetEdgePredictionListView,
+    }
+    max_limit = 1000
 
-class TargetEdgePredictionListView(CachedAPIView):
-    def get(self, request, format=None):
-        search_query = request.query_params.get("search", "")
-        search_sql = "WHERE ddp.id = %s" if search_query else ""
-        params = [search_query] if search_query else []
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return [f"pair:{kwargs['pk']}", "drugs", "diseases"]
 
-        sql_query = f"""
-            SELECT 
-                tp.target_edge, tp.percent_of_prediction, tp.path_count, 
-                tp.distinct_metapaths, tp.drug_disease_probability_id
-            FROM targetedge_prediction tp
-            JOIN drug_disease_probability ddp ON ddp.id = tp.drug_disease_probability_id
-            {search_sql}
-        """
+    def get(self, request, pk, format=None):
+        try:
+            rows = self.execute_query(*self.get_sql(request, pk))
+        except Exception as e:
+            return self.handle_exception(e)
+        return self.bundle_response(rows)
 
+    def get_sql(self, request, pk):
         try:
-            rows = self.execute_query(sql_query, params)
-            results = self.format_results(
-                rows,
-                [
-                    "target_edge",
-                    "percent_of_prediction",
-                    "path_count",
-                    "distinct_metapaths",
-                    "drug_disease_probability",
-                ],
+            limit = int(request.query_params.get("limit", api_settings.PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({"limit": "A valid integer is required."})
+        limit = min(max(limit, 0), self.max_limit)
+
+        # Read straight from the base tables, which model signals track, rather
+        # than from the materialized view, which is refreshed after commit.
+        probability = RawQuery(
+            select=[
+                ("id", "ddp.id"),
+                ("drug_name", "d.name"),
+                ("disease_name", "dis.name"),
+                ("prediction", score_sql("ddp.prediction")),
+                ("compound_prediction", "ddp.compound_prediction"),
+                ("disease_prediction", "ddp.disease_prediction"),
+                ("category", "ddp.category"),
+                ("trial_count", "ddp.trial_count"),
+            ],
+            from_sql="""
+                drug_disease_probability ddp
+                JOIN drug d ON ddp.drug_id = d.dbid
+                JOIN disease dis ON ddp.disease_id = dis.doid
+            """,
+            where_sql="WHERE ddp.id = %s",
+            params=[pk],
+        )
+        columns, params = [probability.json_sql()], [*probability.params, 1]
+        for view_class in self.explanations.values():
+            query = RawQuery(
+                select=view_class.select,
+                from_sql=f"{view_class.table} {view_class.alias}",
+                where_sql=f"WHERE {view_class.alias}.drug_disease_probability_id = %s",
+                params=[pk],
+                ordering=view_class.get_ordering(),
             )
-            return self.paginate_results(
-                results, request, TargetEdgePredictionSerializer
+            columns.append(
+                f"(SELECT COUNT(*) FROM {view_class.table} "
+                "WHERE drug_disease_probability_id = %s)"
             )
-        except Exception as e:
-            return self.handle_exception(e)
+            columns.append(query.json_sql())
+            params.extend([pk, *query.params, limit])
+        return f"SELECT {', '.join(columns)}", params
+
+    def bundle_response(self, rows):
+        row = rows[0]
+        if not row[0]:
+            raise NotFound()
+        data = {
+            "probability": DrugDiseaseProbabilitySerializer(row[0][0]).data,
+        }
+        for idx, (name, view_class) in enumerate(self.explanations.items()):
+            count, results = row[1 + 2 * idx : 3 + 2 * idx]
+            data[name] = {
+                "count": count,
+                "results": view_class.serializer_class(results, many=True).data,
+            }
+        return Response(data)
 
 
 class IndicationListView(BaseListView):
     queryset = DiseaseIndication.objects.all()
     serializer_class = IndicationSerializer
     search_fields = ["chembl_id__name"]
+    cache_scopes = ["indications"]
 
 
 class MechanismOfActionListView(BaseListView):
     queryset = MechanismOfAction.objects.all()
     serializer_class = MechanismOfActionSerializer
     search_fields = ["chembl_id__name"]
+    cache_scopes = ["mechanisms"]
+
+
+class PoolStatsView(APIView):
+    """Counters of this worker's database connection pools, for monitoring."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(db.pool_stats())
 
 
 def api_overview(request):
@@ -2,15 +2,38 @@
 ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The API's raw SQL views are served by their async versions here; run it with
+an ASGI server, which is an optional dependency left out of requirements.txt,
+e.g. ``uvicorn backend.asgi:application --workers 2``. The image runs the WSGI
+application instead: the CSV/NDJSON export streams from a sync iterator, which
+ASGI servers consume one chunk at a time through a thread.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
 
 import os
+import threading
 
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+os.environ.setdefault("ASYNC_API_VIEWS", "1")
 
 application = get_asgi_application()
+
+# Build the typeahead index as each worker starts rather than on the first
+# keystroke. ASGI servers import the application inside their event loop, where
+# the ORM refuses to run, so the index is built in a thread.
+from api.autocomplete import autocomplete_index  # noqa: E402
+from django.db import connections  # noqa: E402
+
+
+def build_autocomplete_index():
+    autocomplete_index.build()
+    connections.close_all()
+
+
+warm_up = threading.Thread(target=build_autocomplete_index)
+warm_up.start()
+warm_up.join()
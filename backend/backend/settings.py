@@ -1,5 +1,6 @@
 from pathlib import Path
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from the .env file
@@ -41,6 +42,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "api.compression.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -80,9 +82,96 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Keep connections open between requests, checking them before reuse,
+        # so requests don't pay for connecting and authenticating.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "1") == "1",
     }
 }
 
+# Optional per-process pool for the API's raw SQL (api.db.cursor), shared by
+# all of a worker's threads. Pooled connections are checked before each use
+# and closed after MAX_IDLE seconds unused, down to MIN_SIZE. A request waits
+# up to TIMEOUT seconds for a free connection.
+
+DB_POOL = {
+    "ENABLED": os.getenv("DB_POOL", "0") == "1",
+    "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+    "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+    "MAX_IDLE": float(os.getenv("DB_POOL_MAX_IDLE", 600)),
+    "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 30)),
+}
+
+# Response cache shared by all workers on the host. The default backend keeps
+# entries in one SQLite file with size-bounded LRU eviction.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("CACHE_BACKEND", "api.cache.SQLiteLRUCache"),
+        "LOCATION": os.getenv(
+            "CACHE_LOCATION",
+            os.path.join(tempfile.gettempdir(), "audrie-cache.sqlite3"),
+        ),
+        "TIMEOUT": int(os.getenv("CACHE_TIMEOUT", 60 * 5)),
+        "OPTIONS": {
+            "MAX_ENTRIES": int(os.getenv("CACHE_MAX_ENTRIES", 10000)),
+            "MAX_SIZE": int(os.getenv("CACHE_MAX_SIZE", 256 * 1024 * 1024)),
+        },
+    }
+}
+
+# Response compression (see api.compression). Buffered responses smaller than
+# MIN_SIZE bytes are sent as is; streamed ones are always compressed. The first
+# of ENCODINGS the client accepts equally well wins.
+
+COMPRESSION = {
+    "MIN_SIZE": int(os.getenv("COMPRESSION_MIN_SIZE", 1024)),
+    "ENCODINGS": os.getenv("COMPRESSION_ENCODINGS", "zstd,br,gzip").split(","),
+    "LEVELS": {
+        "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", 1)),
+        "br": int(os.getenv("COMPRESSION_BROTLI_LEVEL", 4)),
+        "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)),
+    },
+    # Only API data is compressed. HTML pages such as the admin and the
+    # browsable API carry CSRF tokens, which compression would expose to BREACH.
+    "CONTENT_TYPES": os.getenv(
+        "COMPRESSION_CONTENT_TYPES", "application/json,application/x-ndjson,text/csv"
+    ).split(","),
+}
+
+# Model edits refresh the drug_disease_prediction view this many seconds after
+# they commit, in a background thread, so edits in between share one refresh.
+# 0 refreshes as each transaction commits.
+
+PREDICTIONS_REFRESH_DELAY = float(os.getenv("PREDICTIONS_REFRESH_DELAY", 5))
+
+# Dense float32 copy of the prediction grid, memory-mapped read-only by every
+# worker. Written by import_predictions and export_prediction_matrix.
+
+PREDICTION_MATRIX_PATH = os.getenv(
+    "PREDICTION_MATRIX_PATH",
+    os.path.join(tempfile.gettempdir(), "audrie-predictions.matrix"),
+)
+
+# Compact storage for the prediction scores (see drugs.scores): real for the
+# predictions and explanation percentages, scaled smallint for the percentiles.
+# Run ``manage.py convert_scores`` after changing it to convert the tables.
+
+COMPACT_SCORES = os.getenv("COMPACT_SCORES", "0") == "1"
+
+# Under ASGI (see backend/asgi.py) the raw SQL API views are served by async
+# versions, which query through a bounded pool of async connections per worker.
+
+ASYNC_API_VIEWS = os.getenv("ASYNC_API_VIEWS", "0") == "1"
+
+ASYNC_DB_POOL = {
+    "MIN_SIZE": int(os.getenv("ASYNC_DB_POOL_MIN_SIZE", 2)),
+    "MAX_SIZE": int(os.getenv("ASYNC_DB_POOL_MAX_SIZE", 10)),
+    "MAX_IDLE": float(os.getenv("ASYNC_DB_POOL_MAX_IDLE", 600)),
+    # Seconds a request waits for a free connection before failing.
+    "TIMEOUT": float(os.getenv("ASYNC_DB_POOL_TIMEOUT", 30)),
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
 
@@ -104,6 +193,10 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 20,
+    "DEFAULT_RENDERER_CLASSES": (
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
     ),
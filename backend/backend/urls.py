@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path
 from django.conf.urls import include
-from drugs.views import PathPredictionAutocomplete, home
+from drugs.views import ExplanationTermAutocomplete, PathPredictionAutocomplete, home
 
 
 urlpatterns = [
@@ -12,5 +12,10 @@ urlpatterns = [
         PathPredictionAutocomplete.as_view(),
         name="path-predictions-autocomplete",
     ),
+    path(
+        "api/explanation-terms-autocomplete/",
+        ExplanationTermAutocomplete.as_view(),
+        name="explanation-terms-autocomplete",
+    ),
     path("", home, name="home"),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
 
 application = get_wsgi_application()
+
+# Build the typeahead index as each worker starts rather than on the first
+# keystroke.
+from api.autocomplete import autocomplete_index  # noqa: E402
+
+autocomplete_index.build()
@@ -3,6 +3,7 @@ from .models import (
     Drug,
     Disease,
     DrugDiseaseProbability,
+    ExplanationTerm,
     PathPrediction,
     MetaPathPrediction,
     SourceEdgePrediction,
@@ -29,6 +30,15 @@ class DrugDiseaseProbabilityAdmin(admin.ModelAdmin):
     search_fields = ["drug__name", "disease__name"]
 
 
+class ExplanationTermAdmin(admin.ModelAdmin):
+    list_display = ["name", "id"]
+    search_fields = ["name"]
+
+
+def term_widget():
+    return autocomplete.ModelSelect2(url="explanation-terms-autocomplete")
+
+
 class PathPredictionForm(forms.ModelForm):
     class Meta:
         model = PathPrediction
@@ -44,6 +54,7 @@ class PathPredictionForm(forms.ModelForm):
             "drug_disease_probability": autocomplete.ModelSelect2(
                 url="path-predictions-autocomplete", forward=["length"]
             ),
+            "metapath": term_widget(),
         }
 
 
@@ -78,6 +89,8 @@ class MetaPathPredictionForm(forms.ModelForm):
             "drug_disease_probability": autocomplete.ModelSelect2(
                 url="path-predictions-autocomplete", forward=["length"]
             ),
+            "metapath": term_widget(),
+            "verbose": term_widget(),
         }
 
 
@@ -111,6 +124,7 @@ class SourceEdgePredictionForm(forms.ModelForm):
             "drug_disease_probability": autocomplete.ModelSelect2(
                 url="path-predictions-autocomplete", forward=["length"]
             ),
+            "source_edge": term_widget(),
         }
 
 
@@ -143,6 +157,7 @@ class TargetEdgePredictionForm(forms.ModelForm):
             "drug_disease_probability": autocomplete.ModelSelect2(
                 url="path-predictions-autocomplete", forward=["length"]
             ),
+            "target_edge": term_widget(),
         }
 
 
@@ -213,6 +228,7 @@ class MechanismOfActionAdmin(admin.ModelAdmin):
     form = MechanismOfActionForm
 
 
+admin.site.register(ExplanationTerm, ExplanationTermAdmin)
 admin.site.register(SourceEdgePrediction, SourceEdgePredictionAdmin)
 admin.site.register(TargetEdgePrediction, TargetEdgePredictionAdmin)
 admin.site.register(MetaPathPrediction, MetaPathPredictionAdmin)
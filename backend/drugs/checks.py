@@ -0,0 +1,24 @@
+from django.core import checks
+from django.db import connections
+
+from .scores import pending_changes
+
+
+@checks.register(checks.Tags.database)
+def check_score_columns(app_configs, databases=None, **kwargs):
+    """
+    Reports score columns whose type doesn't match COMPACT_SCORES, which would
+    make the raw SQL views and the prediction matrix misread them.
+    """
+    errors = []
+    for alias in databases or []:
+        for table, columns in pending_changes(connections[alias]).items():
+            errors.append(
+                checks.Error(
+                    f"{table} stores {', '.join(column for column, _, _ in columns)} "
+                    "in a type COMPACT_SCORES doesn't select.",
+                    hint="Run manage.py convert_scores.",
+                    id="drugs.E001",
+                )
+            )
+    return errors
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from drugs.models import (
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    PathPrediction,
+    PathPredictionSummary,
+)
+from drugs.scores import compact, pending_changes
+from drugs.signals import dataset_changed, predictions_refreshed
+
+
+class Command(BaseCommand):
+    help = (
+        "Converts the prediction score columns in place to the storage selected "
+        "by COMPACT_SCORES: double precision, or real with percentiles as "
+        "smallint counts of 1/10000. Each table is rewritten once, and "
+        "drug_disease_prediction is rebuilt since it copies the converted "
+        "columns. Going back from the compact schema keeps its rounding."
+    )
+
+    def handle(self, *args, **options):
+        storage = "compact" if compact() else "double precision"
+        changes = pending_changes(connection)
+        if not changes:
+            self.stdout.write(f"Score columns already use the {storage} storage.")
+            return
+
+        started = time.monotonic()
+        view = DrugDiseasePrediction._meta.db_table
+        # The materialized view depends on the columns it copies.
+        rebuild = DrugDiseaseProbability._meta.db_table in changes
+        with transaction.atomic(), connection.cursor() as cursor:
+            if rebuild:
+                cursor.execute("SELECT pg_get_viewdef(%s::regclass)", [view])
+                definition = cursor.fetchone()[0]
+                cursor.execute(
+                    "SELECT indexdef FROM pg_indexes "
+                    "WHERE schemaname = current_schema() AND tablename = %s",
+                    [view],
+                )
+                indexes = [row[0] for row in cursor.fetchall()]
+                cursor.execute(f"DROP MATERIALIZED VIEW {view}")
+
+            for table, columns in changes.items():
+                cursor.execute(
+                    f"ALTER TABLE {table} "
+                    + ", ".join(
+                        f"ALTER COLUMN {column} TYPE {target} USING {using}"
+                        for column, target, using in columns
+                    )
+                )
+                self.stdout.write(
+                    f"{table}: {', '.join(column for column, _, _ in columns)}"
+                )
+            if PathPrediction._meta.db_table in changes:
+                # Its sums were taken over the values before rounding.
+                PathPredictionSummary.rebuild()
+
+            if rebuild:
+                cursor.execute(
+                    f"CREATE MATERIALIZED VIEW {view} AS {definition.rstrip(';')}"
+                )
+                for index in indexes:
+                    cursor.execute(index)
+
+        with connection.cursor() as cursor:
+            for table in [*changes, *([view] if rebuild else [])]:
+                cursor.execute(f"VACUUM ANALYZE {table}")
+        if rebuild:
+            # Percentiles may have been rounded.
+            predictions_refreshed.send(sender=DrugDiseasePrediction)
+        dataset_changed.send(sender=DrugDiseaseProbability)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Converted {len(changes)} tables to the {storage} storage in "
+                f"{time.monotonic() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.versioning import get_versions
+from drugs.matrix import write_matrix
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes prediction, compound_prediction and disease_prediction of every "
+        "pair into the memory-mapped float32 matrix read by the API workers. "
+        "It is rewritten whenever drug_disease_prediction is refreshed, so this "
+        "is only needed to recreate a lost file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--path",
+            default=settings.PREDICTION_MATRIX_PATH,
+            help="Output file. Defaults to PREDICTION_MATRIX_PATH.",
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        fields, drugs, diseases = write_matrix(
+            options["path"], version=get_versions(["predictions"])[-1]
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Wrote {fields} x {drugs} x {diseases} matrix to {options['path']} "
+                f"in {time.monotonic() - started:.1f}s."
+            )
+        )
@@ -0,0 +1,435 @@
+import csv
+import gzip
+import hashlib
+import io
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.db.models import NOT_PROVIDED
+
+from drugs.models import (
+    DatasetImport,
+    Disease,
+    Drug,
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    ExplanationTerm,
+    MetaPathPrediction,
+    PathPrediction,
+    PathPredictionSummary,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+    normalize_name,
+)
+from drugs.scores import PercentileField, compact, encode_percentile
+from drugs.signals import dataset_changed
+
+PROBABILITIES = "probabilities"
+
+# Input file stem -> model loaded from it. Every file has ``drug`` and
+# ``disease`` columns (dbid/doid or name) plus the model's own columns.
+TABLES = {
+    PROBABILITIES: DrugDiseaseProbability,
+    "path_predictions": PathPrediction,
+    "metapath_predictions": MetaPathPrediction,
+    "sourceedge_predictions": SourceEdgePrediction,
+    "targetedge_predictions": TargetEdgePrediction,
+}
+
+EXTENSIONS = [".tsv", ".csv", ".parquet"]
+
+
+def value_fields(model):
+    # Columns with a database default, like updated_at, are filled by it.
+    # Explanation terms are read as strings and stored as their keys.
+    return [
+        field
+        for field in model._meta.concrete_fields
+        if not field.primary_key
+        and (not field.is_relation or field.related_model is ExplanationTerm)
+        and field.db_default is NOT_PROVIDED
+    ]
+
+
+def read_rows(path):
+    """Yields the header and then every row of a TSV, CSV or Parquet file."""
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow.parquet
+        except ImportError:
+            raise CommandError("Reading Parquet files requires pyarrow.")
+        parquet = pyarrow.parquet.ParquetFile(path)
+        yield parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=65536):
+            yield from zip(*batch.to_pydict().values())
+        return
+    opener = gzip.open if path.endswith(".gz") else open
+    delimiter = "\t" if ".tsv" in os.path.basename(path) else ","
+    with opener(path, "rt", newline="") as handle:
+        yield from csv.reader(handle, delimiter=delimiter)
+
+
+class CopyStream(io.TextIOBase):
+    """File-like view of an iterable of rows as CSV, read in chunks by COPY."""
+
+    batch_size = 1000
+
+    def __init__(self, rows):
+        self.rows = iter(rows)
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer, quoting=csv.QUOTE_ALL)
+        self.pending = ""
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self.pending) < size:
+            batch = list(itertools.islice(self.rows, self.batch_size))
+            if not batch:
+                break
+            self.writer.writerows(batch)
+            self.pending += self.buffer.getvalue()
+            self.buffer.seek(0)
+            self.buffer.truncate()
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+
+def key_maps():
+    """Maps normalized dbids, doids and names to drug and disease keys."""
+    maps = []
+    for model in [Drug, Disease]:
+        keys = {}
+        for pk, name in model.objects.values_list("pk", "name"):
+            keys.setdefault(normalize_name(name), pk)
+        for pk in set(keys.values()):
+            keys[normalize_name(pk)] = pk
+            keys[pk] = pk
+        keys.pop("", None)
+        maps.append(keys)
+    return maps
+
+
+def secondary_objects(table):
+    """
+    Returns DROP and re-CREATE statements for the table's secondary indexes
+    and foreign keys. Primary keys and unique constraints stay in place.
+    Foreign keys come back NOT VALID and are validated separately, which
+    doesn't block writes to the referenced table.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                format('DROP INDEX %%I', i.relname),
+                pg_get_indexdef(i.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            WHERE x.indrelid = %s::regclass
+              AND NOT EXISTS (
+                  SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid
+              )
+            UNION ALL
+            SELECT
+                format('ALTER TABLE %%I DROP CONSTRAINT %%I', %s, conname),
+                format(
+                    'ALTER TABLE %%1$I ADD CONSTRAINT %%2$I %%3$s NOT VALID; '
+                    'ALTER TABLE %%1$I VALIDATE CONSTRAINT %%2$I',
+                    %s, conname, pg_get_constraintdef(oid)
+                )
+            FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+            """,
+            [table, table, table, table],
+        )
+        return cursor.fetchall()
+
+
+def staging_table(table):
+    return f"import_{table}"
+
+
+def stage_table(name, path):
+    """
+    Copies one input file into an unlogged staging table with COPY, keyed by
+    drug and disease, since the pairs' ids aren't known until they are loaded.
+    Explanation terms are staged as strings, so no table but the staging one
+    is written to. Returns the staged and skipped row counts and the elapsed
+    seconds.
+    """
+    started = time.monotonic()
+    model = TABLES[name]
+    table = model._meta.db_table
+    fields = value_fields(model)
+    columns = [connection.ops.quote_name(field.column) for field in fields]
+    drugs, diseases = key_maps()
+
+    rows = read_rows(path)
+    header = [column.strip() for column in next(rows)]
+    missing = sorted(
+        {"drug", "disease", *(field.name for field in fields)} - set(header)
+    )
+    if missing:
+        raise CommandError(f"{path} is missing columns: {', '.join(missing)}")
+    drug_idx, disease_idx = header.index("drug"), header.index("disease")
+    value_idx = [header.index(field.name) for field in fields]
+    percentile_idx = [
+        idx
+        for idx, field in enumerate(fields)
+        if isinstance(field, PercentileField) and compact()
+    ]
+    skipped = 0
+
+    def resolved():
+        nonlocal skipped
+        for row in rows:
+            # Exact keys are the common case; skip normalizing those.
+            drug = row[drug_idx]
+            drug = drugs.get(drug) or drugs.get(normalize_name(str(drug)))
+            disease = row[disease_idx]
+            disease = diseases.get(disease) or diseases.get(
+                normalize_name(str(disease))
+            )
+            if not (drug and disease):
+                skipped += 1
+                continue
+            values = [row[idx] for idx in value_idx]
+            for idx in percentile_idx:
+                values[idx] = encode_percentile(float(values[idx]))
+            yield [drug, disease, *values]
+
+    if name == PROBABILITIES:
+        source = f"{table} p"
+    else:
+        source = (
+            f"{table} t JOIN {DrugDiseaseProbability._meta.db_table} p "
+            "ON p.id = t.drug_disease_probability_id"
+        )
+    # Typed like the live columns, except for terms.
+    staged_columns = [
+        f"NULL::text AS {column}" if field.related_model is ExplanationTerm else column
+        for field, column in zip(fields, columns)
+    ]
+    staging = staging_table(table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {staging}")
+        cursor.execute(
+            f"CREATE UNLOGGED TABLE {staging} AS "
+            f"SELECT p.drug_id, p.disease_id, {', '.join(staged_columns)} "
+            f"FROM {source} WITH NO DATA"
+        )
+        stream = CopyStream(resolved())
+        with cursor.copy(
+            f"COPY {staging} (drug_id, disease_id, {', '.join(columns)}) "
+            "FROM STDIN WITH (FORMAT csv)"
+        ) as copy:
+            while data := stream.read(1 << 16):
+                copy.write(data)
+        staged = cursor.rowcount
+        if name == PROBABILITIES:
+            cursor.execute(
+                f"SELECT drug_id, disease_id FROM {staging} "
+                "GROUP BY drug_id, disease_id HAVING COUNT(*) > 1 "
+                "ORDER BY drug_id, disease_id LIMIT 5"
+            )
+            if duplicates := cursor.fetchall():
+                pairs = ", ".join(f"{drug}/{disease}" for drug, disease in duplicates)
+                raise CommandError(f"{path} lists pairs more than once: {pairs}")
+    return staged, skipped, time.monotonic() - started
+
+
+def replace_table(name):
+    """
+    Replaces the contents of one table with its staged rows, with its secondary
+    indexes and foreign keys dropped while they go in. Explanation rows whose
+    pair isn't in the new probabilities are dropped, and new explanation terms
+    are added. Meant to run inside the import's transaction, after the
+    probabilities were replaced. Returns the loaded row count and the elapsed
+    seconds.
+    """
+    started = time.monotonic()
+    model = TABLES[name]
+    table = model._meta.db_table
+    staging = staging_table(table)
+    term_table = ExplanationTerm._meta.db_table
+    columns, staged, joins, terms = [], [], [], []
+    for field in value_fields(model):
+        column = connection.ops.quote_name(field.column)
+        columns.append(column)
+        if field.related_model is ExplanationTerm:
+            alias = f"t{len(terms)}"
+            staged.append(f"{alias}.id")
+            joins.append(f"LEFT JOIN {term_table} {alias} ON {alias}.name = s.{column}")
+            terms.append(column)
+        else:
+            staged.append(f"s.{column}")
+    if name == PROBABILITIES:
+        target_columns = ["drug_id", "disease_id", *columns]
+        select = f"SELECT s.drug_id, s.disease_id, {', '.join(staged)} FROM {staging} s"
+    else:
+        target_columns = ["drug_disease_probability_id", *columns]
+        select = (
+            f"SELECT p.id, {', '.join(staged)} FROM {staging} s "
+            f"JOIN {DrugDiseaseProbability._meta.db_table} p "
+            "USING (drug_id, disease_id)"
+        )
+    select = " ".join([select, *joins])
+    statements = secondary_objects(table)
+    with connection.cursor() as cursor:
+        for column in terms:
+            cursor.execute(
+                f"INSERT INTO {term_table} (name) "
+                f"SELECT DISTINCT {column} FROM {staging} WHERE {column} IS NOT NULL "
+                "ON CONFLICT (name) DO NOTHING"
+            )
+        for drop, _ in statements:
+            cursor.execute(drop)
+        cursor.execute(f"INSERT INTO {table} ({', '.join(target_columns)}) {select}")
+        loaded = cursor.rowcount
+        for _, create in statements:
+            cursor.execute(create)
+        cursor.execute(f"ANALYZE {table}")
+    return loaded, time.monotonic() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Replaces drug_disease_probability and the four explanation tables with "
+        "the contents of a dataset directory in one transaction, after copying "
+        "each file into a staging table with COPY. The tables are locked, and "
+        "API reads wait, while that transaction runs, so run it in a "
+        "maintenance window. The directory holds "
+        "probabilities, path_predictions, metapath_predictions, "
+        "sourceedge_predictions and targetedge_predictions files (.tsv, .csv or "
+        ".parquet, optionally .gz) keyed by drug and disease dbid/doid or name. "
+        "Importing a version that was already imported does nothing."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory")
+        parser.add_argument(
+            "--dataset-version",
+            help="Version label. Defaults to a hash of the input files.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=min(4, os.cpu_count() or 1),
+            help="Processes copying files into staging tables in parallel.",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Reload even if this version was already imported.",
+        )
+
+    def handle(self, *args, **options):
+        paths = self.find_inputs(options["directory"])
+        version = options["dataset_version"] or self.hash_inputs(paths.values())
+        if DatasetImport.objects.filter(version=version).exists():
+            if not options["force"]:
+                self.stdout.write(f"Dataset {version} is already imported.")
+                return
+
+        started = time.monotonic()
+        # Explanation rows reference the pairs, so those go in first.
+        names = [PROBABILITIES, *(name for name in paths if name != PROBABILITIES)]
+        staged = {}
+        try:
+            if options["workers"] > 1:
+                # Workers are forked so they inherit the configured app
+                # registry, and must open their own connections.
+                connections.close_all()
+                with ProcessPoolExecutor(
+                    max_workers=options["workers"],
+                    mp_context=multiprocessing.get_context("fork"),
+                ) as pool:
+                    futures = {
+                        pool.submit(stage_table, name, paths[name]): name
+                        for name in names
+                    }
+                    for future in as_completed(futures):
+                        staged[futures[future]] = future.result()
+            else:
+                for name in names:
+                    staged[name] = stage_table(name, paths[name])
+
+            # A failed import leaves the previous dataset in place. TRUNCATE
+            # and the index rebuilds take ACCESS EXCLUSIVE locks, so readers
+            # of these tables and of the prediction view wait for the commit.
+            # Swapping in tables loaded aside wouldn't avoid that: the view,
+            # the foreign keys and the summary triggers are bound to the old
+            # tables and would have to be rebuilt in the swap.
+            total = 0
+            # The summary is emptied by a trigger anyway, but TRUNCATE is cheaper.
+            tables = ", ".join(
+                model._meta.db_table
+                for model in [*TABLES.values(), PathPredictionSummary]
+            )
+            with transaction.atomic():
+                DatasetImport.objects.filter(version=version).delete()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"TRUNCATE {tables} RESTART IDENTITY")
+                for name in names:
+                    count, skipped, elapsed = staged[name]
+                    loaded, replaced = replace_table(name)
+                    total += self.report(
+                        name, loaded, skipped + count - loaded, elapsed + replaced
+                    )
+                DrugDiseasePrediction.refresh(concurrently=False)
+                DatasetImport.objects.create(version=version, row_count=total)
+        finally:
+            with connection.cursor() as cursor:
+                for model in TABLES.values():
+                    cursor.execute(
+                        f"DROP TABLE IF EXISTS {staging_table(model._meta.db_table)}"
+                    )
+
+        dataset_changed.send(sender=DatasetImport)
+        elapsed = time.monotonic() - started
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported dataset {version}: {total} rows in {elapsed:.1f}s "
+                f"({total / max(elapsed, 1e-9):,.0f} rows/s)."
+            )
+        )
+
+    def find_inputs(self, directory):
+        if not os.path.isdir(directory):
+            raise CommandError(f"{directory} is not a directory.")
+        paths = {}
+        for filename in sorted(os.listdir(directory)):
+            stem = filename.removesuffix(".gz")
+            for extension in EXTENSIONS:
+                if stem.endswith(extension) and stem[: -len(extension)] in TABLES:
+                    paths[stem[: -len(extension)]] = os.path.join(directory, filename)
+        if PROBABILITIES not in paths:
+            raise CommandError(f"No probabilities file found in {directory}.")
+        return paths
+
+    def hash_inputs(self, paths):
+        digest = hashlib.sha256()
+        for path in sorted(paths):
+            digest.update(os.path.basename(path).encode())
+            with open(path, "rb") as handle:
+                while chunk := handle.read(1 << 20):
+                    digest.update(chunk)
+        return digest.hexdigest()[:16]
+
+    def report(self, name, loaded, skipped, elapsed):
+        message = (
+            f"{name}: {loaded} rows in {elapsed:.1f}s "
+            f"({loaded / max(elapsed, 1e-9):,.0f} rows/s)"
+        )
+        if skipped:
+            message += f", skipped {skipped} rows with unknown drug or disease"
+        self.stdout.write(message)
+        return loaded
@@ -0,0 +1,152 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from drugs.models import DrugDiseasePrediction, DrugDiseaseProbability, PercentileRun
+from drugs.ranking import grouped_percentiles
+from drugs.scores import PERCENTILE_SCALE, compact
+from drugs.signals import dataset_changed
+
+
+def group_codes(keys):
+    codes = {}
+    return np.fromiter(
+        (codes.setdefault(key, len(codes)) for key in keys), dtype=np.int64
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes compound_prediction and disease_prediction, the percentile of "
+        "each prediction among all predictions for its compound and for its "
+        "disease, and writes back the ones that changed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help=(
+                "Only recompute compounds and diseases with pairs saved since the "
+                "last run. Deleted pairs leave no trace, so run a full recompute "
+                "after deleting."
+            ),
+        )
+        parser.add_argument(
+            "--blocking",
+            action="store_true",
+            help=(
+                "Refresh drug_disease_prediction without CONCURRENTLY. Much "
+                "faster after a full recompute, but blocks readers."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        table = DrugDiseaseProbability._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT now()")
+            started_at = cursor.fetchone()[0]
+
+        last_run = PercentileRun.objects.first()
+        incremental = options["incremental"] and last_run is not None
+        where_sql, params = "", []
+        if incremental:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT array_agg(DISTINCT drug_id), "
+                    f"array_agg(DISTINCT disease_id) FROM {table} "
+                    "WHERE updated_at >= %s",
+                    [last_run.started_at],
+                )
+                drugs, diseases = cursor.fetchone()
+            if not drugs:
+                PercentileRun.objects.create(started_at=started_at, incremental=True)
+                self.stdout.write("No pairs changed since the last run.")
+                return
+            # Every pair of a touched compound or disease, so each touched
+            # group is ranked whole.
+            where_sql = "WHERE drug_id = ANY(%s) OR disease_id = ANY(%s)"
+            params = [drugs, diseases]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, drug_id, disease_id, prediction, compound_prediction, "
+                f"disease_prediction FROM {table} {where_sql}",
+                params,
+            )
+            rows = cursor.fetchall()
+        if not rows:
+            self.stdout.write("No pairs to rank.")
+            return
+
+        ids, drug_ids, disease_ids, predictions, compound, disease = zip(*rows)
+        predictions = np.array(predictions, dtype=np.float64)
+        new_compound = grouped_percentiles(group_codes(drug_ids), predictions)
+        new_disease = grouped_percentiles(group_codes(disease_ids), predictions)
+        if compact():
+            # Compare with and store the compact schema's scaled values.
+            new_compound = np.round(new_compound * PERCENTILE_SCALE)
+            new_disease = np.round(new_disease * PERCENTILE_SCALE)
+        if incremental:
+            # Groups that weren't touched are only partially loaded, so keep
+            # their stored values.
+            touched_drugs, touched_diseases = set(drugs), set(diseases)
+            keep = np.fromiter((key not in touched_drugs for key in drug_ids), bool)
+            new_compound[keep] = np.array(compound)[keep]
+            keep = np.fromiter(
+                (key not in touched_diseases for key in disease_ids), bool
+            )
+            new_disease[keep] = np.array(disease)[keep]
+
+        changed = np.flatnonzero(
+            (new_compound != np.array(compound)) | (new_disease != np.array(disease))
+        )
+        updated = self.write(
+            table,
+            np.array(ids)[changed].tolist(),
+            new_compound[changed].tolist(),
+            new_disease[changed].tolist(),
+        )
+        PercentileRun.objects.create(
+            started_at=started_at, incremental=incremental, updated_pairs=updated
+        )
+        if updated:
+            DrugDiseasePrediction.refresh(concurrently=not options["blocking"])
+            dataset_changed.send(sender=PercentileRun)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ranked {len(rows)} pairs and updated {updated} in "
+                f"{time.monotonic() - started:.1f}s."
+            )
+        )
+
+    def write(self, table, ids, compound, disease):
+        if not ids:
+            return 0
+        data = "".join(
+            f"{pk}\t{compound!r}\t{disease!r}\n"
+            for pk, compound, disease in zip(ids, compound, disease)
+        )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TEMP TABLE percentile_update ("
+                "id bigint PRIMARY KEY, compound_prediction double precision, "
+                "disease_prediction double precision)"
+            )
+            with cursor.copy("COPY percentile_update FROM STDIN") as copy:
+                copy.write(data)
+            # Raw SQL leaves updated_at alone, so this run's own writes don't
+            # mark the pairs as changed for the next incremental run.
+            cursor.execute(
+                f"UPDATE {table} ddp SET "
+                "compound_prediction = u.compound_prediction, "
+                "disease_prediction = u.disease_prediction "
+                "FROM percentile_update u WHERE ddp.id = u.id"
+            )
+            updated = cursor.rowcount
+            cursor.execute("DROP TABLE percentile_update")
+        return updated
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from drugs.models import DrugDiseasePrediction
+from drugs.signals import dataset_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds the denormalized drug_disease_prediction view from "
+        "drug_disease_probability and invalidates every cached response. Run it "
+        "after bulk changes; edits made through models refresh it in the background "
+        "PREDICTIONS_REFRESH_DELAY seconds after they commit."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--blocking",
+            action="store_true",
+            help="Refresh without CONCURRENTLY. Faster, but blocks readers.",
+        )
+
+    def handle(self, *args, **options):
+        DrugDiseasePrediction.refresh(concurrently=not options["blocking"])
+        dataset_changed.send(sender=DrugDiseasePrediction)
+        self.stdout.write(
+            self.style.SUCCESS(f"Refreshed {DrugDiseasePrediction._meta.db_table}.")
+        )
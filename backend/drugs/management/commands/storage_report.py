@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from drugs.models import (
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    ExplanationTerm,
+    MetaPathPrediction,
+    PathPrediction,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+)
+
+MODELS = [
+    DrugDiseaseProbability,
+    DrugDiseasePrediction,
+    PathPrediction,
+    MetaPathPrediction,
+    SourceEdgePrediction,
+    TargetEdgePrediction,
+    ExplanationTerm,
+]
+
+
+def size(value):
+    for unit in ["B", "kB", "MB", "GB"]:
+        if value < 1024 or unit == "GB":
+            return f"{value:.0f} {unit}" if unit == "B" else f"{value:.1f} {unit}"
+        value /= 1024
+
+
+class Command(BaseCommand):
+    help = (
+        "Reports the on-disk size of the prediction and explanation tables and "
+        "their indexes, and the buffer cache hit rate of their reads since the "
+        "statistics were last reset."
+    )
+
+    def handle(self, *args, **options):
+        tables = [model._meta.db_table for model in MODELS]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT
+                    c.relname,
+                    c.reltuples::bigint,
+                    pg_table_size(c.oid),
+                    pg_indexes_size(c.oid),
+                    s.heap_blks_hit + COALESCE(s.idx_blks_hit, 0),
+                    s.heap_blks_read + COALESCE(s.idx_blks_read, 0)
+                FROM pg_class c
+                JOIN pg_statio_user_tables s ON s.relid = c.oid
+                WHERE c.relname = ANY(%s)
+                ORDER BY array_position(%s, c.relname::text)
+                """,
+                [tables, tables],
+            )
+            rows = cursor.fetchall()
+
+        totals = [0, 0, 0, 0]
+        self.stdout.write(
+            f"{'table':<26} {'rows':>12} {'table':>10} {'indexes':>10} {'hit rate':>9}"
+        )
+        for name, rows_estimate, table_size, index_size, hits, reads in rows:
+            self.stdout.write(
+                f"{name:<26} {rows_estimate:>12,} {size(table_size):>10} "
+                f"{size(index_size):>10} {self.hit_rate(hits, reads):>9}"
+            )
+            for idx, value in enumerate([table_size, index_size, hits, reads]):
+                totals[idx] += value
+        self.stdout.write(
+            f"{'total':<26} {'':>12} {size(totals[0]):>10} {size(totals[1]):>10} "
+            f"{self.hit_rate(totals[2], totals[3]):>9}"
+        )
+
+    def hit_rate(self, hits, reads):
+        if not hits + reads:
+            return "-"
+        return f"{hits / (hits + reads):.1%}"
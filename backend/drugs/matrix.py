@@ -0,0 +1,170 @@
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+
+from .models import DrugDiseaseProbability
+from .scores import PERCENTILE_SCALE, PercentileField, compact
+
+MAGIC = b"AUDRIEPM"
+FIELDS = ["prediction", "compound_prediction", "disease_prediction"]
+# The matrix starts on a page boundary after the header.
+ALIGNMENT = 4096
+
+
+def write_matrix(path=None, chunk_size=100_000, version=None):
+    """
+    Writes every pair's scores into a dense (field, drug, disease) float32
+    matrix at ``path``, with NaN where a pair doesn't exist. The file is built
+    next to the old one and swapped in atomically, so open readers keep their
+    mapping of the previous version. ``version`` is recorded in the header for
+    readers to tell whether the file is current.
+    """
+    path = path or settings.PREDICTION_MATRIX_PATH
+    table = DrugDiseaseProbability._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT drug_id FROM {table} ORDER BY 1")
+        drugs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(f"SELECT DISTINCT disease_id FROM {table} ORDER BY 1")
+        diseases = [row[0] for row in cursor.fetchall()]
+
+    header = json.dumps(
+        {"fields": FIELDS, "drugs": drugs, "diseases": diseases, "version": version}
+    )
+    header = header.encode()
+    offset = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+    shape = (len(FIELDS), len(drugs), len(diseases))
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as handle:
+            handle.write(MAGIC + struct.pack("<Q", len(header)) + header)
+            handle.truncate(offset + int(np.prod(shape)) * 4)
+        if all(shape):
+            values = np.memmap(temporary, np.float32, "r+", offset, shape)
+            values[:] = np.nan
+            drug_index = {key: idx for idx, key in enumerate(drugs)}
+            disease_index = {key: idx for idx, key in enumerate(diseases)}
+            encoded = [
+                compact()
+                and isinstance(
+                    DrugDiseaseProbability._meta.get_field(name), PercentileField
+                )
+                for name in FIELDS
+            ]
+            with connection.chunked_cursor() as cursor:
+                cursor.execute(
+                    f"SELECT drug_id, disease_id, {', '.join(FIELDS)} FROM {table}"
+                )
+                while rows := cursor.fetchmany(chunk_size):
+                    drug_ids, disease_ids, *scores = zip(*rows)
+                    rows_idx = [drug_index[key] for key in drug_ids]
+                    columns_idx = [disease_index[key] for key in disease_ids]
+                    for field, field_scores in enumerate(scores):
+                        if encoded[field]:
+                            field_scores = np.divide(field_scores, PERCENTILE_SCALE)
+                        values[field, rows_idx, columns_idx] = field_scores
+            values.flush()
+            del values
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return shape
+
+
+class PredictionMatrix:
+    """
+    Read-only view of a file written by ``write_matrix``. The scores are
+    memory-mapped, so every process reading the same file shares one copy in
+    the page cache.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as handle:
+            if handle.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a prediction matrix.")
+            (length,) = struct.unpack("<Q", handle.read(8))
+            header = json.loads(handle.read(length))
+            stat = os.fstat(handle.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+        self.fields = header["fields"]
+        self.drugs = header["drugs"]
+        self.diseases = header["diseases"]
+        self.version = header.get("version")
+        self.drug_index = {key: idx for idx, key in enumerate(self.drugs)}
+        self.disease_index = {key: idx for idx, key in enumerate(self.diseases)}
+        shape = (len(self.fields), len(self.drugs), len(self.diseases))
+        offset = -(-(len(MAGIC) + 8 + length) // ALIGNMENT) * ALIGNMENT
+        self.values = (
+            np.memmap(path, np.float32, "r", offset, shape)
+            if all(shape)
+            else np.empty(shape, np.float32)
+        )
+
+    def field(self, name):
+        return self.values[self.fields.index(name)]
+
+    def get(self, dbid, doid):
+        """Returns the pair's scores by field name, or None for no such pair."""
+        row = self.drug_index.get(dbid)
+        column = self.disease_index.get(doid)
+        if row is None or column is None:
+            return None
+        scores = self.values[:, row, column]
+        if np.isnan(scores[0]):
+            return None
+        return dict(zip(self.fields, scores.tolist()))
+
+    def drug_row(self, dbid, field="prediction"):
+        """Scores of every disease for one drug, in ``self.diseases`` order."""
+        return self.field(field)[self.drug_index[dbid]]
+
+    def disease_column(self, doid, field="prediction"):
+        """Scores of every drug for one disease, in ``self.drugs`` order."""
+        return self.field(field)[:, self.disease_index[doid]]
+
+    def top_diseases(self, dbid, k, field="prediction"):
+        return self.top(self.drug_row(dbid, field), self.diseases, k)
+
+    def top_drugs(self, doid, k, field="prediction"):
+        return self.top(self.disease_column(doid, field), self.drugs, k)
+
+    def top(self, scores, keys, k):
+        # argpartition finds the k largest in linear time; only those get sorted.
+        scores = np.nan_to_num(np.asarray(scores), nan=-np.inf)
+        k = min(k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(keys[idx], float(scores[idx])) for idx in best]
+
+
+_matrix = None
+_lock = threading.Lock()
+
+
+def get_matrix():
+    """
+    Returns the process's ``PredictionMatrix`` for PREDICTION_MATRIX_PATH,
+    reopening it after a new file has been written, or None if there is none.
+    """
+    global _matrix
+    path = settings.PREDICTION_MATRIX_PATH
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    identity = (stat.st_ino, stat.st_mtime_ns)
+    if _matrix is None or _matrix.identity != identity:
+        with _lock:
+            if _matrix is None or _matrix.identity != identity:
+                _matrix = PredictionMatrix(path)
+    return _matrix
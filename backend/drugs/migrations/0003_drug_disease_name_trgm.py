@@ -0,0 +1,25 @@
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0002_alter_disease_options_and_more"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="drug",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="drug_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="disease",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="disease_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+    ]
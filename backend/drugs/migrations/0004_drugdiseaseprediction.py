@@ -0,0 +1,76 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0003_drug_disease_name_trgm"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE MATERIALIZED VIEW drug_disease_prediction AS
+                SELECT
+                    ddp.id, ddp.drug_id, ddp.disease_id,
+                    d.name AS drug_name, dis.name AS disease_name,
+                    ddp.prediction, ddp.compound_prediction, ddp.disease_prediction,
+                    ddp.category, ddp.trial_count
+                FROM drug_disease_probability ddp
+                JOIN drug d ON ddp.drug_id = d.dbid
+                JOIN disease dis ON ddp.disease_id = dis.doid;
+
+                CREATE UNIQUE INDEX drug_disease_prediction_id_uniq
+                    ON drug_disease_prediction (id);
+                CREATE INDEX drug_disease_prediction_drug_id
+                    ON drug_disease_prediction (drug_id);
+                CREATE INDEX drug_disease_prediction_disease_id
+                    ON drug_disease_prediction (disease_id);
+            """,
+            reverse_sql="DROP MATERIALIZED VIEW IF EXISTS drug_disease_prediction;",
+        ),
+        migrations.CreateModel(
+            name="DrugDiseasePrediction",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("drug_name", models.CharField(max_length=200)),
+                ("disease_name", models.CharField(max_length=200)),
+                ("prediction", models.FloatField()),
+                ("compound_prediction", models.FloatField()),
+                ("disease_prediction", models.FloatField()),
+                ("category", models.CharField(max_length=100)),
+                ("trial_count", models.IntegerField()),
+                (
+                    "disease",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="drugs.disease",
+                    ),
+                ),
+                (
+                    "drug",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="drugs.drug",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "drug_disease_prediction",
+                "ordering": ["id"],
+                "managed": False,
+            },
+        ),
+    ]
@@ -0,0 +1,80 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0004_drugdiseaseprediction"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="pathprediction",
+            index=models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                name="path_pred_pair_rank",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="metapathprediction",
+            index=models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=("metapath", "path_count", "length", "verbose"),
+                name="metapath_pred_pair_rank",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sourceedgeprediction",
+            index=models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=("source_edge", "path_count", "distinct_metapaths"),
+                name="sourceedge_pred_pair_rank",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="targetedgeprediction",
+            index=models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=("target_edge", "path_count", "distinct_metapaths"),
+                name="targetedge_pred_pair_rank",
+            ),
+        ),
+        # The composite indexes lead with the foreign key, so the plain
+        # foreign key indexes are redundant.
+        migrations.AlterField(
+            model_name="pathprediction",
+            name="drug_disease_probability",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="drugs.drugdiseaseprobability",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="metapathprediction",
+            name="drug_disease_probability",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="drugs.drugdiseaseprobability",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="sourceedgeprediction",
+            name="drug_disease_probability",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="drugs.drugdiseaseprobability",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="targetedgeprediction",
+            name="drug_disease_probability",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                to="drugs.drugdiseaseprobability",
+            ),
+        ),
+    ]
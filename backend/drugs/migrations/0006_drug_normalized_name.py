@@ -0,0 +1,38 @@
+import re
+
+from django.db import migrations, models
+
+
+def normalize_name(value):
+    # A copy of drugs.models.normalize_name as of this migration.
+    return re.sub(r"[\W_]+", "", value.casefold())
+
+
+def populate_normalized_name(apps, schema_editor):
+    Drug = apps.get_model("drugs", "Drug")
+    drugs = list(Drug.objects.only("dbid", "name"))
+    for drug in drugs:
+        drug.normalized_name = normalize_name(drug.name)
+    Drug.objects.bulk_update(drugs, ["normalized_name"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0005_explanation_pair_rank_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="drug",
+            name="normalized_name",
+            field=models.CharField(
+                blank=True, db_index=True, editable=False, max_length=200
+            ),
+        ),
+        migrations.RunPython(populate_normalized_name, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="drug",
+            name="inchikey",
+            field=models.CharField(blank=True, db_index=True, max_length=250),
+        ),
+    ]
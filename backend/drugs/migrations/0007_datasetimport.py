@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0006_drug_normalized_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DatasetImport",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("version", models.CharField(max_length=100, unique=True)),
+                ("imported_at", models.DateTimeField(auto_now_add=True)),
+                ("row_count", models.BigIntegerField(default=0)),
+            ],
+            options={
+                "db_table": "dataset_import",
+                "ordering": ["-imported_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0007_datasetimport"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="drugdiseaseprobability",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                db_default=django.db.models.functions.datetime.Now(),
+                db_index=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="PercentileRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("started_at", models.DateTimeField()),
+                ("incremental", models.BooleanField(default=False)),
+                ("updated_pairs", models.IntegerField(default=0)),
+            ],
+            options={
+                "db_table": "percentile_run",
+                "ordering": ["-started_at"],
+            },
+        ),
+    ]
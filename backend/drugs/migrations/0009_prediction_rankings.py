@@ -0,0 +1,63 @@
+from django.db import migrations, models
+
+VIEW_SQL = """
+    CREATE MATERIALIZED VIEW drug_disease_prediction AS
+    SELECT
+        ddp.id, ddp.drug_id, ddp.disease_id,
+        d.name AS drug_name, dis.name AS disease_name,
+        ddp.prediction, ddp.compound_prediction, ddp.disease_prediction,
+        ddp.category, ddp.trial_count{rank_columns}
+    FROM drug_disease_probability ddp
+    JOIN drug d ON ddp.drug_id = d.dbid
+    JOIN disease dis ON ddp.disease_id = dis.doid;
+
+    CREATE UNIQUE INDEX drug_disease_prediction_id_uniq
+        ON drug_disease_prediction (id);
+"""
+
+RANK_COLUMNS = """,
+        row_number() OVER (
+            PARTITION BY ddp.drug_id ORDER BY ddp.prediction DESC, ddp.id
+        ) AS rank_in_drug,
+        row_number() OVER (
+            PARTITION BY ddp.disease_id ORDER BY ddp.prediction DESC, ddp.id
+        ) AS rank_in_disease"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0008_percentiles"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="DROP MATERIALIZED VIEW drug_disease_prediction;"
+            + VIEW_SQL.format(rank_columns=RANK_COLUMNS)
+            + """
+                CREATE INDEX drug_disease_prediction_drug_rank
+                    ON drug_disease_prediction (drug_id, rank_in_drug);
+                CREATE INDEX drug_disease_prediction_disease_rank
+                    ON drug_disease_prediction (disease_id, rank_in_disease);
+            """,
+            reverse_sql="DROP MATERIALIZED VIEW drug_disease_prediction;"
+            + VIEW_SQL.format(rank_columns="")
+            + """
+                CREATE INDEX drug_disease_prediction_drug_id
+                    ON drug_disease_prediction (drug_id);
+                CREATE INDEX drug_disease_prediction_disease_id
+                    ON drug_disease_prediction (disease_id);
+            """,
+        ),
+        migrations.AddField(
+            model_name="drugdiseaseprediction",
+            name="rank_in_drug",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="drugdiseaseprediction",
+            name="rank_in_disease",
+            field=models.IntegerField(default=0),
+            preserve_default=False,
+        ),
+    ]
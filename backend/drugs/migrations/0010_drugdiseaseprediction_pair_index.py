@@ -0,0 +1,17 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0009_prediction_rankings"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+                CREATE INDEX drug_disease_prediction_pair
+                    ON drug_disease_prediction (drug_id, disease_id);
+            """,
+            reverse_sql="DROP INDEX drug_disease_prediction_pair;",
+        ),
+    ]
@@ -0,0 +1,139 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# (table, column) pairs whose strings move into explanation_term. Column names
+# are quoted below since "verbose" is a keyword.
+TERM_COLUMNS = [
+    ("path_prediction", "metapath"),
+    ("metapath_prediction", "metapath"),
+    ("metapath_prediction", "verbose"),
+    ("sourceedge_prediction", "source_edge"),
+    ("targetedge_prediction", "target_edge"),
+]
+
+# The original varchar lengths, restored when migrating backwards.
+LENGTHS = {"verbose": 300}
+
+
+def encode_sql():
+    union = " UNION ".join(
+        f'SELECT "{column}" FROM {table}' for table, column in TERM_COLUMNS
+    )
+    statements = [
+        f"INSERT INTO explanation_term (name) {union} ORDER BY 1",
+        """
+        CREATE FUNCTION explanation_term_id(value text) RETURNS integer
+            LANGUAGE sql STABLE
+            AS 'SELECT id FROM explanation_term WHERE name = value'
+        """,
+    ]
+    # One ALTER per table, so each table and its indexes are rewritten once.
+    for table in dict(TERM_COLUMNS):
+        columns = [column for name, column in TERM_COLUMNS if name == table]
+        statements.append(
+            f"ALTER TABLE {table} "
+            + ", ".join(
+                f'ALTER COLUMN "{column}" TYPE integer '
+                f'USING explanation_term_id("{column}")'
+                for column in columns
+            )
+        )
+        for column in columns:
+            statements += [
+                f'ALTER TABLE {table} RENAME COLUMN "{column}" TO {column}_id',
+                f"ALTER TABLE {table} ADD CONSTRAINT {table}_{column}_id_fk "
+                f"FOREIGN KEY ({column}_id) REFERENCES explanation_term (id) "
+                "DEFERRABLE INITIALLY DEFERRED",
+            ]
+    statements.append("DROP FUNCTION explanation_term_id(text)")
+    return statements
+
+
+def decode_sql():
+    statements = [
+        """
+        CREATE FUNCTION explanation_term_name(value integer) RETURNS text
+            LANGUAGE sql STABLE
+            AS 'SELECT name FROM explanation_term WHERE id = value'
+        """,
+    ]
+    for table in dict(TERM_COLUMNS):
+        columns = [column for name, column in TERM_COLUMNS if name == table]
+        for column in columns:
+            statements += [
+                f"ALTER TABLE {table} DROP CONSTRAINT {table}_{column}_id_fk",
+                f'ALTER TABLE {table} RENAME COLUMN {column}_id TO "{column}"',
+            ]
+        statements.append(
+            f"ALTER TABLE {table} "
+            + ", ".join(
+                f'ALTER COLUMN "{column}" TYPE varchar({LENGTHS.get(column, 100)}) '
+                f'USING explanation_term_name("{column}")'
+                for column in columns
+            )
+        )
+    statements.append("DROP FUNCTION explanation_term_name(integer)")
+    return statements
+
+
+def term_field():
+    return models.ForeignKey(
+        db_index=False,
+        on_delete=django.db.models.deletion.PROTECT,
+        related_name="+",
+        to="drugs.explanationterm",
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0010_drugdiseaseprediction_pair_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExplanationTerm",
+            fields=[
+                ("id", models.AutoField(primary_key=True, serialize=False)),
+                ("name", models.CharField(max_length=300, unique=True)),
+            ],
+            options={
+                "db_table": "explanation_term",
+                "ordering": ["name"],
+            },
+        ),
+        # Converts the existing rows in place: the string columns become
+        # integer keys into explanation_term, keeping their indexes.
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(sql=encode_sql(), reverse_sql=decode_sql()),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="pathprediction",
+                    name="metapath",
+                    field=term_field(),
+                ),
+                migrations.AlterField(
+                    model_name="metapathprediction",
+                    name="metapath",
+                    field=term_field(),
+                ),
+                migrations.AlterField(
+                    model_name="metapathprediction",
+                    name="verbose",
+                    field=term_field(),
+                ),
+                migrations.AlterField(
+                    model_name="sourceedgeprediction",
+                    name="source_edge",
+                    field=term_field(),
+                ),
+                migrations.AlterField(
+                    model_name="targetedgeprediction",
+                    name="target_edge",
+                    field=term_field(),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+import drugs.scores
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0011_explanation_terms"),
+    ]
+
+    # The columns keep their type here. ``manage.py convert_scores`` switches
+    # them to the storage selected by COMPACT_SCORES.
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AlterField(
+                    model_name="drugdiseaseprobability",
+                    name="prediction",
+                    field=drugs.scores.ScoreField(blank=True, default=0),
+                ),
+                migrations.AlterField(
+                    model_name="drugdiseaseprobability",
+                    name="compound_prediction",
+                    field=drugs.scores.PercentileField(blank=True, default=0),
+                ),
+                migrations.AlterField(
+                    model_name="drugdiseaseprobability",
+                    name="disease_prediction",
+                    field=drugs.scores.PercentileField(blank=True, default=0),
+                ),
+                migrations.AlterField(
+                    model_name="pathprediction",
+                    name="percent_of_prediction",
+                    field=drugs.scores.ScoreField(),
+                ),
+                migrations.AlterField(
+                    model_name="pathprediction",
+                    name="percent_of_dwpc",
+                    field=drugs.scores.ScoreField(),
+                ),
+                migrations.AlterField(
+                    model_name="metapathprediction",
+                    name="percent_of_prediction",
+                    field=drugs.scores.ScoreField(),
+                ),
+                migrations.AlterField(
+                    model_name="sourceedgeprediction",
+                    name="percent_of_prediction",
+                    field=drugs.scores.ScoreField(),
+                ),
+                migrations.AlterField(
+                    model_name="targetedgeprediction",
+                    name="percent_of_prediction",
+                    field=drugs.scores.ScoreField(),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,127 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+# One function serves the three statement triggers. UPDATE and DELETE take the
+# old rows out before INSERT and UPDATE add the new ones, and pairs left
+# without paths lose their row.
+SUMMARIZE = """
+    CREATE FUNCTION path_prediction_summarize() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE path_prediction_summary s
+            SET path_count = s.path_count - o.path_count,
+                percent_sum = s.percent_sum - o.percent_sum
+            FROM (
+                SELECT
+                    drug_disease_probability_id,
+                    COUNT(*) AS path_count,
+                    SUM(percent_of_prediction::double precision) AS percent_sum
+                FROM old_rows
+                GROUP BY drug_disease_probability_id
+            ) o
+            WHERE s.drug_disease_probability_id = o.drug_disease_probability_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            INSERT INTO path_prediction_summary AS s
+                (drug_disease_probability_id, path_count, percent_sum)
+            SELECT
+                drug_disease_probability_id,
+                COUNT(*),
+                SUM(percent_of_prediction::double precision)
+            FROM new_rows
+            GROUP BY drug_disease_probability_id
+            ON CONFLICT (drug_disease_probability_id) DO UPDATE
+            SET path_count = s.path_count + EXCLUDED.path_count,
+                percent_sum = s.percent_sum + EXCLUDED.percent_sum;
+        END IF;
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            DELETE FROM path_prediction_summary
+            WHERE path_count <= 0
+              AND drug_disease_probability_id IN (
+                  SELECT drug_disease_probability_id FROM old_rows
+              );
+        END IF;
+        RETURN NULL;
+    END
+    $$;
+
+    -- DELETE, since TRUNCATE fails when the same statement truncates the
+    -- summary too, as the test runner's flush does.
+    CREATE FUNCTION path_prediction_summary_truncate() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM path_prediction_summary;
+        RETURN NULL;
+    END
+    $$;
+
+    CREATE TRIGGER path_prediction_summary_insert
+        AFTER INSERT ON path_prediction
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION path_prediction_summarize();
+    CREATE TRIGGER path_prediction_summary_update
+        AFTER UPDATE ON path_prediction
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION path_prediction_summarize();
+    CREATE TRIGGER path_prediction_summary_delete
+        AFTER DELETE ON path_prediction
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION path_prediction_summarize();
+    CREATE TRIGGER path_prediction_summary_truncate
+        AFTER TRUNCATE ON path_prediction
+        FOR EACH STATEMENT EXECUTE FUNCTION path_prediction_summary_truncate();
+"""
+
+UNSUMMARIZE = """
+    DROP TRIGGER path_prediction_summary_insert ON path_prediction;
+    DROP TRIGGER path_prediction_summary_update ON path_prediction;
+    DROP TRIGGER path_prediction_summary_delete ON path_prediction;
+    DROP TRIGGER path_prediction_summary_truncate ON path_prediction;
+    DROP FUNCTION path_prediction_summarize();
+    DROP FUNCTION path_prediction_summary_truncate();
+"""
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("drugs", "0012_score_fields"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PathPredictionSummary",
+            fields=[
+                (
+                    "drug_disease_probability",
+                    models.OneToOneField(
+                        db_constraint=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        primary_key=True,
+                        related_name="+",
+                        serialize=False,
+                        to="drugs.drugdiseaseprobability",
+                    ),
+                ),
+                ("path_count", models.IntegerField()),
+                ("percent_sum", models.FloatField()),
+            ],
+            options={
+                "db_table": "path_prediction_summary",
+            },
+        ),
+        migrations.RunSQL(sql=SUMMARIZE, reverse_sql=UNSUMMARIZE),
+        migrations.RunSQL(
+            sql="""
+                INSERT INTO path_prediction_summary
+                    (drug_disease_probability_id, path_count, percent_sum)
+                SELECT
+                    drug_disease_probability_id,
+                    COUNT(*),
+                    SUM(percent_of_prediction::double precision)
+                FROM path_prediction
+                GROUP BY drug_disease_probability_id;
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drugs", "0013_pathpredictionsummary"),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name="drugdiseaseprobability",
+            unique_together={("drug", "disease")},
+        ),
+    ]
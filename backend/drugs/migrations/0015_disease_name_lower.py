@@ -0,0 +1,19 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drugs", "0014_drugdiseaseprobability_unique_pair"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="disease",
+            index=models.Index(
+                django.db.models.functions.text.Lower("name"),
+                name="disease_name_lower",
+            ),
+        ),
+    ]
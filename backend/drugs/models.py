@@ -1,8 +1,25 @@
-from django.db import models
+import re
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.indexes import GinIndex
+from django.db import connection, models, transaction
+from django.db.models.functions import Lower, Now
+
+from .scores import PercentileField, ScoreField
+from .signals import explanations_deleted, predictions_refreshed
+
+
+def normalize_name(value):
+    """Case-folds ``value`` and strips whitespace and punctuation."""
+    return re.sub(r"[\W_]+", "", value.casefold())
 
 
 class Drug(models.Model):
     name = models.CharField(max_length=200, db_index=True)
+    normalized_name = models.CharField(
+        max_length=200, blank=True, db_index=True, editable=False
+    )
     dbid = models.CharField(max_length=20, primary_key=True)
     treatment_count = models.IntegerField(default=0, blank=True)
     edges = models.CharField(blank=True)
@@ -11,7 +28,7 @@ class Drug(models.Model):
     group = models.CharField(max_length=1000, blank=True)
     atc_code = models.CharField(max_length=5000, blank=True)
     categories = models.CharField(max_length=20000, blank=True)
-    inchikey = models.CharField(max_length=250, blank=True)
+    inchikey = models.CharField(max_length=250, blank=True, db_index=True)
     description = models.CharField(max_length=20000, blank=True)
     mechanism_large = models.CharField(max_length=20000, blank=True)
     pharmacodynamics = models.CharField(max_length=20000, blank=True)
@@ -28,10 +45,20 @@ class Drug(models.Model):
     class Meta:
         db_table = "drug"
         ordering = ["dbid"]
+        indexes = [
+            GinIndex(fields=["name"], name="drug_name_trgm", opclasses=["gin_trgm_ops"])
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_name = normalize_name(self.name)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "name" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "normalized_name"}
+        super().save(*args, **kwargs)
+
 
 class Disease(models.Model):
     doid = models.CharField(max_length=50, blank=True, primary_key=True)
@@ -43,6 +70,13 @@ class Disease(models.Model):
     class Meta:
         db_table = "disease"
         ordering = ["doid"]
+        indexes = [
+            GinIndex(
+                fields=["name"], name="disease_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+            # Case-insensitive name lookups, as in the batch pair lookup.
+            models.Index(Lower("name"), name="disease_name_lower"),
+        ]
 
     def __str__(self):
         return self.name
@@ -51,11 +85,11 @@ class Disease(models.Model):
 class DrugDiseaseProbability(models.Model):
     drug = models.ForeignKey(Drug, on_delete=models.CASCADE)
     disease = models.ForeignKey(Disease, on_delete=models.CASCADE)
-    prediction = models.FloatField(blank=True, default=0)
-    compound_prediction = models.FloatField(
+    prediction = ScoreField(blank=True, default=0)
+    compound_prediction = PercentileField(
         blank=True, default=0
     )  # The prediction's percentile within all predictions for the compound
-    disease_prediction = models.FloatField(
+    disease_prediction = PercentileField(
         blank=True, default=0
     )  # The prediction's percentile within all predictions for the disease
     category = models.CharField(
@@ -64,6 +98,7 @@ class DrugDiseaseProbability(models.Model):
     trial_count = models.IntegerField(
         default=0, blank=True
     )  # Trials investigating this compound-disease pair in ClinicalTrials.gov
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), db_index=True)
 
     class Meta:
         unique_together = (("drug", "disease"),)
@@ -74,13 +109,147 @@ class DrugDiseaseProbability(models.Model):
         return self.drug.name + " - " + self.disease.name
 
 
-class PathPrediction(models.Model):
+class DrugDiseasePrediction(models.Model):
+    """
+    Read-only, denormalized copy of DrugDiseaseProbability with the drug and
+    disease names inlined, stored as a materialized view so the read endpoints
+    need no joins. Rebuilt with ``manage.py refresh_predictions``.
+    """
+
+    drug = models.ForeignKey(
+        Drug, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    disease = models.ForeignKey(
+        Disease, on_delete=models.DO_NOTHING, db_constraint=False, related_name="+"
+    )
+    drug_name = models.CharField(max_length=200)
+    disease_name = models.CharField(max_length=200)
+    prediction = ScoreField()
+    compound_prediction = PercentileField()
+    disease_prediction = PercentileField()
+    category = models.CharField(max_length=100)
+    trial_count = models.IntegerField()
+    # Position of the pair among all pairs of its drug, and of its disease, by
+    # descending prediction.
+    rank_in_drug = models.IntegerField()
+    rank_in_disease = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = "drug_disease_prediction"
+        ordering = ["id"]
+
+    def __str__(self):
+        return self.drug_name + " - " + self.disease_name
+
+    @classmethod
+    def refresh(cls, concurrently=True):
+        table = cls._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"REFRESH MATERIALIZED VIEW {'CONCURRENTLY ' if concurrently else ''}"
+                f"{table}"
+            )
+            cursor.execute(f"ANALYZE {table}")
+        predictions_refreshed.send(sender=cls)
+
+    _refresh_lock = threading.Lock()
+    _refresh_timer = None
+
+    @classmethod
+    def refresh_on_commit(cls):
+        # Several edits in one transaction (e.g. an admin bulk delete) only
+        # schedule one refresh.
+        pending = transaction.get_connection().run_on_commit
+        if not any(func == cls.refresh_later for _, func, _ in pending):
+            transaction.on_commit(cls.refresh_later)
+
+    @classmethod
+    def refresh_later(cls):
+        """
+        Refreshes the view ``settings.PREDICTIONS_REFRESH_DELAY`` seconds from
+        now in a background thread, so no request waits for it and the edits
+        committed meanwhile share it.
+        """
+        delay = settings.PREDICTIONS_REFRESH_DELAY
+        if not delay:
+            cls.refresh()
+            return
+        with cls._refresh_lock:
+            if cls._refresh_timer is None:
+                cls._refresh_timer = threading.Timer(delay, cls._scheduled_refresh)
+                cls._refresh_timer.start()
+
+    @classmethod
+    def _scheduled_refresh(cls):
+        # Edits committed from here on may miss this refresh, so they schedule
+        # the next one.
+        with cls._refresh_lock:
+            cls._refresh_timer = None
+        try:
+            cls.refresh()
+        finally:
+            connection.close()
+
+
+class ExplanationTerm(models.Model):
+    """
+    A metapath, verbose metapath or edge string. The explanation tables repeat
+    a small vocabulary of these over millions of rows, so they store its key.
+    """
+
+    id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=300, unique=True)
+
+    class Meta:
+        db_table = "explanation_term"
+        ordering = ["name"]
+
+    def __str__(self):
+        return self.name
+
+
+class ExplanationQuerySet(models.QuerySet):
+    def delete(self):
+        pair_ids = set(self.values_list("drug_disease_probability_id", flat=True))
+        deleted = super().delete()
+        explanations_deleted.send(sender=self.model, pair_ids=pair_ids)
+        return deleted
+
+
+class Explanation(models.Model):
+    """
+    Base of the explanation tables. They have no delete signal receivers, which
+    would stop deleting a pair from cascading in one statement per table, so
+    direct deletes send ``explanations_deleted`` instead.
+    """
+
+    objects = ExplanationQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def delete(self, *args, **kwargs):
+        deleted = super().delete(*args, **kwargs)
+        explanations_deleted.send(
+            sender=type(self), pair_ids={self.drug_disease_probability_id}
+        )
+        return deleted
+
+
+def term_field():
+    return models.ForeignKey(
+        ExplanationTerm, on_delete=models.PROTECT, db_index=False, related_name="+"
+    )
+
+
+class PathPrediction(Explanation):
     drug_disease_probability = models.ForeignKey(
-        DrugDiseaseProbability, on_delete=models.CASCADE
+        DrugDiseaseProbability, on_delete=models.CASCADE, db_index=False
     )
-    percent_of_prediction = models.FloatField()
-    percent_of_dwpc = models.FloatField()
-    metapath = models.CharField(max_length=100)
+    percent_of_prediction = ScoreField()
+    percent_of_dwpc = ScoreField()
+    metapath = term_field()
     length = models.IntegerField()
     verbose_path = models.TextField()
 
@@ -90,58 +259,154 @@ class PathPrediction(models.Model):
     class Meta:
         db_table = "path_prediction"
         ordering = ["-percent_of_prediction"]
+        indexes = [
+            models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                name="path_pred_pair_rank",
+            )
+        ]
+
+
+class PathPredictionSummary(models.Model):
+    """
+    The number and summed percent_of_prediction of each pair's paths, for the
+    top paths view to summarize the paths it leaves out without reading them.
+    Statement triggers on path_prediction (migration 0013) keep it current,
+    through bulk loads and TRUNCATE too.
+    """
+
+    drug_disease_probability = models.OneToOneField(
+        DrugDiseaseProbability,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_constraint=False,
+        related_name="+",
+    )
+    path_count = models.IntegerField()
+    percent_sum = models.FloatField()
 
-
-class MetaPathPrediction(models.Model):
+    class Meta:
+        db_table = "path_prediction_summary"
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes every pair's summary, e.g. after path columns were rewritten."""
+        table = cls._meta.db_table
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {table}")
+            cursor.execute(f"""
+                INSERT INTO {table}
+                    (drug_disease_probability_id, path_count, percent_sum)
+                SELECT
+                    drug_disease_probability_id,
+                    COUNT(*),
+                    SUM(percent_of_prediction::double precision)
+                FROM {PathPrediction._meta.db_table}
+                GROUP BY drug_disease_probability_id
+                """)
+
+
+class MetaPathPrediction(Explanation):
     drug_disease_probability = models.ForeignKey(
-        DrugDiseaseProbability, on_delete=models.CASCADE
+        DrugDiseaseProbability, on_delete=models.CASCADE, db_index=False
     )
-    metapath = models.CharField(max_length=100)
-    percent_of_prediction = models.FloatField()
+    metapath = term_field()
+    percent_of_prediction = ScoreField()
     path_count = models.IntegerField()
     length = models.IntegerField()
-    verbose = models.CharField(max_length=300)
+    verbose = term_field()
 
     class Meta:
         db_table = "metapath_prediction"
         ordering = ["-percent_of_prediction"]
+        indexes = [
+            models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=["metapath", "path_count", "length", "verbose"],
+                name="metapath_pred_pair_rank",
+            )
+        ]
 
     def __str__(self):
-        return self.verbose
+        return str(self.verbose)
 
 
-class SourceEdgePrediction(models.Model):
+class SourceEdgePrediction(Explanation):
     drug_disease_probability = models.ForeignKey(
-        DrugDiseaseProbability, on_delete=models.CASCADE
+        DrugDiseaseProbability, on_delete=models.CASCADE, db_index=False
     )
-    source_edge = models.CharField(max_length=100)
-    percent_of_prediction = models.FloatField()
+    source_edge = term_field()
+    percent_of_prediction = ScoreField()
     path_count = models.IntegerField()
     distinct_metapaths = models.IntegerField()
 
     class Meta:
         db_table = "sourceedge_prediction"
         ordering = ["-percent_of_prediction"]
+        indexes = [
+            models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=["source_edge", "path_count", "distinct_metapaths"],
+                name="sourceedge_pred_pair_rank",
+            )
+        ]
 
     def __str__(self):
-        return self.source_edge
+        return str(self.source_edge)
 
 
-class TargetEdgePrediction(models.Model):
+class TargetEdgePrediction(Explanation):
     drug_disease_probability = models.ForeignKey(
-        DrugDiseaseProbability, on_delete=models.CASCADE
+        DrugDiseaseProbability, on_delete=models.CASCADE, db_index=False
     )
-    target_edge = models.CharField(max_length=100)
-    percent_of_prediction = models.FloatField()
+    target_edge = term_field()
+    percent_of_prediction = ScoreField()
     path_count = models.IntegerField()
     distinct_metapaths = models.IntegerField()
 
     class Meta:
         db_table = "targetedge_prediction"
         ordering = ["-percent_of_prediction"]
+        indexes = [
+            models.Index(
+                fields=["drug_disease_probability", "-percent_of_prediction", "-id"],
+                include=["target_edge", "path_count", "distinct_metapaths"],
+                name="targetedge_pred_pair_rank",
+            )
+        ]
 
     def __str__(self):
-        return self.target_edge
+        return str(self.target_edge)
+
+
+class DatasetImport(models.Model):
+    """A dataset version loaded by ``manage.py import_predictions``."""
+
+    version = models.CharField(max_length=100, unique=True)
+    imported_at = models.DateTimeField(auto_now_add=True)
+    row_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        db_table = "dataset_import"
+        ordering = ["-imported_at"]
+
+    def __str__(self):
+        return self.version
+
+
+class PercentileRun(models.Model):
+    """
+    A run of ``manage.py recompute_percentiles``. Pairs updated after the last
+    run started are the ones an incremental run recomputes.
+    """
+
+    started_at = models.DateTimeField()
+    incremental = models.BooleanField(default=False)
+    updated_pairs = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = "percentile_run"
+        ordering = ["-started_at"]
 
 
 class DiseaseIndication(models.Model):
@@ -0,0 +1,38 @@
+import numpy as np
+
+
+def grouped_percentiles(groups, values):
+    """
+    Returns the percentile rank of each value within its group, in (0, 1].
+    Ties share their average rank, matching ``pandas.Series.rank(pct=True)``.
+
+    ``groups`` holds an integer group code per value; everything runs as a few
+    sorts and cumulative sums over the whole array instead of a loop per group.
+    """
+    groups = np.asarray(groups)
+    values = np.asarray(values, dtype=np.float64)
+    count = len(values)
+    if not count:
+        return np.empty(0)
+    order = np.lexsort((values, groups))
+    sorted_groups, sorted_values = groups[order], values[order]
+    positions = np.arange(count)
+
+    group_change = np.empty(count, dtype=bool)
+    group_change[0] = True
+    group_change[1:] = sorted_groups[1:] != sorted_groups[:-1]
+    run_change = group_change.copy()
+    run_change[1:] |= sorted_values[1:] != sorted_values[:-1]
+
+    # First position of each element's group and of its run of tied values.
+    group_start = np.maximum.accumulate(np.where(group_change, positions, 0))
+    run_id = np.cumsum(run_change) - 1
+    run_start = positions[run_change]
+    run_end = np.append(run_start[1:], count) - 1
+    group_id = np.cumsum(group_change) - 1
+    group_size = np.diff(np.append(positions[group_change], count))
+
+    average_rank = (run_start[run_id] + run_end[run_id]) / 2 - group_start + 1
+    percentiles = np.empty(count)
+    percentiles[order] = average_rank / group_size[group_id]
+    return percentiles
@@ -0,0 +1,87 @@
+"""
+Storage of prediction scores. They are double precision by default. With
+``settings.COMPACT_SCORES`` predictions and explanation percentages are stored
+as real, and the per-compound and per-disease percentiles as smallint counts of
+1/PERCENTILE_SCALE. ``manage.py convert_scores`` converts existing tables.
+"""
+
+from django.apps import apps
+from django.conf import settings
+from django.db import models
+
+PERCENTILE_SCALE = 10_000
+
+
+def compact():
+    return settings.COMPACT_SCORES
+
+
+def encode_percentile(value):
+    if value is None or not compact():
+        return value
+    return round(value * PERCENTILE_SCALE)
+
+
+def decode_percentile(value):
+    if value is None or not compact():
+        return value
+    return value / PERCENTILE_SCALE
+
+
+class ScoreField(models.FloatField):
+    """A float stored as real in the compact schema."""
+
+    def db_type(self, connection):
+        return "real" if compact() else super().db_type(connection)
+
+
+class PercentileField(models.FloatField):
+    """A float in [0, 1] stored as a scaled smallint in the compact schema."""
+
+    def db_type(self, connection):
+        return "smallint" if compact() else super().db_type(connection)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        value = super().get_db_prep_value(value, connection, prepared)
+        return encode_percentile(value)
+
+    def from_db_value(self, value, expression, connection):
+        return decode_percentile(value)
+
+
+def pending_changes(connection):
+    """
+    Returns ``{table: [(column, type, using), ...]}`` for the score columns
+    whose type differs from the one selected by COMPACT_SCORES. Tables that
+    don't exist yet are left out.
+    """
+    changes = {}
+    with connection.cursor() as cursor:
+        for model in apps.get_app_config("drugs").get_models():
+            if not model._meta.managed:
+                continue
+            table = model._meta.db_table
+            for field in model._meta.concrete_fields:
+                if not isinstance(field, (ScoreField, PercentileField)):
+                    continue
+                cursor.execute(
+                    "SELECT data_type FROM information_schema.columns "
+                    "WHERE table_schema = current_schema() "
+                    "AND table_name = %s AND column_name = %s",
+                    [table, field.column],
+                )
+                row = cursor.fetchone()
+                if row is None:
+                    continue
+                current, target = row[0], field.db_type(connection)
+                if current == target:
+                    continue
+                column = connection.ops.quote_name(field.column)
+                if target == "smallint":
+                    using = f"round({column} * {PERCENTILE_SCALE})"
+                elif current == "smallint":
+                    using = f"{column}::double precision / {PERCENTILE_SCALE}"
+                else:
+                    using = column
+                changes.setdefault(table, []).append((column, target, using))
+    return changes
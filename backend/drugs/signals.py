@@ -0,0 +1,11 @@
+from django.dispatch import Signal
+
+# Sent after the drug_disease_prediction materialized view has been rebuilt.
+predictions_refreshed = Signal()
+
+# Sent after bulk changes that bypass model signals, such as an import.
+dataset_changed = Signal()
+
+# Sent after explanation rows were deleted directly, rather than through their
+# pair, with the ``pair_ids`` they belonged to.
+explanations_deleted = Signal()
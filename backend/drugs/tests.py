@@ -1,3 +1,233 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import (
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.utils import timezone
+
+from .models import (
+    DatasetImport,
+    Disease,
+    Drug,
+    DrugDiseasePrediction,
+    DrugDiseaseProbability,
+    ExplanationTerm,
+    PathPrediction,
+    PercentileRun,
+)
+from .management.commands import import_predictions
+from .matrix import get_matrix, write_matrix
+from .ranking import grouped_percentiles
+
+MATRIX_PATH = os.path.join(tempfile.mkdtemp(), "predictions.matrix")
+
+
+def create_predictions(predictions, **fields):
+    """
+    Creates a prediction for each ``(drug, disease, prediction)``, where drug
+    ``i`` is DB0000i and disease ``j`` is DOID:j, creating both as needed.
+    """
+    for drug, disease, prediction in predictions:
+        DrugDiseaseProbability.objects.create(
+            drug=Drug.objects.get_or_create(
+                dbid=f"DB0000{drug}",
+                defaults={"name": f"Drug {drug}", "chembl_id": drug},
+            )[0],
+            disease=Disease.objects.get_or_create(
+                doid=f"DOID:{disease}", defaults={"name": f"Disease {disease}"}
+            )[0],
+            prediction=prediction,
+            **fields,
+        )
+
+
+@override_settings(PREDICTION_MATRIX_PATH=MATRIX_PATH)
+class ImportPredictionsTests(TransactionTestCase):
+    def setUp(self):
+        Drug.objects.create(dbid="DB00945", name="Acetylsalicylic acid", chembl_id="C1")
+        Disease.objects.create(doid="DOID:10763", name="Hypertension")
+        self.directory = tempfile.mkdtemp()
+        self.write(
+            "probabilities.tsv",
+            "drug\tdisease\tprediction\tcompound_prediction\tdisease_prediction"
+            "\tcategory\ttrial_count\n"
+            "db00945\tHypertension\t0.5\t0.9\t0.8\tDM\t3\n"
+            "DB99999\tDOID:10763\t0.1\t0.1\t0.1\t\t0\n",
+        )
+        self.write(
+            "path_predictions.csv",
+            "drug,disease,percent_of_prediction,percent_of_dwpc,metapath,length,"
+            "verbose_path\n"
+            'DB00945,DOID:10763,0.7,0.6,CbGaD,3,"a, b"\n'
+            "DB00945,DOID:10763,0.3,0.2,CtDrD,3,c\n",
+        )
+
+    def write(self, name, content):
+        with open(os.path.join(self.directory, name), "w") as handle:
+            handle.write(content)
+
+    def import_predictions(self, **options):
+        options = {"dataset_version": "v1", "workers": 1, **options}
+        call_command(
+            "import_predictions", self.directory, stdout=io.StringIO(), **options
+        )
+
+    def test_import_resolves_keys_and_is_idempotent(self):
+        self.import_predictions(workers=2)
+        self.import_predictions()
+
+        pair = DrugDiseaseProbability.objects.get()
+        self.assertEqual((pair.drug_id, pair.disease_id), ("DB00945", "DOID:10763"))
+        self.assertEqual(pair.category, "DM")
+        self.assertEqual(
+            list(
+                PathPrediction.objects.values_list("verbose_path", flat=True).order_by(
+                    "-percent_of_prediction"
+                )
+            ),
+            ["a, b", "c"],
+        )
+        self.assertEqual(
+            list(
+                PathPrediction.objects.values_list(
+                    "metapath__name", flat=True
+                ).order_by("-percent_of_prediction")
+            ),
+            ["CbGaD", "CtDrD"],
+        )
+        self.assertEqual(ExplanationTerm.objects.count(), 2)
+        self.assertEqual(DrugDiseasePrediction.objects.get().drug_name, pair.drug.name)
+        self.assertEqual(DatasetImport.objects.get().row_count, 3)
+
+    def test_failed_import_keeps_the_previous_dataset(self):
+        self.import_predictions()
+        self.write(
+            "probabilities.tsv",
+            "drug\tdisease\tprediction\tcompound_prediction\tdisease_prediction"
+            "\tcategory\ttrial_count\n"
+            "DB00945\tDOID:10763\t0.2\t0.9\t0.8\tDM\t3\n",
+        )
+        self.write(
+            "path_predictions.csv",
+            "drug,disease,percent_of_prediction,percent_of_dwpc,metapath,length,"
+            "verbose_path\n"
+            "DB00945,DOID:10763,1,1,CpDrD,3,d\n",
+        )
+        replace_table = import_predictions.replace_table
+
+        def fail_after_paths(name):
+            loaded = replace_table(name)
+            if name != import_predictions.PROBABILITIES:
+                raise RuntimeError("boom")
+            return loaded
+
+        with mock.patch.object(
+            import_predictions, "replace_table", side_effect=fail_after_paths
+        ), self.assertRaisesMessage(RuntimeError, "boom"):
+            self.import_predictions(dataset_version="v2")
+
+        self.assertEqual(DrugDiseaseProbability.objects.get().prediction, 0.5)
+        self.assertEqual(PathPrediction.objects.count(), 2)
+        self.assertEqual(ExplanationTerm.objects.count(), 2)
+        self.assertEqual(DrugDiseasePrediction.objects.get().prediction, 0.5)
+        self.assertEqual(
+            list(DatasetImport.objects.values_list("version", flat=True)), ["v1"]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT count(*) FROM pg_class WHERE relname LIKE 'import_%%'"
+            )
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_duplicate_pairs_are_rejected(self):
+        self.write(
+            "probabilities.tsv",
+            "drug\tdisease\tprediction\tcompound_prediction\tdisease_prediction"
+            "\tcategory\ttrial_count\n"
+            "DB00945\tDOID:10763\t0.5\t0.9\t0.8\tDM\t3\n"
+            "Acetylsalicylic acid\thypertension\t0.2\t0.9\t0.8\tDM\t3\n",
+        )
+        with self.assertRaisesMessage(
+            CommandError, "lists pairs more than once: DB00945/DOID:10763"
+        ):
+            self.import_predictions()
+        self.assertFalse(DrugDiseaseProbability.objects.exists())
+
+
+class PercentileTests(SimpleTestCase):
+    def test_ties_share_their_average_rank_within_each_group(self):
+        percentiles = grouped_percentiles(
+            [1, 0, 1, 0, 1, 0], [0.2, 0.5, 0.2, 0.1, 0.9, 0.3]
+        )
+        self.assertEqual(list(percentiles), [0.5, 1.0, 0.5, 1 / 3, 1.0, 2 / 3])
+
+
+@override_settings(PREDICTION_MATRIX_PATH=MATRIX_PATH)
+class RecomputePercentilesTests(TestCase):
+    def setUp(self):
+        create_predictions([(0, 0, 0.1), (0, 1, 0.4), (1, 0, 0.3), (1, 1, 0.2)])
+
+    def percentiles(self):
+        return list(
+            DrugDiseaseProbability.objects.order_by("drug", "disease").values_list(
+                "compound_prediction", "disease_prediction"
+            )
+        )
+
+    def test_full_and_incremental_recompute(self):
+        call_command("recompute_percentiles", stdout=io.StringIO())
+        self.assertEqual(
+            self.percentiles(), [(0.5, 0.5), (1.0, 1.0), (1.0, 1.0), (0.5, 0.5)]
+        )
+
+        # now() is frozen at the start of the test transaction, before the
+        # pairs were saved, so move the watermark past them.
+        PercentileRun.objects.update(started_at=timezone.now())
+        pair = DrugDiseaseProbability.objects.get(drug="DB00000", disease="DOID:0")
+        pair.prediction = 0.9
+        pair.save()
+        out = io.StringIO()
+        call_command("recompute_percentiles", incremental=True, stdout=out)
+        self.assertIn("Ranked 3 pairs", out.getvalue())
+        self.assertEqual(
+            self.percentiles(), [(1.0, 1.0), (0.5, 1.0), (1.0, 0.5), (0.5, 0.5)]
+        )
+
+
+@override_settings(PREDICTION_MATRIX_PATH=MATRIX_PATH)
+class PredictionMatrixTests(TestCase):
+    def setUp(self):
+        create_predictions(
+            [(0, 0, 0.25), (1, 0, 0.75), (2, 1, 0.5)], compound_prediction=1.0
+        )
+
+    def test_lookups_slices_and_ranking(self):
+        write_matrix()
+        matrix = get_matrix()
+        self.assertEqual(
+            matrix.get("DB00001", "DOID:0"),
+            {"prediction": 0.75, "compound_prediction": 1.0, "disease_prediction": 0},
+        )
+        self.assertIsNone(matrix.get("DB00000", "DOID:1"))
+        self.assertEqual(list(matrix.disease_column("DOID:0")[:2]), [0.25, 0.75])
+        self.assertEqual(
+            matrix.top_drugs("DOID:0", 5), [("DB00001", 0.75), ("DB00000", 0.25)]
+        )
+        self.assertEqual(matrix.top_diseases("DB00002", 1), [("DOID:1", 0.5)])
+
+    def test_reopens_after_rewrite(self):
+        write_matrix()
+        first = get_matrix()
+        DrugDiseaseProbability.objects.filter(drug="DB00000").update(prediction=0.5)
+        write_matrix()
+        self.assertIsNot(get_matrix(), first)
+        self.assertEqual(get_matrix().get("DB00000", "DOID:0")["prediction"], 0.5)
+        self.assertEqual(first.get("DB00000", "DOID:0")["prediction"], 0.25)
@@ -1,14 +1,27 @@
 from django.shortcuts import render
 from dal import autocomplete
-from .models import DrugDiseaseProbability
+from django.db.models import Q
+from .models import DrugDiseaseProbability, ExplanationTerm
 
 
 class PathPredictionAutocomplete(autocomplete.Select2QuerySetView):
     def get_queryset(self):
-        qs = DrugDiseaseProbability.objects.all()
+        qs = DrugDiseaseProbability.objects.select_related("drug", "disease")
 
         if self.q:
-            qs = qs.filter(name__istartswith=self.q)
+            qs = qs.filter(
+                Q(drug__name__istartswith=self.q) | Q(disease__name__istartswith=self.q)
+            )
+
+        return qs
+
+
+class ExplanationTermAutocomplete(autocomplete.Select2QuerySetView):
+    def get_queryset(self):
+        qs = ExplanationTerm.objects.all()
+
+        if self.q:
+            qs = qs.filter(name__icontains=self.q)
 
         return qs
 
@@ -1,12 +1,52 @@
-import React from 'react';
+import React, { useEffect, useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
+import axios from 'axios';
 import { useAuth } from './utils/AuthContext.jsx';
 import Logo from './logo/img.svg';
 
+// Suggestions are fetched once typing pauses for this long.
+const SUGGESTION_DELAY_MS = 150;
+
 const Navigation = () => {
   const { authState, logout } = useAuth();
   const { username } = authState;
   const navigate = useNavigate();
+  const [suggestions, setSuggestions] = useState([]);
+  const suggestionTimer = useRef(null);
+  const suggestionRequest = useRef(null);
+
+  // Drop a pending lookup when the navigation unmounts.
+  useEffect(() => () => {
+    clearTimeout(suggestionTimer.current);
+    suggestionRequest.current?.abort();
+  }, []);
+
+  const handleSearchChange = (e) => {
+    const query = e.target.value.trim();
+    // Each keystroke cancels the previous lookup, so an older, slower
+    // response can never replace the suggestions for the current text.
+    clearTimeout(suggestionTimer.current);
+    suggestionRequest.current?.abort();
+    if (!query) {
+      setSuggestions([]);
+      return;
+    }
+    suggestionTimer.current = setTimeout(async () => {
+      const controller = new AbortController();
+      suggestionRequest.current = controller;
+      try {
+        const response = await axios.get('/api/autocomplete/', {
+          params: { q: query, type: 'drug' },
+          signal: controller.signal,
+        });
+        setSuggestions(response.data.results);
+      } catch (error) {
+        if (!axios.isCancel(error)) {
+          setSuggestions([]);
+        }
+      }
+    }, SUGGESTION_DELAY_MS);
+  };
 
   const handleLogout = () => {
     logout();
@@ -28,7 +68,15 @@ const Navigation = () => {
                 name="search"
                 placeholder="Search drugs"
                 className="p-2 border rounded-l-full"
+                list="search-suggestions"
+                autoComplete="off"
+                onChange={handleSearchChange}
               />
+              <datalist id="search-suggestions">
+                {suggestions.map(suggestion => (
+                  <option key={suggestion.id} value={suggestion.name} />
+                ))}
+              </datalist>
               <button type="submit" className="p-2 bg-golubenkiy text-white rounded-r-full hover:bg-blue-500">
                 Search
               </button>
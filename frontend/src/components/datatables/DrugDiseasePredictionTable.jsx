@@ -9,25 +9,19 @@ const getAuthToken = () => {
   return localStorage.getItem('auth_token');
 };
 
-const fetchAllPagesConcurrently = async (url, totalPages) => {
-  const token = getAuthToken();
-  const requests = [];
-  for (let page = 1; page <= totalPages; page++) {
-    requests.push(axios.get(`${url}&page=${page}`, {
-      headers: {
-        Authorization: `Token ${token}`
-      }
-    }));
-  }
-  const responses = await Promise.all(requests);
-  const results = responses.flatMap(response => response.data.results);
-  return results;
-};
-
 const fetchDiseaseProbability = async (drugName) => {
-  const initialUrl = `/api/drug-diseases-probability/?search=${drugName}`;
-  const totalPages = 7;
-  return fetchAllPagesConcurrently(initialUrl, totalPages);
+  const token = getAuthToken();
+  const response = await axios.get('/api/drug-diseases-probability/export/', {
+    params: { drug: drugName, format: 'ndjson' },
+    headers: {
+      Authorization: `Token ${token}`
+    },
+    responseType: 'text',
+  });
+  return response.data
+    .split('\n')
+    .filter(line => line)
+    .map(line => JSON.parse(line));
 };
 
 const DrugDiseasePredictionTable = ({ drugName }) => {
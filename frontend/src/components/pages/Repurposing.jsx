@@ -21,9 +21,9 @@ const fetchDrugDiseaseDetail = async ({ queryKey }) => {
   return fetchData('/api/drug-diseases-probability/', { search: `${drugName} ${diseaseName}` });
 };
 
-const fetchPredictions = (url) => async ({ queryKey }) => {
+const fetchExplanation = async ({ queryKey }) => {
   const [, id] = queryKey;
-  return fetchData(url, { search: id });
+  return fetchData(`/api/drug-diseases-probability/${id}/explanation/`);
 };
 
 const Repurposing = () => {
@@ -46,62 +46,21 @@ const Repurposing = () => {
   const drugDiseaseId = drugDiseaseData?.results?.[0]?.id;
 
   const {
-    data: pathPredictionData,
-    isLoading: isLoadingPathPrediction,
-    error: errorPathPrediction,
+    data: explanationData,
+    isLoading: isLoadingExplanation,
+    error: errorExplanation,
   } = useQuery({
-    queryKey: ['pathPredictions', drugDiseaseId],
-    queryFn: fetchPredictions('/api/path-predictions/'),
+    queryKey: ['explanation', drugDiseaseId],
+    queryFn: fetchExplanation,
     enabled: !!drugDiseaseId,
   });
 
-  const {
-    data: metapathPredictionData,
-    isLoading: isLoadingMetapathPrediction,
-    error: errorMetapathPrediction,
-  } = useQuery({
-    queryKey: ['metapathPredictions', drugDiseaseId],
-    queryFn: fetchPredictions('/api/metapath-predictions/'),
-    enabled: !!drugDiseaseId,
-  });
-
-  const {
-    data: sourceEdgePredictionData,
-    isLoading: isLoadingSourceEdgePrediction,
-    error: errorSourceEdgePrediction,
-  } = useQuery({
-    queryKey: ['sourceEdgePredictions', drugDiseaseId],
-    queryFn: fetchPredictions('/api/source-edge-predictions/'),
-    enabled: !!drugDiseaseId,
-  });
-
-  const {
-    data: targetEdgePredictionData,
-    isLoading: isLoadingTargetEdgePrediction,
-    error: errorTargetEdgePrediction,
-  } = useQuery({
-    queryKey: ['targetEdgePredictions', drugDiseaseId],
-    queryFn: fetchPredictions('/api/target-edge-predictions/'),
-    enabled: !!drugDiseaseId,
-  });
-
-  if (
-    isLoadingDrugDisease ||
-    isLoadingPathPrediction ||
-    isLoadingMetapathPrediction ||
-    isLoadingSourceEdgePrediction ||
-    isLoadingTargetEdgePrediction
-  ) {
+  if (isLoadingDrugDisease || isLoadingExplanation) {
     return <p className="text-center">Loading...</p>;
   }
 
-  if (errorDrugDisease || errorPathPrediction || errorMetapathPrediction || errorSourceEdgePrediction || errorTargetEdgePrediction) {
-    const error =
-      errorDrugDisease ||
-      errorPathPrediction ||
-      errorMetapathPrediction ||
-      errorSourceEdgePrediction ||
-      errorTargetEdgePrediction;
+  if (errorDrugDisease || errorExplanation) {
+    const error = errorDrugDisease || errorExplanation;
     return <p className="text-center text-red-500">Error: {error.message}</p>;
   }
 
@@ -123,13 +82,13 @@ const Repurposing = () => {
         <p><strong>Trial Count:</strong> {details.trial_count}</p>
       </div>
       <h2 className="text-2xl font-bold mt-8 mb-4">Path Predictions</h2>
-      <PathPredictionTable data={pathPredictionData} />
+      <PathPredictionTable data={explanationData?.path_predictions} />
       <h2 className="text-2xl font-bold mt-8 mb-4">Metapath Predictions</h2>
-      <MetapathPredictionTable data={metapathPredictionData} />
+      <MetapathPredictionTable data={explanationData?.metapath_predictions} />
       <h2 className="text-2xl font-bold mt-8 mb-4">Source Edge Predictions</h2>
-      <SourceEdgePredictionTable data={sourceEdgePredictionData} />
+      <SourceEdgePredictionTable data={explanationData?.source_edge_predictions} />
       <h2 className="text-2xl font-bold mt-8 mb-4">Target Edge Predictions</h2>
-      <TargetEdgePredictionTable data={targetEdgePredictionData} />
+      <TargetEdgePredictionTable data={explanationData?.target_edge_predictions} />
     </div>
   );
 };